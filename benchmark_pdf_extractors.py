@@ -1,383 +1,1099 @@
-import argparse
-import csv
-import importlib.util
-import logging
-import re
-import time
-from dataclasses import dataclass, asdict
-from difflib import SequenceMatcher
-from pathlib import Path
-from typing import Dict, List, Tuple
-
-
-LOGGER = logging.getLogger("pdf-benchmark")
-
-
-@dataclass
-class BenchmarkRow:
-    pdf_file: str
-    library: str
-    page_count: int
-    extract_time_sec: float
-    text_chars: int
-    text_coverage_pct: float
-    text_consensus_pct: float
-    table_count: int
-    table_structure_pct: float
-    image_count: int
-    status: str
-    error_message: str
-
-
-def setup_logging(output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    log_path = output_dir / "benchmark.log"
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.FileHandler(log_path, encoding="utf-8"), logging.StreamHandler()],
-    )
-
-
-def is_installed(module_name: str) -> bool:
-    return importlib.util.find_spec(module_name) is not None
-
-
-def normalize_text(text: str) -> str:
-    text = text or ""
-    text = re.sub(r"\s+", " ", text)
-    return text.strip().lower()
-
-
-def similarity(a: str, b: str) -> float:
-    na, nb = normalize_text(a), normalize_text(b)
-    if not na and not nb:
-        return 1.0
-    if not na or not nb:
-        return 0.0
-    return SequenceMatcher(None, na, nb).ratio()
-
-
-def table_to_markdown(table: List[List[str]]) -> str:
-    if not table:
-        return ""
-
-    safe_rows = []
-    max_cols = max(len(row) for row in table)
-    for row in table:
-        padded = list(row) + [""] * (max_cols - len(row))
-        safe_rows.append([("" if cell is None else str(cell)).replace("\n", " ").strip() for cell in padded])
-
-    header = safe_rows[0]
-    sep = ["---"] * len(header)
-    body = safe_rows[1:] if len(safe_rows) > 1 else []
-
-    lines = [
-        "| " + " | ".join(header) + " |",
-        "| " + " | ".join(sep) + " |",
-    ]
-    for row in body:
-        lines.append("| " + " | ".join(row) + " |")
-    return "\n".join(lines)
-
-
-def extract_with_pymupdf(pdf_path: Path, output_dir: Path) -> Tuple[str, int, int, int, float]:
-    import fitz
-
-    t0 = time.perf_counter()
-    text_parts: List[str] = []
-    image_count = 0
-    doc = fitz.open(pdf_path)
-    image_dir = output_dir / "images" / "pymupdf" / pdf_path.stem
-    image_dir.mkdir(parents=True, exist_ok=True)
-
-    for page_index, page in enumerate(doc, start=1):
-        text_parts.append(page.get_text("text") or "")
-        for image_idx, image_info in enumerate(page.get_images(full=True), start=1):
-            xref = image_info[0]
-            base_image = doc.extract_image(xref)
-            img_bytes = base_image.get("image")
-            img_ext = base_image.get("ext", "png")
-            if not img_bytes:
-                continue
-            image_count += 1
-            img_file = image_dir / f"{pdf_path.stem}_p{page_index}_i{image_idx}.{img_ext}"
-            img_file.write_bytes(img_bytes)
-
-    page_count = doc.page_count
-    doc.close()
-    elapsed = time.perf_counter() - t0
-    return "\n".join(text_parts), page_count, 0, image_count, elapsed
-
-
-def extract_with_pdfplumber(pdf_path: Path, output_dir: Path) -> Tuple[str, int, int, int, float, float]:
-    import pdfplumber
-
-    t0 = time.perf_counter()
-    text_parts: List[str] = []
-    table_count = 0
-    valid_table_count = 0
-    image_count = 0
-    table_dir = output_dir / "tables" / pdf_path.stem
-    table_dir.mkdir(parents=True, exist_ok=True)
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_idx, page in enumerate(pdf.pages, start=1):
-            text_parts.append(page.extract_text() or "")
-            image_count += len(page.images or [])
-
-            tables = page.extract_tables() or []
-            for table_idx, table in enumerate(tables, start=1):
-                table_count += 1
-                md = table_to_markdown(table)
-                if md and len(table or []) >= 2 and max((len(r) for r in table if r), default=0) >= 2:
-                    valid_table_count += 1
-                table_file = table_dir / f"{pdf_path.stem}_p{page_idx}_t{table_idx}.md"
-                table_file.write_text(md, encoding="utf-8")
-
-        page_count = len(pdf.pages)
-
-    elapsed = time.perf_counter() - t0
-    structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
-    return "\n".join(text_parts), page_count, table_count, image_count, elapsed, structure_pct
-
-
-def extract_with_pdfminer(pdf_path: Path) -> Tuple[str, int, int, int, float]:
-    from pdfminer.high_level import extract_text
-    from pdfminer.pdfpage import PDFPage
-
-    t0 = time.perf_counter()
-    text = extract_text(str(pdf_path)) or ""
-    with pdf_path.open("rb") as f:
-        page_count = sum(1 for _ in PDFPage.get_pages(f))
-    elapsed = time.perf_counter() - t0
-    return text, page_count, 0, 0, elapsed
-
-
-def extract_with_pypdf(pdf_path: Path, output_dir: Path) -> Tuple[str, int, int, int, float]:
-    from pypdf import PdfReader
-
-    t0 = time.perf_counter()
-    text_parts: List[str] = []
-    image_count = 0
-
-    reader = PdfReader(str(pdf_path))
-    image_dir = output_dir / "images" / "pypdf" / pdf_path.stem
-    image_dir.mkdir(parents=True, exist_ok=True)
-
-    for page_idx, page in enumerate(reader.pages, start=1):
-        text_parts.append(page.extract_text() or "")
-
-        page_images = getattr(page, "images", None)
-        if page_images:
-            for image_idx, image_file in enumerate(page_images, start=1):
-                try:
-                    image_count += 1
-                    name = getattr(image_file, "name", f"img_{image_idx}.bin")
-                    img_bytes = getattr(image_file, "data", b"")
-                    if not img_bytes:
-                        continue
-                    out_file = image_dir / f"{pdf_path.stem}_p{page_idx}_i{image_idx}_{name}"
-                    out_file.write_bytes(img_bytes)
-                except Exception as image_err:
-                    LOGGER.warning("pypdf image save failed: %s", image_err)
-
-    elapsed = time.perf_counter() - t0
-    return "\n".join(text_parts), len(reader.pages), 0, image_count, elapsed
-
-
-def ensure_text_export(output_dir: Path, library: str, pdf_name: str, text: str) -> None:
-    text_dir = output_dir / "texts" / library
-    text_dir.mkdir(parents=True, exist_ok=True)
-    out_file = text_dir / f"{pdf_name}.txt"
-    out_file.write_text(text or "", encoding="utf-8")
-
-
-def compute_proxy_scores(rows: List[BenchmarkRow], text_map: Dict[Tuple[str, str], str]) -> None:
-    by_pdf: Dict[str, List[BenchmarkRow]] = {}
-    for row in rows:
-        by_pdf.setdefault(row.pdf_file, []).append(row)
-
-    for pdf_file, pdf_rows in by_pdf.items():
-        max_chars = max((r.text_chars for r in pdf_rows), default=0)
-        for row in pdf_rows:
-            row.text_coverage_pct = (row.text_chars / max_chars * 100.0) if max_chars > 0 else 0.0
-            peers = [r for r in pdf_rows if r.library != row.library and r.status == "ok"]
-            if not peers or row.status != "ok":
-                row.text_consensus_pct = 0.0
-                continue
-            base_text = text_map.get((pdf_file, row.library), "")
-            scores = []
-            for peer in peers:
-                peer_text = text_map.get((pdf_file, peer.library), "")
-                scores.append(similarity(base_text, peer_text))
-            row.text_consensus_pct = (sum(scores) / len(scores) * 100.0) if scores else 0.0
-
-
-def write_csv(output_dir: Path, rows: List[BenchmarkRow]) -> Path:
-    csv_path = output_dir / "benchmark_results.csv"
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        fieldnames = list(asdict(rows[0]).keys()) if rows else list(BenchmarkRow.__annotations__.keys())
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(asdict(row))
-    return csv_path
-
-
-def write_markdown(output_dir: Path, rows: List[BenchmarkRow]) -> Path:
-    md_path = output_dir / "benchmark_results.md"
-    headers = [
-        "pdf_file",
-        "library",
-        "extract_time_sec",
-        "text_chars",
-        "text_coverage_pct",
-        "text_consensus_pct",
-        "table_count",
-        "table_structure_pct",
-        "image_count",
-        "status",
-    ]
-
-    lines = [
-        "# PDF Extractor Benchmark Results",
-        "",
-        "| " + " | ".join(headers) + " |",
-        "| " + " | ".join(["---"] * len(headers)) + " |",
-    ]
-
-    def fmt(v):
-        if isinstance(v, float):
-            return f"{v:.3f}"
-        return str(v)
-
-    for row in rows:
-        data = asdict(row)
-        lines.append("| " + " | ".join(fmt(data[h]) for h in headers) + " |")
-
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-    return md_path
-
-
-def run_benchmark(input_dir: Path, output_dir: Path) -> List[BenchmarkRow]:
-    pdf_files = sorted(input_dir.glob("*.pdf"))
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found in: {input_dir}")
-
-    extractors = {
-        "pymupdf": {"module": "fitz"},
-        "pdfplumber": {"module": "pdfplumber"},
-        "pdfminer": {"module": "pdfminer"},
-        "pypdf": {"module": "pypdf"},
-    }
-
-    rows: List[BenchmarkRow] = []
-    text_map: Dict[Tuple[str, str], str] = {}
-
-    for pdf_path in pdf_files:
-        LOGGER.info("Processing PDF: %s", pdf_path.name)
-
-        for library, meta in extractors.items():
-            if not is_installed(meta["module"]):
-                LOGGER.warning("Library not installed, skipping: %s", library)
-                rows.append(
-                    BenchmarkRow(
-                        pdf_file=pdf_path.name,
-                        library=library,
-                        page_count=0,
-                        extract_time_sec=0.0,
-                        text_chars=0,
-                        text_coverage_pct=0.0,
-                        text_consensus_pct=0.0,
-                        table_count=0,
-                        table_structure_pct=0.0,
-                        image_count=0,
-                        status="skipped",
-                        error_message="module_not_installed",
-                    )
-                )
-                continue
-
-            try:
-                if library == "pymupdf":
-                    text, page_count, table_count, image_count, elapsed = extract_with_pymupdf(pdf_path, output_dir)
-                    structure_pct = 0.0
-                elif library == "pdfplumber":
-                    text, page_count, table_count, image_count, elapsed, structure_pct = extract_with_pdfplumber(pdf_path, output_dir)
-                elif library == "pdfminer":
-                    text, page_count, table_count, image_count, elapsed = extract_with_pdfminer(pdf_path)
-                    structure_pct = 0.0
-                elif library == "pypdf":
-                    text, page_count, table_count, image_count, elapsed = extract_with_pypdf(pdf_path, output_dir)
-                    structure_pct = 0.0
-                else:
-                    raise ValueError(f"Unknown library: {library}")
-
-                ensure_text_export(output_dir, library, pdf_path.stem, text)
-                text_map[(pdf_path.name, library)] = text
-
-                rows.append(
-                    BenchmarkRow(
-                        pdf_file=pdf_path.name,
-                        library=library,
-                        page_count=page_count,
-                        extract_time_sec=elapsed,
-                        text_chars=len(text),
-                        text_coverage_pct=0.0,
-                        text_consensus_pct=0.0,
-                        table_count=table_count,
-                        table_structure_pct=structure_pct,
-                        image_count=image_count,
-                        status="ok",
-                        error_message="",
-                    )
-                )
-                LOGGER.info("Done: %s | %s | %.3fs", pdf_path.name, library, elapsed)
-
-            except Exception as err:
-                LOGGER.exception("Failed: %s | %s", pdf_path.name, library)
-                rows.append(
-                    BenchmarkRow(
-                        pdf_file=pdf_path.name,
-                        library=library,
-                        page_count=0,
-                        extract_time_sec=0.0,
-                        text_chars=0,
-                        text_coverage_pct=0.0,
-                        text_consensus_pct=0.0,
-                        table_count=0,
-                        table_structure_pct=0.0,
-                        image_count=0,
-                        status="error",
-                        error_message=str(err).replace("\n", " ")[:500],
-                    )
-                )
-
-    compute_proxy_scores(rows, text_map)
-    return rows
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Benchmark PDF extraction libraries.")
-    parser.add_argument("--input-dir", type=Path, default=Path("dataset"), help="Directory containing PDF files.")
-    parser.add_argument("--output-dir", type=Path, default=Path("outputs"), help="Directory to store results.")
-    args = parser.parse_args()
-
-    setup_logging(args.output_dir)
-
-    LOGGER.info("Starting benchmark...")
-    LOGGER.info("Input directory: %s", args.input_dir.resolve())
-    LOGGER.info("Output directory: %s", args.output_dir.resolve())
-
-    rows = run_benchmark(args.input_dir, args.output_dir)
-    csv_path = write_csv(args.output_dir, rows)
-    md_path = write_markdown(args.output_dir, rows)
-
-    LOGGER.info("Benchmark completed.")
-    LOGGER.info("CSV report: %s", csv_path.resolve())
-    LOGGER.info("Markdown report: %s", md_path.resolve())
-
-
-if __name__ == "__main__":
+import argparse
+import csv
+import importlib.util
+import logging
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+import unicodedata
+from itertools import zip_longest
+from dataclasses import dataclass, asdict
+from difflib import SequenceMatcher
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from extraction_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, ExtractionCache, file_digest, library_versions
+
+
+LOGGER = logging.getLogger("pdf-benchmark")
+PARSER_DIR = Path(__file__).resolve().parent / "parser"
+
+
+@dataclass
+class BenchmarkRow:
+    pdf_file: str
+    library: str
+    page_count: int
+    extract_time_sec: float
+    extract_time_p95_sec: float
+    extract_time_stdev_sec: float
+    cpu_time_sec: float
+    peak_python_heap_mb: Optional[float]
+    runs: int
+    text_time_sec: float
+    image_time_sec: float
+    text_chars_per_sec: float
+    text_chars: int
+    text_coverage_pct: float
+    text_consensus_pct: float
+    table_count: int
+    table_structure_pct: float
+    image_count: int
+    status: str
+    error_message: str
+
+
+@dataclass
+class TableAgreementRow:
+    pdf_file: str
+    page_count: int
+    pdfplumber_tables: int
+    pymupdf_tables: int
+    matched_tables: int
+    same_shape_tables: int
+    cells_compared: int
+    cell_agreement_pct: float
+    pdfplumber_time_sec: float
+    pymupdf_time_sec: float
+    status: str
+    error_message: str
+
+
+@dataclass
+class GroupingFidelityRow:
+    pdf_file: str
+    page_count: int
+    identical_pages: int
+    text_similarity_pct: float
+    stock_layout_sec: float
+    numpy_layout_sec: float
+    status: str
+    error_message: str
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    log_path = output_dir / "benchmark.log"
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(log_path, encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def is_installed(module_name: str) -> bool:
+    return importlib.util.find_spec(module_name) is not None
+
+
+def normalize_text(text: str) -> str:
+    text = text or ""
+    text = re.sub(r"\s+", " ", text)
+    return text.strip().lower()
+
+
+PAGE_BREAK = "\f"
+# Box counts of the synthetic many-box case in the --grouping-fidelity report
+BOX_ORDERING_COUNTS = (100, 300, 600)
+EXACT_PAGE_CHARS = 4000
+ALIGN_CHUNK_CHARS = 2000
+
+
+def split_pages(text: str) -> List[str]:
+    """Split an exported text on the form feeds every extractor writes between pages."""
+    return [normalize_text(page) for page in (text or "").split(PAGE_BREAK)]
+
+
+def matched_chars(a: str, b: str) -> int:
+    return sum(block.size for block in SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks())
+
+
+def page_match_bounds(a: str, b: str) -> Tuple[int, int]:
+    """Return ``(lower, upper)`` bounds on the number of matched characters of two pages.
+
+    Pages up to ``EXACT_PAGE_CHARS`` combined are diffed directly and both bounds are the
+    ``SequenceMatcher`` match count. Longer pages are cut into the same number of proportional chunks of about
+    ``ALIGN_CHUNK_CHARS`` and chunk ``i`` of ``a`` is only diffed against chunk ``i`` of
+    ``b``; the chunk matches form one in-order alignment of the whole page, so they are a
+    lower bound on the longest common subsequence. The upper bound is the character multiset
+    intersection (what ``SequenceMatcher.quick_ratio`` counts). Work per page is linear in
+    its length.
+    """
+    if not a or not b:
+        return 0, 0
+    if len(a) + len(b) <= EXACT_PAGE_CHARS:
+        matched = matched_chars(a, b)
+        return matched, matched
+
+    chunks = -(-max(len(a), len(b)) // ALIGN_CHUNK_CHARS)
+    lower = 0
+    for idx in range(chunks):
+        chunk_a = a[len(a) * idx // chunks : len(a) * (idx + 1) // chunks]
+        chunk_b = b[len(b) * idx // chunks : len(b) * (idx + 1) // chunks]
+        lower += matched_chars(chunk_a, chunk_b)
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    upper = round(matcher.quick_ratio() * (len(a) + len(b)) / 2)
+    return lower, upper
+
+
+def similarity(a: str, b: str) -> Tuple[float, float]:
+    """Edit similarity ``2 * matched / total_chars`` of two texts, compared page by page.
+
+    Pages are paired by position (a missing page counts as empty) and their matches are
+    summed, so the cost grows linearly with document length instead of quadratically.
+    Returns ``(ratio, upper)``. For long pages ``ratio`` never overstates the exact
+    longest-common-subsequence ratio of the paired pages and ``upper`` never understates it,
+    so the error of ``ratio`` is at most ``upper - ratio``. Both are the plain
+    ``SequenceMatcher`` ratio when every page pair is small enough to diff directly.
+    """
+    pages_a, pages_b = split_pages(a), split_pages(b)
+    total = sum(len(page) for page in pages_a) + sum(len(page) for page in pages_b)
+    if total == 0:
+        return 1.0, 1.0
+    lower = upper = 0
+    for page_a, page_b in zip_longest(pages_a, pages_b, fillvalue=""):
+        page_lower, page_upper = page_match_bounds(page_a, page_b)
+        lower += page_lower
+        upper += page_upper
+    return 2.0 * lower / total, 2.0 * upper / total
+
+
+CONTENT_CHOICES = ("text", "text+tables", "all")
+
+
+class PhaseTimer:
+    """Accumulates wall time per extraction phase ("text", "tables", "images") across pages."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self._last
+        self._last = now
+
+
+def table_to_markdown(table: List[List[str]]) -> str:
+    if not table:
+        return ""
+
+    safe_rows = []
+    max_cols = max(len(row) for row in table)
+    for row in table:
+        padded = list(row) + [""] * (max_cols - len(row))
+        safe_rows.append([("" if cell is None else str(cell)).replace("\n", " ").strip() for cell in padded])
+
+    header = safe_rows[0]
+    sep = ["---"] * len(header)
+    body = safe_rows[1:] if len(safe_rows) > 1 else []
+
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "| " + " | ".join(sep) + " |",
+    ]
+    for row in body:
+        lines.append("| " + " | ".join(row) + " |")
+    return "\n".join(lines)
+
+
+def extract_with_pymupdf(
+    pdf_path: Path, output_dir: Path, content: str = "all", phases: Optional[PhaseTimer] = None
+) -> Tuple[str, int, int, int, float]:
+    import fitz
+
+    phases = phases or PhaseTimer()
+    t0 = time.perf_counter()
+    text_parts: List[str] = []
+    image_count = 0
+    doc = fitz.open(pdf_path)
+    image_dir = output_dir / "images" / "pymupdf" / pdf_path.stem
+    if content == "all":
+        image_dir.mkdir(parents=True, exist_ok=True)
+    phases.lap("text")
+
+    for page_index, page in enumerate(doc, start=1):
+        text_parts.append(page.get_text("text") or "")
+        phases.lap("text")
+        if content != "all":
+            # Count the page's image references without decoding them
+            image_count += len(page.get_images(full=True))
+            phases.lap("images")
+            continue
+        for image_idx, image_info in enumerate(page.get_images(full=True), start=1):
+            xref = image_info[0]
+            base_image = doc.extract_image(xref)
+            img_bytes = base_image.get("image")
+            img_ext = base_image.get("ext", "png")
+            if not img_bytes:
+                continue
+            image_count += 1
+            img_file = image_dir / f"{pdf_path.stem}_p{page_index}_i{image_idx}.{img_ext}"
+            img_file.write_bytes(img_bytes)
+        phases.lap("images")
+
+    page_count = doc.page_count
+    doc.close()
+    elapsed = time.perf_counter() - t0
+    return PAGE_BREAK.join(text_parts), page_count, 0, image_count, elapsed
+
+
+def extract_with_pdfplumber(
+    pdf_path: Path, output_dir: Path, content: str = "all", phases: Optional[PhaseTimer] = None
+) -> Tuple[str, int, int, int, float, float]:
+    import pdfplumber
+
+    phases = phases or PhaseTimer()
+    t0 = time.perf_counter()
+    text_parts: List[str] = []
+    table_count = 0
+    valid_table_count = 0
+    image_count = 0
+    table_dir = output_dir / "tables" / pdf_path.stem
+    if content != "text":
+        table_dir.mkdir(parents=True, exist_ok=True)
+
+    with pdfplumber.open(pdf_path) as pdf:
+        phases.lap("text")
+        for page_idx, page in enumerate(pdf.pages, start=1):
+            text_parts.append(page.extract_text() or "")
+            phases.lap("text")
+            # pdfplumber never decodes images; this counts the parsed image objects
+            image_count += len(page.images or [])
+            phases.lap("images")
+
+            tables = (page.extract_tables() or []) if content != "text" else []
+            for table_idx, table in enumerate(tables, start=1):
+                table_count += 1
+                md = table_to_markdown(table)
+                if md and len(table or []) >= 2 and max((len(r) for r in table if r), default=0) >= 2:
+                    valid_table_count += 1
+                table_file = table_dir / f"{pdf_path.stem}_p{page_idx}_t{table_idx}.md"
+                table_file.write_text(md, encoding="utf-8")
+            phases.lap("tables")
+
+        page_count = len(pdf.pages)
+
+    elapsed = time.perf_counter() - t0
+    structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
+    return PAGE_BREAK.join(text_parts), page_count, table_count, image_count, elapsed, structure_pct
+
+
+def extract_with_pdfminer(pdf_path: Path, phases: Optional[PhaseTimer] = None) -> Tuple[str, int, int, int, float]:
+    from pdfminer.high_level import extract_text
+    from pdfminer.pdfpage import PDFPage
+
+    phases = phases or PhaseTimer()
+    t0 = time.perf_counter()
+    text = extract_text(str(pdf_path)) or ""
+    with pdf_path.open("rb") as f:
+        page_count = sum(1 for _ in PDFPage.get_pages(f))
+    phases.lap("text")
+    elapsed = time.perf_counter() - t0
+    return text, page_count, 0, 0, elapsed
+
+
+def extract_with_pypdf(
+    pdf_path: Path, output_dir: Path, content: str = "all", phases: Optional[PhaseTimer] = None
+) -> Tuple[str, int, int, int, float]:
+    from pypdf import PdfReader
+
+    phases = phases or PhaseTimer()
+    t0 = time.perf_counter()
+    text_parts: List[str] = []
+    image_count = 0
+
+    reader = PdfReader(str(pdf_path))
+    image_dir = output_dir / "images" / "pypdf" / pdf_path.stem
+    if content == "all":
+        image_dir.mkdir(parents=True, exist_ok=True)
+    phases.lap("text")
+
+    for page_idx, page in enumerate(reader.pages, start=1):
+        text_parts.append(page.extract_text() or "")
+        phases.lap("text")
+
+        page_images = getattr(page, "images", None)
+        if content != "all":
+            # Listing the page's images reads its resources; no image data is decoded
+            image_count += len(page_images or [])
+        elif page_images:
+            for image_idx, image_file in enumerate(page_images, start=1):
+                try:
+                    image_count += 1
+                    name = getattr(image_file, "name", f"img_{image_idx}.bin")
+                    img_bytes = getattr(image_file, "data", b"")
+                    if not img_bytes:
+                        continue
+                    out_file = image_dir / f"{pdf_path.stem}_p{page_idx}_i{image_idx}_{name}"
+                    out_file.write_bytes(img_bytes)
+                except Exception as image_err:
+                    LOGGER.warning("pypdf image save failed: %s", image_err)
+        phases.lap("images")
+
+    elapsed = time.perf_counter() - t0
+    return PAGE_BREAK.join(text_parts), len(reader.pages), 0, image_count, elapsed
+
+
+def run_extractor(
+    library: str, pdf_path: Path, output_dir: Path, content: str = "all"
+) -> Tuple[str, int, int, int, float, Dict[str, float]]:
+    """Run one library on one PDF.
+
+    Returns ``(text, pages, tables, images, table_structure_pct, phase_seconds)``, where
+    ``phase_seconds`` splits the run's wall time into "text", "tables" and "images". With
+    ``content`` "text" or "text+tables" images are counted but never decoded or written, and
+    "text" also skips table extraction.
+    """
+    phases = PhaseTimer()
+    if library == "pymupdf":
+        text, page_count, table_count, image_count, _ = extract_with_pymupdf(pdf_path, output_dir, content, phases)
+        return text, page_count, table_count, image_count, 0.0, phases.totals
+    if library == "pdfplumber":
+        text, page_count, table_count, image_count, _, structure_pct = extract_with_pdfplumber(
+            pdf_path, output_dir, content, phases
+        )
+        return text, page_count, table_count, image_count, structure_pct, phases.totals
+    if library == "pdfminer":
+        text, page_count, table_count, image_count, _ = extract_with_pdfminer(pdf_path, phases)
+        return text, page_count, table_count, image_count, 0.0, phases.totals
+    if library == "pypdf":
+        text, page_count, table_count, image_count, _ = extract_with_pypdf(pdf_path, output_dir, content, phases)
+        return text, page_count, table_count, image_count, 0.0, phases.totals
+    raise ValueError(f"Unknown library: {library}")
+
+
+@dataclass
+class RunStats:
+    wall_median: float
+    wall_p95: float
+    wall_stdev: float
+    cpu_median: float
+    peak_python_heap_mb: Optional[float]
+    runs: int
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of ``samples`` (``pct`` in 0-100)."""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * pct / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def measure_extraction(extract: Callable[[], tuple], warmup: int, repeat: int) -> Tuple[tuple, RunStats]:
+    """Run ``extract`` ``warmup`` times untimed, then ``repeat`` timed times.
+
+    Wall time (``perf_counter``) and process CPU time (``process_time``) are sampled per timed
+    run. The peak Python heap comes from the last warmup run, traced with ``tracemalloc``; its
+    overhead would distort the timings, so a timed run is never traced and no run is added for
+    it, and without warmup the peak is None. ``tracemalloc`` only sees allocations made through
+    Python's allocator, not those of C libraries such as MuPDF. Returns the last timed run's
+    result and the stats.
+    """
+    traced_peak: Optional[int] = None
+
+    def traced_run() -> tuple:
+        nonlocal traced_peak
+        tracemalloc.start()
+        try:
+            return extract()
+        finally:
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    for warmup_idx in range(warmup):
+        traced_run() if warmup_idx == warmup - 1 else extract()
+
+    wall_samples: List[float] = []
+    cpu_samples: List[float] = []
+    result: tuple = ()
+    for _ in range(max(repeat, 1)):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = extract()
+        wall_samples.append(time.perf_counter() - wall_start)
+        cpu_samples.append(time.process_time() - cpu_start)
+
+    stats = RunStats(
+        wall_median=statistics.median(wall_samples),
+        wall_p95=percentile(wall_samples, 95.0),
+        wall_stdev=statistics.stdev(wall_samples) if len(wall_samples) > 1 else 0.0,
+        cpu_median=statistics.median(cpu_samples),
+        peak_python_heap_mb=traced_peak / (1024 * 1024) if traced_peak is not None else None,
+        runs=len(wall_samples),
+    )
+    return result, stats
+
+
+def ensure_text_export(output_dir: Path, library: str, pdf_name: str, text: str) -> None:
+    text_dir = output_dir / "texts" / library
+    text_dir.mkdir(parents=True, exist_ok=True)
+    out_file = text_dir / f"{pdf_name}.txt"
+    out_file.write_text(text or "", encoding="utf-8")
+
+
+def compute_proxy_scores(rows: List[BenchmarkRow], text_map: Dict[Tuple[str, str], str]) -> None:
+    by_pdf: Dict[str, List[BenchmarkRow]] = {}
+    for row in rows:
+        by_pdf.setdefault(row.pdf_file, []).append(row)
+
+    for pdf_file, pdf_rows in by_pdf.items():
+        max_chars = max((r.text_chars for r in pdf_rows), default=0)
+        for row in pdf_rows:
+            row.text_coverage_pct = (row.text_chars / max_chars * 100.0) if max_chars > 0 else 0.0
+            peers = [r for r in pdf_rows if r.library != row.library and r.status == "ok"]
+            if not peers or row.status != "ok":
+                row.text_consensus_pct = 0.0
+                continue
+            base_text = text_map.get((pdf_file, row.library), "")
+            scores = []
+            for peer in peers:
+                peer_text = text_map.get((pdf_file, peer.library), "")
+                ratio, upper = similarity(base_text, peer_text)
+                if upper > ratio:
+                    LOGGER.info(
+                        "Consensus bound: %s | %s vs %s | %.4f <= exact <= %.4f",
+                        pdf_file,
+                        row.library,
+                        peer.library,
+                        ratio,
+                        upper,
+                    )
+                scores.append(ratio)
+            row.text_consensus_pct = (sum(scores) / len(scores) * 100.0) if scores else 0.0
+
+
+def write_csv(output_dir: Path, rows: List[BenchmarkRow]) -> Path:
+    csv_path = output_dir / "benchmark_results.csv"
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        fieldnames = list(asdict(rows[0]).keys()) if rows else list(BenchmarkRow.__annotations__.keys())
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(asdict(row))
+    return csv_path
+
+
+def write_markdown(output_dir: Path, rows: List[BenchmarkRow]) -> Path:
+    md_path = output_dir / "benchmark_results.md"
+    headers = [
+        "pdf_file",
+        "library",
+        "extract_time_sec",
+        "extract_time_p95_sec",
+        "extract_time_stdev_sec",
+        "cpu_time_sec",
+        "peak_python_heap_mb",
+        "runs",
+        "text_time_sec",
+        "image_time_sec",
+        "text_chars_per_sec",
+        "text_chars",
+        "text_coverage_pct",
+        "text_consensus_pct",
+        "table_count",
+        "table_structure_pct",
+        "image_count",
+        "status",
+    ]
+
+    lines = [
+        "# PDF Extractor Benchmark Results",
+        "",
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join(["---"] * len(headers)) + " |",
+    ]
+
+    def fmt(v):
+        if v is None:
+            return ""
+        if isinstance(v, float):
+            return f"{v:.3f}"
+        return str(v)
+
+    for row in rows:
+        data = asdict(row)
+        lines.append("| " + " | ".join(fmt(data[h]) for h in headers) + " |")
+
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    return md_path
+
+
+def output_paths(library: str, pdf_stem: str, content: str = "all") -> List[str]:
+    """Files an extractor writes for one PDF, relative to the output directory."""
+    paths = [f"texts/{library}/{pdf_stem}.txt"]
+    if library in ("pymupdf", "pypdf") and content == "all":
+        paths.append(f"images/{library}/{pdf_stem}")
+    if library == "pdfplumber" and content != "text":
+        paths.append(f"tables/{pdf_stem}")
+    return paths
+
+
+TABLE_MATCH_IOU = 0.5
+# Engines render spacing differently (a space glyph may come out as " ", "·" or a zero-width
+# character), so cells are compared on their letters and digits only
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def bbox_iou(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def match_tables(tables_a: List[tuple], tables_b: List[tuple]) -> List[Tuple[int, int]]:
+    """Pair ``(bbox, rows)`` tables of one page across engines, greedily by bbox overlap."""
+    candidates = sorted(
+        (
+            (bbox_iou(bbox_a, bbox_b), idx_a, idx_b)
+            for idx_a, (bbox_a, _) in enumerate(tables_a)
+            for idx_b, (bbox_b, _) in enumerate(tables_b)
+        ),
+        reverse=True,
+    )
+    pairs: List[Tuple[int, int]] = []
+    used_a, used_b = set(), set()
+    for iou, idx_a, idx_b in candidates:
+        if iou < TABLE_MATCH_IOU:
+            break
+        if idx_a in used_a or idx_b in used_b:
+            continue
+        used_a.add(idx_a)
+        used_b.add(idx_b)
+        pairs.append((idx_a, idx_b))
+    return pairs
+
+
+def table_cells(rows: List[List[Optional[str]]]) -> Dict[Tuple[int, int], str]:
+    """Non-empty cells of a table by ``(row, column)``, reduced to NFKC letters and digits."""
+    cells: Dict[Tuple[int, int], str] = {}
+    for row_idx, row in enumerate(rows or []):
+        for col_idx, cell in enumerate(row or []):
+            value = _NON_WORD.sub("", unicodedata.normalize("NFKC", "" if cell is None else str(cell))).lower()
+            if value:
+                cells[(row_idx, col_idx)] = value
+    return cells
+
+
+def cell_agreement(rows_a: List[List[Optional[str]]], rows_b: List[List[Optional[str]]]) -> Tuple[int, int]:
+    """``(compared, agreeing)`` cell positions of two tables; a position is compared when either side has text."""
+    cells_a, cells_b = table_cells(rows_a), table_cells(rows_b)
+    positions = cells_a.keys() | cells_b.keys()
+    agreeing = sum(1 for pos in positions if cells_a.get(pos) == cells_b.get(pos))
+    return len(positions), agreeing
+
+
+def compare_tables(pdf_path: Path) -> TableAgreementRow:
+    """Run pdfplumber's and PyMuPDF's table finders on every page and score their cell-level agreement.
+
+    Tables are paired per page by bbox overlap (IoU >= ``TABLE_MATCH_IOU``). Every non-empty
+    cell position of a pair counts once and agrees when both engines produced the same
+    letters and digits; unpaired tables count all their cells as disagreements.
+    """
+    import fitz
+    import pdfplumber
+
+    if hasattr(fitz, "no_recommend_layout"):
+        fitz.no_recommend_layout()
+    plumber_pages: List[List[tuple]] = []
+    t0 = time.perf_counter()
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            plumber_pages.append([(table.bbox, table.extract()) for table in page.find_tables()])
+            page.close()
+    plumber_time = time.perf_counter() - t0
+
+    fitz_pages: List[List[tuple]] = []
+    t0 = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            fitz_pages.append([(tuple(table.bbox), table.extract()) for table in page.find_tables().tables])
+    fitz_time = time.perf_counter() - t0
+
+    matched = same_shape = compared = agreeing = 0
+    for tables_a, tables_b in zip_longest(plumber_pages, fitz_pages, fillvalue=[]):
+        pairs = match_tables(tables_a, tables_b)
+        for idx_a, idx_b in pairs:
+            rows_a, rows_b = tables_a[idx_a][1], tables_b[idx_b][1]
+            matched += 1
+            shape_a = (len(rows_a), max((len(row) for row in rows_a), default=0))
+            shape_b = (len(rows_b), max((len(row) for row in rows_b), default=0))
+            same_shape += shape_a == shape_b
+            pair_compared, pair_agreeing = cell_agreement(rows_a, rows_b)
+            compared += pair_compared
+            agreeing += pair_agreeing
+        paired_a = {idx_a for idx_a, _ in pairs}
+        paired_b = {idx_b for _, idx_b in pairs}
+        for idx, (_, rows) in enumerate(tables_a):
+            if idx not in paired_a:
+                compared += len(table_cells(rows))
+        for idx, (_, rows) in enumerate(tables_b):
+            if idx not in paired_b:
+                compared += len(table_cells(rows))
+
+    return TableAgreementRow(
+        pdf_file=pdf_path.name,
+        page_count=len(fitz_pages),
+        pdfplumber_tables=sum(len(tables) for tables in plumber_pages),
+        pymupdf_tables=sum(len(tables) for tables in fitz_pages),
+        matched_tables=matched,
+        same_shape_tables=same_shape,
+        cells_compared=compared,
+        cell_agreement_pct=(agreeing / compared * 100.0) if compared else 100.0,
+        pdfplumber_time_sec=plumber_time,
+        pymupdf_time_sec=fitz_time,
+        status="ok",
+        error_message="",
+    )
+
+
+def run_table_agreement(input_dir: Path) -> List[TableAgreementRow]:
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found in: {input_dir}")
+    if not (is_installed("fitz") and is_installed("pdfplumber")):
+        raise RuntimeError("--table-agreement needs both pymupdf and pdfplumber installed")
+
+    rows: List[TableAgreementRow] = []
+    for pdf_path in pdf_files:
+        LOGGER.info("Comparing tables: %s", pdf_path.name)
+        try:
+            row = compare_tables(pdf_path)
+        except Exception as err:
+            LOGGER.exception("Failed: %s | table agreement", pdf_path.name)
+            row = TableAgreementRow(
+                pdf_file=pdf_path.name,
+                page_count=0,
+                pdfplumber_tables=0,
+                pymupdf_tables=0,
+                matched_tables=0,
+                same_shape_tables=0,
+                cells_compared=0,
+                cell_agreement_pct=0.0,
+                pdfplumber_time_sec=0.0,
+                pymupdf_time_sec=0.0,
+                status="error",
+                error_message=str(err).replace("\n", " ")[:500],
+            )
+        else:
+            LOGGER.info(
+                "Done: %s | tables pdfplumber %d / pymupdf %d, %d matched | cell agreement %.1f%% | %.3fs vs %.3fs",
+                pdf_path.name,
+                row.pdfplumber_tables,
+                row.pymupdf_tables,
+                row.matched_tables,
+                row.cell_agreement_pct,
+                row.pdfplumber_time_sec,
+                row.pymupdf_time_sec,
+            )
+        rows.append(row)
+    return rows
+
+
+def write_table_agreement(output_dir: Path, rows: List[TableAgreementRow]) -> Tuple[Path, Path]:
+    csv_path = output_dir / "table_agreement.csv"
+    fieldnames = list(TableAgreementRow.__annotations__.keys())
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(asdict(row))
+
+    ok_rows = [row for row in rows if row.status == "ok"]
+    compared = sum(row.cells_compared for row in ok_rows)
+    agreeing = sum(row.cells_compared * row.cell_agreement_pct / 100.0 for row in ok_rows)
+    headers = fieldnames[:-1]
+    lines = [
+        "# Table Agreement: pdfplumber vs PyMuPDF",
+        "",
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join(["---"] * len(headers)) + " |",
+    ]
+    for row in rows:
+        data = asdict(row)
+        lines.append("| " + " | ".join(f"{data[h]:.3f}" if isinstance(data[h], float) else str(data[h]) for h in headers) + " |")
+    lines += [
+        "",
+        f"- Overall cell agreement: {(agreeing / compared * 100.0) if compared else 100.0:.1f}% over {compared} cell(s)",
+        f"- Table finding time: pdfplumber {sum(r.pdfplumber_time_sec for r in ok_rows):.3f}s, "
+        f"pymupdf {sum(r.pymupdf_time_sec for r in ok_rows):.3f}s",
+    ]
+    md_path = output_dir / "table_agreement.md"
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    return csv_path, md_path
+
+
+def compare_grouping(pdf_path: Path) -> GroupingFidelityRow:
+    """Lay out every page with pdfminer's stock LAParams analysis and with ``vector_layout``.
+
+    Both engines group the same ``LTChar`` objects from one interpretation pass, so the times
+    are layout analysis only and any text difference is the grouping's.
+    """
+    if str(PARSER_DIR) not in sys.path:
+        sys.path.insert(0, str(PARSER_DIR))
+    from pdfminer.layout import LAParams, LTTextContainer
+    import vector_layout
+
+    laparams = LAParams()
+    stock_pages: List[str] = []
+    numpy_pages: List[str] = []
+    stock_time = numpy_time = 0.0
+    for page in vector_layout.iter_char_pages(str(pdf_path)):
+        t0 = time.perf_counter()
+        numpy_pages.append(vector_layout.page_text(vector_layout.PageChars.from_ltpage(page)).strip())
+        t1 = time.perf_counter()
+        page.analyze(laparams)
+        stock_pages.append("".join(el.get_text() for el in page if isinstance(el, LTTextContainer)).strip())
+        t2 = time.perf_counter()
+        numpy_time += t1 - t0
+        stock_time += t2 - t1
+
+    ratio, _ = similarity(PAGE_BREAK.join(stock_pages), PAGE_BREAK.join(numpy_pages))
+    return GroupingFidelityRow(
+        pdf_file=pdf_path.name,
+        page_count=len(stock_pages),
+        identical_pages=sum(a == b for a, b in zip(stock_pages, numpy_pages)),
+        text_similarity_pct=ratio * 100.0,
+        stock_layout_sec=stock_time,
+        numpy_layout_sec=numpy_time,
+        status="ok",
+        error_message="",
+    )
+
+
+def time_box_ordering(count: int) -> Tuple[float, float]:
+    """Seconds pdfminer's ``group_textboxes`` and ``vector_layout.order_boxes`` take on
+    ``count`` random text boxes (fixed seed).
+
+    Sample pages carry a few dozen boxes; overlapping random ones defer most pairs, the worst
+    case of the merge for both engines.
+    """
+    if str(PARSER_DIR) not in sys.path:
+        sys.path.insert(0, str(PARSER_DIR))
+    import numpy as np
+    from pdfminer.layout import LAParams, LTLayoutContainer, LTTextBoxHorizontal
+    import vector_layout
+
+    rng = np.random.default_rng(0)
+    x0, y0 = rng.uniform(0, 500, count), rng.uniform(0, 750, count)
+    boxes = np.column_stack((x0, y0, x0 + rng.uniform(20, 200, count), y0 + rng.uniform(8, 40, count)))
+    stock_boxes = []
+    for bbox in boxes.tolist():
+        box = LTTextBoxHorizontal()
+        box.set_bbox(tuple(bbox))
+        stock_boxes.append(box)
+
+    t0 = time.perf_counter()
+    LTLayoutContainer((0, 0, 800, 1000)).group_textboxes(LAParams(), stock_boxes)
+    t1 = time.perf_counter()
+    vector_layout.order_boxes(boxes)
+    t2 = time.perf_counter()
+    return t1 - t0, t2 - t1
+
+
+def run_grouping_fidelity(input_dir: Path) -> List[GroupingFidelityRow]:
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found in: {input_dir}")
+    if not is_installed("pdfminer"):
+        raise RuntimeError("--grouping-fidelity needs pdfminer.six installed")
+
+    rows: List[GroupingFidelityRow] = []
+    for pdf_path in pdf_files:
+        LOGGER.info("Comparing character grouping: %s", pdf_path.name)
+        try:
+            row = compare_grouping(pdf_path)
+        except Exception as err:
+            LOGGER.exception("Failed: %s | grouping fidelity", pdf_path.name)
+            row = GroupingFidelityRow(
+                pdf_file=pdf_path.name,
+                page_count=0,
+                identical_pages=0,
+                text_similarity_pct=0.0,
+                stock_layout_sec=0.0,
+                numpy_layout_sec=0.0,
+                status="error",
+                error_message=str(err).replace("\n", " ")[:500],
+            )
+        else:
+            LOGGER.info(
+                "Done: %s | %d/%d page(s) identical | similarity %.2f%% | layout %.3fs stock vs %.3fs numpy",
+                pdf_path.name,
+                row.identical_pages,
+                row.page_count,
+                row.text_similarity_pct,
+                row.stock_layout_sec,
+                row.numpy_layout_sec,
+            )
+        rows.append(row)
+    return rows
+
+
+def write_grouping_fidelity(
+    output_dir: Path, rows: List[GroupingFidelityRow], box_times: Dict[int, Tuple[float, float]]
+) -> Tuple[Path, Path]:
+    """``box_times`` maps a box count to the (stock, numpy) seconds of ``time_box_ordering``."""
+    csv_path = output_dir / "grouping_fidelity.csv"
+    fieldnames = list(GroupingFidelityRow.__annotations__.keys())
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(asdict(row))
+
+    ok_rows = [row for row in rows if row.status == "ok"]
+    headers = fieldnames[:-1]
+    lines = [
+        "# Character Grouping Fidelity: pdfminer LAParams vs NumPy",
+        "",
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join(["---"] * len(headers)) + " |",
+    ]
+    for row in rows:
+        data = asdict(row)
+        lines.append("| " + " | ".join(f"{data[h]:.3f}" if isinstance(data[h], float) else str(data[h]) for h in headers) + " |")
+    lines += [
+        "",
+        f"- Identical pages: {sum(r.identical_pages for r in ok_rows)}/{sum(r.page_count for r in ok_rows)}",
+        f"- Layout analysis time: stock {sum(r.stock_layout_sec for r in ok_rows):.3f}s, "
+        f"numpy {sum(r.numpy_layout_sec for r in ok_rows):.3f}s",
+    ]
+    lines += [
+        f"- Box ordering on {count} random boxes: stock {stock_sec:.3f}s, numpy {numpy_sec:.3f}s"
+        for count, (stock_sec, numpy_sec) in box_times.items()
+    ]
+    md_path = output_dir / "grouping_fidelity.md"
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    return csv_path, md_path
+
+
+def run_benchmark(
+    input_dir: Path,
+    output_dir: Path,
+    cache: Optional[ExtractionCache] = None,
+    warmup: int = 1,
+    repeat: int = 1,
+    content: str = "all",
+) -> List[BenchmarkRow]:
+    pdf_files = sorted(input_dir.glob("*.pdf"))
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found in: {input_dir}")
+
+    extractors = {
+        "pymupdf": {"module": "fitz", "dists": ["pymupdf"]},
+        "pdfplumber": {"module": "pdfplumber", "dists": ["pdfplumber", "pdfminer.six"]},
+        "pdfminer": {"module": "pdfminer", "dists": ["pdfminer.six"]},
+        "pypdf": {"module": "pypdf", "dists": ["pypdf"]},
+    }
+    code_digest = file_digest(Path(__file__).read_bytes())
+
+    rows: List[BenchmarkRow] = []
+    text_map: Dict[Tuple[str, str], str] = {}
+
+    for pdf_path in pdf_files:
+        LOGGER.info("Processing PDF: %s", pdf_path.name)
+        pdf_digest = file_digest(pdf_path.read_bytes()) if cache is not None else ""
+
+        for library, meta in extractors.items():
+            if not is_installed(meta["module"]):
+                LOGGER.warning("Library not installed, skipping: %s", library)
+                rows.append(
+                    BenchmarkRow(
+                        pdf_file=pdf_path.name,
+                        library=library,
+                        page_count=0,
+                        extract_time_sec=0.0,
+                        extract_time_p95_sec=0.0,
+                        extract_time_stdev_sec=0.0,
+                        cpu_time_sec=0.0,
+                        peak_python_heap_mb=None,
+                        runs=0,
+                        text_time_sec=0.0,
+                        image_time_sec=0.0,
+                        text_chars_per_sec=0.0,
+                        text_chars=0,
+                        text_coverage_pct=0.0,
+                        text_consensus_pct=0.0,
+                        table_count=0,
+                        table_structure_pct=0.0,
+                        image_count=0,
+                        status="skipped",
+                        error_message="module_not_installed",
+                    )
+                )
+                continue
+
+            cache_key = None
+            if cache is not None:
+                cache_key = ExtractionCache.make_key(
+                    pdf_digest,
+                    library,
+                    library_versions(meta["dists"]),
+                    code_digest,
+                    {"warmup": warmup, "repeat": repeat, "content": content},
+                )
+                cached = cache.restore(cache_key, output_dir)
+                if cached is not None:
+                    LOGGER.info("Cache hit: %s | %s", pdf_path.name, library)
+                    text_file = output_dir / "texts" / library / f"{pdf_path.stem}.txt"
+                    text_map[(pdf_path.name, library)] = text_file.read_text(encoding="utf-8")
+                    rows.append(BenchmarkRow(**cached))
+                    continue
+
+            try:
+                extract = partial(run_extractor, library, pdf_path, output_dir, content)
+                result, stats = measure_extraction(extract, warmup, repeat)
+                text, page_count, table_count, image_count, structure_pct, phase_seconds = result
+                # Phase split of the last timed run: text throughput apart from image handling
+                text_time = phase_seconds.get("text", 0.0)
+
+                ensure_text_export(output_dir, library, pdf_path.stem, text)
+                text_map[(pdf_path.name, library)] = text
+
+                rows.append(
+                    BenchmarkRow(
+                        pdf_file=pdf_path.name,
+                        library=library,
+                        page_count=page_count,
+                        extract_time_sec=stats.wall_median,
+                        extract_time_p95_sec=stats.wall_p95,
+                        extract_time_stdev_sec=stats.wall_stdev,
+                        cpu_time_sec=stats.cpu_median,
+                        peak_python_heap_mb=stats.peak_python_heap_mb,
+                        runs=stats.runs,
+                        text_time_sec=text_time,
+                        image_time_sec=phase_seconds.get("images", 0.0),
+                        text_chars_per_sec=len(text) / text_time if text_time > 0 else 0.0,
+                        text_chars=len(text),
+                        text_coverage_pct=0.0,
+                        text_consensus_pct=0.0,
+                        table_count=table_count,
+                        table_structure_pct=structure_pct,
+                        image_count=image_count,
+                        status="ok",
+                        error_message="",
+                    )
+                )
+                if cache is not None:
+                    cache.store(cache_key, output_dir, output_paths(library, pdf_path.stem, content), asdict(rows[-1]))
+                LOGGER.info(
+                    "Done: %s | %s | median %.3fs | p95 %.3fs | cpu %.3fs | peak Python heap %s | %d run(s)",
+                    pdf_path.name,
+                    library,
+                    stats.wall_median,
+                    stats.wall_p95,
+                    stats.cpu_median,
+                    f"{stats.peak_python_heap_mb:.1f}MB" if stats.peak_python_heap_mb is not None else "n/a",
+                    stats.runs,
+                )
+
+            except Exception as err:
+                LOGGER.exception("Failed: %s | %s", pdf_path.name, library)
+                rows.append(
+                    BenchmarkRow(
+                        pdf_file=pdf_path.name,
+                        library=library,
+                        page_count=0,
+                        extract_time_sec=0.0,
+                        extract_time_p95_sec=0.0,
+                        extract_time_stdev_sec=0.0,
+                        cpu_time_sec=0.0,
+                        peak_python_heap_mb=None,
+                        runs=0,
+                        text_time_sec=0.0,
+                        image_time_sec=0.0,
+                        text_chars_per_sec=0.0,
+                        text_chars=0,
+                        text_coverage_pct=0.0,
+                        text_consensus_pct=0.0,
+                        table_count=0,
+                        table_structure_pct=0.0,
+                        image_count=0,
+                        status="error",
+                        error_message=str(err).replace("\n", " ")[:500],
+                    )
+                )
+
+    compute_proxy_scores(rows, text_map)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction libraries.")
+    parser.add_argument("--input-dir", type=Path, default=Path("dataset"), help="Directory containing PDF files.")
+    parser.add_argument("--output-dir", type=Path, default=Path("outputs"), help="Directory to store results.")
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Untimed runs per (PDF, library) before measuring; the last one is traced for peak_python_heap_mb, which stays empty with 0.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per (PDF, library); reports median, p95 and stdev.")
+    parser.add_argument(
+        "--content",
+        choices=CONTENT_CHOICES,
+        default="all",
+        help="What to extract: text only, text and tables, or everything (images are counted but not decoded unless 'all').",
+    )
+    parser.add_argument(
+        "--table-agreement",
+        action="store_true",
+        help="Instead of the benchmark, compare pdfplumber's and PyMuPDF's tables cell by cell on every page.",
+    )
+    parser.add_argument(
+        "--grouping-fidelity",
+        action="store_true",
+        help="Instead of the benchmark, compare the NumPy character grouping (--char-grouping numpy) with pdfminer's stock LAParams text on every page.",
+    )
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Extraction cache directory.")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_MB, help="Evict least-recently-used cache entries above this size.")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-extract; do not read or write the extraction cache.")
+    args = parser.parse_args()
+
+    setup_logging(args.output_dir)
+
+    LOGGER.info("Starting benchmark...")
+    LOGGER.info("Input directory: %s", args.input_dir.resolve())
+    LOGGER.info("Output directory: %s", args.output_dir.resolve())
+
+    if args.table_agreement:
+        csv_path, md_path = write_table_agreement(args.output_dir, run_table_agreement(args.input_dir))
+        LOGGER.info("Table agreement completed.")
+        LOGGER.info("CSV report: %s", csv_path.resolve())
+        LOGGER.info("Markdown report: %s", md_path.resolve())
+        return
+    if args.grouping_fidelity:
+        rows = run_grouping_fidelity(args.input_dir)
+        box_times = {}
+        for count in BOX_ORDERING_COUNTS:
+            box_times[count] = time_box_ordering(count)
+            LOGGER.info("Box ordering on %d random boxes: %.3fs stock vs %.3fs numpy", count, *box_times[count])
+        csv_path, md_path = write_grouping_fidelity(args.output_dir, rows, box_times)
+        LOGGER.info("Grouping fidelity completed.")
+        LOGGER.info("CSV report: %s", csv_path.resolve())
+        LOGGER.info("Markdown report: %s", md_path.resolve())
+        return
+
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    rows = run_benchmark(args.input_dir, args.output_dir, cache, args.warmup, args.repeat, args.content)
+    if cache is not None:
+        cache.evict()
+    csv_path = write_csv(args.output_dir, rows)
+    md_path = write_markdown(args.output_dir, rows)
+
+    LOGGER.info("Benchmark completed.")
+    LOGGER.info("CSV report: %s", csv_path.resolve())
+    LOGGER.info("Markdown report: %s", md_path.resolve())
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from importlib import metadata
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("extraction-cache")
+
+DEFAULT_CACHE_DIR = Path(".extraction_cache")
+DEFAULT_MAX_MB = 2048
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def library_versions(dist_names: list[str]) -> dict[str, str]:
+    versions = {}
+    for name in dist_names:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = "not-installed"
+    return versions
+
+
+def tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ExtractionCache:
+    """Content-addressed store of per-(PDF, parser) extraction results.
+
+    An entry is keyed on the PDF content hash, the parser name, the versions of the libraries
+    it uses, a hash of the parser code and the output-relevant options. It holds the
+    benchmark row and copies of the output files, so a hit restores them without
+    re-extracting. Entries are evicted least-recently-used first once the cache grows past
+    ``max_bytes``; ``evict()`` is meant to be called once at the end of a run.
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(pdf_digest: str, parser_name: str, versions: dict, code_digest: str, options: dict) -> str:
+        payload = {
+            "pdf": pdf_digest,
+            "parser": parser_name,
+            "versions": versions,
+            "code": code_digest,
+            "options": options,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def restore(self, key: str, output_dir: Path) -> dict | None:
+        """Copy a cached entry's files into ``output_dir`` and return its row, or None on a miss."""
+        entry = self.entry_dir(key)
+        row_path = entry / "row.json"
+        try:
+            record = json.loads(row_path.read_text(encoding="utf-8"))
+            for rel in record["paths"]:
+                src = entry / "files" / rel
+                dst = output_dir / rel
+                if not src.exists():
+                    continue
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                if src.is_dir():
+                    if dst.exists():
+                        shutil.rmtree(dst)
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copy2(src, dst)
+            os.utime(row_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return record["row"]
+
+    def store(self, key: str, output_dir: Path, rel_paths: list[str], row: dict) -> None:
+        """Save ``row`` and copies of ``rel_paths`` (files or directories under ``output_dir``)."""
+        entry = self.entry_dir(key)
+        tmp = self.root / "tmp" / uuid.uuid4().hex
+        try:
+            files_dir = tmp / "files"
+            files_dir.mkdir(parents=True)
+            for rel in rel_paths:
+                src = output_dir / rel
+                dst = files_dir / rel
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                if src.is_dir():
+                    shutil.copytree(src, dst)
+                elif src.exists():
+                    shutil.copy2(src, dst)
+            record = {"row": row, "paths": rel_paths, "size": tree_size(files_dir)}
+            (tmp / "row.json").write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            if entry.exists():
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except OSError as err:
+            LOGGER.warning("Cache store failed for %s — %s", key[:12], err)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for shard in self.root.iterdir() if self.root.exists() else []:
+            if not shard.is_dir() or shard.name == "tmp":
+                continue
+            for entry in shard.iterdir():
+                row_path = entry / "row.json"
+                try:
+                    last_used = row_path.stat().st_mtime
+                    size = json.loads(row_path.read_text(encoding="utf-8"))["size"]
+                except (OSError, ValueError, KeyError):
+                    last_used, size = 0.0, tree_size(entry)
+                entries.append((last_used, size, entry))
+                total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            LOGGER.info("Cache evicted %s (%.1f MB)", entry.name[:12], size / (1024 * 1024))
@@ -0,0 +1,89 @@
+import io
+from dataclasses import dataclass, field
+from typing import Container
+
+import fitz
+
+from pdf_input import PdfInput
+
+
+@dataclass
+class PageInfo:
+    width: float
+    height: float
+    image_xrefs: list[int] = field(default_factory=list)
+
+
+class DocumentSession:
+    """One PDF read from disk once and inventoried in a single fitz pass.
+
+    ``run_parsers_cli`` builds a session per PDF and hands it to every parser's
+    ``process_pdf``. Parsers open their text engine on ``stream()`` instead of the path and
+    take page images from ``page_images`` instead of opening and decoding the file with fitz
+    themselves, so only the text engine work is repeated per parser. The bytes come from a
+    ``PdfInput``, which also decides whether the file is small enough to hold in memory.
+
+    With ``preload_images=False`` (stream mode) the pass only records image xrefs; images are
+    decoded on request and not kept, so the session's memory does not grow with the document.
+    """
+
+    def __init__(self, source: PdfInput, preload_images: bool = True):
+        self.source = source
+        self.pdf_path = source.path
+        self.pages: list[PageInfo] = []
+        self.images: dict[int, tuple[str, bytes]] = {}
+        self._doc = source.open_fitz()
+
+        for page in self._doc:
+            info = PageInfo(width=page.rect.width, height=page.rect.height)
+            for image_info in page.get_images(full=True):
+                xref = image_info[0]
+                if preload_images and xref not in self.images:
+                    self.images[xref] = self._extract(xref)
+                if not preload_images or self.images[xref][1]:
+                    info.image_xrefs.append(xref)
+            self.pages.append(info)
+
+        if preload_images:
+            self.close()
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def stream(self) -> io.BytesIO | str:
+        return self.source.stream()
+
+    def open_fitz(self) -> fitz.Document:
+        return self.source.open_fitz()
+
+    def page_image_xrefs(self, page_index: int) -> list[int]:
+        """Xrefs of a page's images, for counting without decoding them."""
+        return self.pages[page_index].image_xrefs
+
+    def page_images(self, page_index: int, known_xrefs: Container[int] = ()) -> list[tuple[int, str, bytes]]:
+        """Return a page's images as ``(xref, ext, bytes)``.
+
+        Xrefs in ``known_xrefs`` (already written by the caller) come back with empty
+        ``ext``/``bytes`` when they would otherwise have to be decoded again.
+        """
+        images = []
+        for xref in self.pages[page_index].image_xrefs:
+            if xref in self.images:
+                images.append((xref, *self.images[xref]))
+            elif xref in known_xrefs:
+                images.append((xref, "", b""))
+            else:
+                ext, img_bytes = self._extract(xref)
+                if img_bytes:
+                    images.append((xref, ext, img_bytes))
+        return images
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def _extract(self, xref: int) -> tuple[str, bytes]:
+        img_dict = self._doc.extract_image(xref)
+        return img_dict.get("ext", "png"), img_dict.get("image", b"")
@@ -0,0 +1,370 @@
+import argparse
+import json
+import logging
+import time
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Callable, Container, Iterator
+
+import fitz
+import pdfplumber
+
+from doc_session import DocumentSession
+from image_store import ImageStore, PageImageReader
+from markdown_writer import MarkdownWriter
+from output_sink import OutputSink
+from page_shards import extract_sharded
+from record_writer import RecordWriter, records_path
+import reports
+from run_options import RunOptions, add_run_arguments, options_from_args
+from stage_timing import StageClock, StageTimer, timings_path
+from table_markdown import is_valid_table, table_to_markdown
+from table_prefilter import fitz_table_score
+import vector_tables
+
+
+LOGGER = logging.getLogger("hybrid-parser")
+
+
+def progress_label(current: int, total: int) -> str:
+    if total <= 0:
+        return "0/0 (0.0%)"
+    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def write_reports(output_dir: Path, rows: list[dict]) -> None:
+    reports.write_reports(output_dir, rows, "Hybrid (PyMuPDF + pdfplumber)")
+
+
+def error_row(pdf_path: Path, err: BaseException) -> dict:
+    return reports.error_row(pdf_path, err, "hybrid")
+
+
+def engines_path(output_dir: Path, pdf_stem: str) -> Path:
+    return output_dir / f"{pdf_stem}.engines.jsonl"
+
+
+class PlumberPages:
+    """Opens the pdfplumber document on first use, so PDFs with no routed page never parse it."""
+
+    def __init__(self, opener: Callable[[], pdfplumber.PDF]):
+        self._opener = opener
+        self._pdf = None
+
+    def page(self, page_idx: int):
+        if self._pdf is None:
+            self._pdf = self._opener()
+        return self._pdf.pages[page_idx]
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+def iter_pages(
+    doc: fitz.Document,
+    start: int,
+    stop: int,
+    image_source,
+    plumber: PlumberPages,
+    known_xrefs: Container[int] = (),
+    table_threshold: int = 0,
+    table_audit: bool = False,
+    with_tables: bool = True,
+    with_images: bool = True,
+    vector_finder: bool = False,
+) -> Iterator[dict]:
+    """Yield one entry per page: text and images from PyMuPDF, tables from pdfplumber.
+
+    A page goes to pdfplumber only when its fitz ruling-line score reaches
+    ``table_threshold`` (every page when it is 0). ``table_audit`` also runs pdfplumber on
+    the other pages, only to count the tables the routing cost. Without ``with_tables`` no
+    page goes to pdfplumber, and without ``with_images`` images are only listed by xref.
+    ``vector_finder`` finds the tables with ``vector_tables`` instead of pdfplumber's finder.
+    """
+    for page_idx in range(start, stop):
+        clock = StageClock()
+        page = doc[page_idx]
+        text = (page.get_text("text") or "").strip()
+        clock.lap("text")
+        score = fitz_table_score(page) if with_tables and table_threshold > 0 else None
+        routed = with_tables and (score is None or score >= table_threshold)
+        if with_tables:
+            clock.lap("route")
+        tables, table_bboxes = [], []
+        missed = 0
+        if with_tables and (routed or table_audit):
+            plumber_page = plumber.page(page_idx)
+            if vector_finder:
+                found = vector_tables.find_tables(plumber_page)
+            else:
+                found = plumber_page.find_tables()
+            if routed:
+                tables = vector_tables.table_rows(found)
+                table_bboxes = [table.bbox for table in found]
+            else:
+                missed = len(found)
+            plumber_page.close()
+            clock.lap("tables" if routed else "table_audit")
+        if with_images:
+            page_images, image_xrefs = image_source.page_images(page_idx, known_xrefs), []
+        else:
+            page_images, image_xrefs = [], image_source.page_image_xrefs(page_idx)
+        clock.lap("images")
+        yield {
+            "text": text,
+            "bbox": tuple(page.rect),
+            "tables": tables,
+            "table_bboxes": table_bboxes,
+            "engine": "pymupdf+pdfplumber" if routed else "pymupdf",
+            "table_score": score,
+            "tables_missed": missed,
+            "images": page_images,
+            "image_xrefs": image_xrefs,
+            "timings": clock.timings,
+        }
+
+
+def extract_page_range(
+    pdf_path: Path,
+    start: int,
+    stop: int,
+    table_threshold: int = 0,
+    table_audit: bool = False,
+    with_tables: bool = True,
+    with_images: bool = True,
+    vector_finder: bool = False,
+) -> list[dict]:
+    """Shard worker: extract pages ``[start, stop)`` with document handles of its own."""
+    plumber = PlumberPages(partial(pdfplumber.open, pdf_path))
+    try:
+        with fitz.open(pdf_path) as doc:
+            return list(
+                iter_pages(
+                    doc,
+                    start,
+                    stop,
+                    PageImageReader(doc),
+                    plumber,
+                    (),
+                    table_threshold,
+                    table_audit,
+                    with_tables,
+                    with_images,
+                    vector_finder,
+                )
+            )
+    finally:
+        plumber.close()
+
+
+def render_page(page_idx: int, page: dict, images: ImageStore) -> str:
+    page_lines: list[str] = [f"## Page {page_idx}", ""]
+    if page["text"]:
+        page_lines.append(page["text"])
+        page_lines.append("")
+
+    for table in page["tables"]:
+        page_lines.append(table_to_markdown(table))
+        page_lines.append("")
+
+    for xref, ext, img_bytes in page["images"]:
+        page_lines.append(images.add(xref, ext, img_bytes))
+
+    return "\n".join(page_lines)
+
+
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int = 1,
+    total_files: int = 1,
+    options: RunOptions | None = None,
+    session: DocumentSession | None = None,
+) -> dict:
+    """Convert one PDF, writing ``<stem>.engines.jsonl`` with the engine(s) used for each page."""
+    options = options or RunOptions()
+    LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
+    start = time.perf_counter()
+    try:
+        image_dir = output_dir / f"{pdf_path.stem}_images"
+        if options.with_images:
+            image_dir.mkdir(parents=True, exist_ok=True)
+
+        table_count = 0
+        valid_table_count = 0
+        routed_pages = 0
+        missed_tables = 0
+        engine_lines: list[str] = []
+        with ExitStack() as stack:
+            sink = stack.enter_context(OutputSink(options.writer_threads))
+            timer = stack.enter_context(StageTimer(timings_path(output_dir, pdf_path.stem), pdf_path.name, "hybrid"))
+            images = ImageStore(image_dir, pdf_path.stem, sink)
+            with timer.stage("open"):
+                doc = stack.enter_context(session.open_fitz() if session else fitz.open(pdf_path))
+                if session:
+                    plumber = PlumberPages(lambda: pdfplumber.open(session.stream()))
+                else:
+                    plumber = PlumberPages(partial(pdfplumber.open, pdf_path))
+                stack.callback(plumber.close)
+            md_writer = stack.enter_context(MarkdownWriter(output_dir / f"{pdf_path.stem}.md", options.stream, sink))
+            records = None
+            if options.records:
+                records_file = records_path(output_dir, pdf_path.stem, options.records)
+                records = stack.enter_context(RecordWriter(records_file, pdf_path.stem, "hybrid", sink))
+
+            page_count = doc.page_count
+            if options.shard_pages and page_count > options.shard_pages:
+                extract_range = partial(
+                    extract_page_range,
+                    table_threshold=options.table_threshold,
+                    table_audit=options.table_audit,
+                    with_tables=options.with_tables,
+                    with_images=options.with_images,
+                    vector_finder=options.table_finder == "numpy",
+                )
+                pages = extract_sharded(
+                    extract_range, pdf_path, page_count, options.shard_pages, options.shard_worker_count()
+                )
+            else:
+                pages = iter_pages(
+                    doc,
+                    0,
+                    page_count,
+                    session or PageImageReader(doc),
+                    plumber,
+                    images.links,
+                    options.table_threshold,
+                    options.table_audit,
+                    options.with_tables,
+                    options.with_images,
+                    options.table_finder == "numpy",
+                )
+
+            for page_idx, page in enumerate(pages, start=1):
+                timer.record_page(page_idx, page["timings"])
+                routed_pages += page["engine"] != "pymupdf"
+                missed_tables += page["tables_missed"]
+                for xref in page["image_xrefs"]:
+                    images.count(xref)
+                for table in page["tables"]:
+                    table_count += 1
+                    if is_valid_table(table):
+                        valid_table_count += 1
+                engine_lines.append(
+                    json.dumps(
+                        {
+                            "pdf": pdf_path.name,
+                            "page": page_idx,
+                            "engine": page["engine"],
+                            "table_score": page["table_score"],
+                            "tables": len(page["tables"]),
+                        }
+                    )
+                )
+                with timer.stage("write", page_idx) as event:
+                    image_bytes = images.bytes_written
+                    section = render_page(page_idx, page, images)
+                    md_writer.add(section)
+                    if records:
+                        records.add_page(
+                            page_idx,
+                            page["text"],
+                            page["bbox"],
+                            page["tables"],
+                            page["table_bboxes"],
+                            [images.files[xref] for xref, _, _ in page["images"]],
+                        )
+                    event.bytes_written = len(section.encode("utf-8")) + images.bytes_written - image_bytes
+
+            text_chars = md_writer.close()
+            if records:
+                records.close()
+            sink.write_text(engines_path(output_dir, pdf_path.stem), "".join(line + "\n" for line in engine_lines))
+
+            # Extraction time stops here; waiting for the background writes is the "flush" stage
+            elapsed = time.perf_counter() - start
+            with timer.stage("flush"):
+                sink.flush()
+
+        structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
+        LOGGER.info(
+            "Routed %d/%d page(s) of %s to pdfplumber%s",
+            routed_pages,
+            page_count,
+            pdf_path.name,
+            f", {missed_tables} table(s) missed" if options.table_audit else "",
+        )
+        LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
+
+        return {
+            "pdf_file": pdf_path.name,
+            "library": "hybrid",
+            "page_count": page_count,
+            "extract_time_sec": elapsed,
+            "text_chars": text_chars,
+            "text_coverage_pct": 0.0,
+            "text_consensus_pct": 0.0,
+            "table_count": table_count,
+            "table_structure_pct": structure_pct,
+            "table_pages_skipped": page_count - routed_pages if options.with_tables else "",
+            "tables_missed": missed_tables if options.with_tables and options.table_audit else "",
+            "image_count": images.total_count,
+            "unique_image_count": images.unique_count,
+            "status": "ok",
+            "error_message": "",
+        }
+    except Exception as err:
+        LOGGER.exception("Failed on %s", pdf_path.name)
+        return error_row(pdf_path, err)
+
+
+def run(pdf_files: list[Path], output_dir: Path, options: RunOptions | None = None) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: list[dict] = []
+    total_files = len(pdf_files)
+    LOGGER.info("Start hybrid run: %d files", total_files)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        rows.append(process_pdf(pdf_path, output_dir, idx, total_files, options))
+
+    write_reports(output_dir, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hybrid PDF to Markdown converter: PyMuPDF text/images, pdfplumber tables")
+    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "hybrid")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    input_path: Path = args.input
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    setup_logging(args.output_dir)
+    run(pdf_files, args.output_dir, options_from_args(args))
+
+
+if __name__ == "__main__":
+    main()
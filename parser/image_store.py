@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Container
+
+from output_sink import OutputSink
+
+if TYPE_CHECKING:
+    import fitz
+
+
+def extract_page_images(doc: "fitz.Document", page: "fitz.Page", seen: dict[int, bool]) -> list[tuple[int, str, bytes]]:
+    """List a page's images as ``(xref, ext, bytes)``.
+
+    ``seen`` maps every xref met so far in the document to whether it produced image bytes.
+    An xref is only decoded on its first occurrence; later occurrences are returned with
+    empty ``ext``/``bytes`` so the caller can reuse what it already wrote.
+    """
+    images: list[tuple[int, str, bytes]] = []
+    for image_info in page.get_images(full=True):
+        xref = image_info[0]
+        if xref in seen:
+            if seen[xref]:
+                images.append((xref, "", b""))
+            continue
+        img_dict = doc.extract_image(xref)
+        img_bytes = img_dict.get("image", b"")
+        ext = img_dict.get("ext", "png")
+        seen[xref] = bool(img_bytes)
+        if img_bytes:
+            images.append((xref, ext, img_bytes))
+    return images
+
+
+class PageImageReader:
+    """Reads page images from an open fitz document, decoding each xref once."""
+
+    def __init__(self, doc: "fitz.Document"):
+        self.doc = doc
+        self.seen_xrefs: dict[int, bool] = {}
+
+    def page_images(self, page_index: int, known_xrefs: Container[int] = ()) -> list[tuple[int, str, bytes]]:
+        return extract_page_images(self.doc, self.doc[page_index], self.seen_xrefs)
+
+    def page_image_xrefs(self, page_index: int) -> list[int]:
+        """Xrefs of a page's images, read from its resources without decoding them."""
+        return [image_info[0] for image_info in self.doc[page_index].get_images(full=True)]
+
+
+class ImageStore:
+    """Writes each distinct image of one document once and hands out its Markdown link.
+
+    Images are keyed by PDF xref and numbered in order of first appearance; every later
+    occurrence reuses the same link, and ``files`` holds the image's path relative to the
+    output directory. ``total_count`` counts all occurrences and ``bytes_written`` the image
+    bytes put on disk. Files are written through ``sink`` when
+    one is given. In the text-only content modes images are only ``count``ed, never written.
+    """
+
+    def __init__(self, image_dir: Path, pdf_stem: str, sink: OutputSink | None = None):
+        self.image_dir = image_dir
+        self.pdf_stem = pdf_stem
+        self.sink = sink or OutputSink(threads=0)
+        self.links: dict[int, str] = {}
+        self.files: dict[int, str] = {}
+        self.counted: set[int] = set()
+        self.total_count = 0
+        self.bytes_written = 0
+
+    @property
+    def unique_count(self) -> int:
+        return len(self.links.keys() | self.counted)
+
+    def count(self, xref: int) -> None:
+        self.total_count += 1
+        self.counted.add(xref)
+
+    def add(self, xref: int, ext: str, img_bytes: bytes) -> str:
+        self.total_count += 1
+        link = self.links.get(xref)
+        if link is None:
+            number = len(self.links) + 1
+            img_filename = f"{number:03d}.{ext}"
+            self.sink.write_bytes(self.image_dir / img_filename, img_bytes)
+            self.bytes_written += len(img_bytes)
+            self.files[xref] = f"{self.pdf_stem}_images/{img_filename}"
+            link = f"![Image {number}]({self.files[xref]})"
+            self.links[xref] = link
+        return link
@@ -0,0 +1,144 @@
+import re
+from collections import Counter
+
+import fitz
+
+
+# Span flag bit MuPDF sets for bold fonts
+BOLD_FLAG = 16
+# Text at least this many times the page's body size is a heading; "## Page N" is level 2
+HEADING_RATIOS = ((1.5, "###"), (1.2, "####"))
+# A short all-bold block at body size or larger is a minor heading
+BOLD_HEADING_MAX_CHARS = 80
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+BULLET = re.compile(r"^\s*[•◦▪▫●○■□◆◇▶▷►‣∙·※\-–*ㅇ]\s+")
+NUMBERED = re.compile(r"^\s*(\d{1,3})[.)]\s+")
+ENUMERATED = re.compile(r"^\s*(?:\(\d{1,3}\)|[①-⑳]|[가-하][.)]|[a-zA-Z][.)])\s+")
+
+
+def _line_text(line: dict) -> str:
+    return "".join(span["text"] for span in line["spans"]).strip()
+
+
+def body_size(blocks: list[dict]) -> float:
+    """The font size carrying the most characters on the page."""
+    sizes: Counter = Counter()
+    for block in blocks:
+        for line in block["lines"]:
+            for span in line["spans"]:
+                sizes[round(span["size"], 1)] += len(span["text"].strip())
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def heading_prefix(block: dict, text: str, body: float) -> str | None:
+    spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+    if not spans or body <= 0:
+        return None
+    chars = sum(len(span["text"].strip()) for span in spans)
+    size = sum(span["size"] * len(span["text"].strip()) for span in spans) / chars
+    ratio = size / body
+    for min_ratio, prefix in HEADING_RATIOS:
+        if ratio >= min_ratio and len(text) <= 200:
+            return prefix
+    bold = all(span["flags"] & BOLD_FLAG for span in spans)
+    if bold and ratio >= 1.0 and len(block["lines"]) <= 2 and len(text) <= BOLD_HEADING_MAX_CHARS:
+        return "####"
+    return None
+
+
+def list_item(line: str) -> str | None:
+    """The Markdown list item a line starts, or None when it continues the previous one."""
+    match = BULLET.match(line)
+    if match:
+        return "- " + line[match.end() :]
+    match = NUMBERED.match(line)
+    if match:
+        return f"{match.group(1)}. " + line[match.end() :]
+    if ENUMERATED.match(line):
+        return "- " + line.strip()
+    return None
+
+
+def block_markdown(block: dict, body: float) -> str:
+    """Markdown for one text block: a heading, or paragraphs and list items."""
+    lines = [text for text in (_line_text(line) for line in block["lines"]) if text]
+    if not lines:
+        return ""
+    prefix = heading_prefix(block, " ".join(lines), body)
+    if prefix:
+        return f"{prefix} {' '.join(lines)}"
+
+    # (is_list_item, text) parts; continuation lines join the part above them
+    parts: list[tuple[bool, str]] = []
+    for line in lines:
+        item = list_item(line)
+        if item is not None:
+            parts.append((True, item))
+        elif parts:
+            parts[-1] = (parts[-1][0], f"{parts[-1][1]} {line}")
+        else:
+            parts.append((False, line))
+    markdown = parts[0][1]
+    for (prev_item, _), (is_item, text) in zip(parts, parts[1:]):
+        markdown += ("\n" if prev_item and is_item else "\n\n") + text
+    return markdown
+
+
+def text_layout(page: fitz.Page) -> list[tuple[str, str, tuple]]:
+    """``("text", markdown, bbox)`` items of a page, from a single TextPage pass.
+
+    Text comes from the page's dict extraction (headings inferred from font size and weight
+    against the page's body size, paragraphs, list items), with its block's bbox. The TextPage
+    leaves out image blocks, which would split the text blocks around inline images.
+    """
+    textpage = page.get_textpage(flags=TEXT_FLAGS)
+    blocks = [block for block in textpage.extractDICT(sort=True)["blocks"] if block["type"] == 0]
+    body = body_size(blocks)
+    items = []
+    for block in blocks:
+        markdown = block_markdown(block, body)
+        if markdown:
+            items.append(("text", markdown, tuple(block["bbox"])))
+    return items
+
+
+def image_layout(page: fitz.Page, image_items: list) -> list[tuple[str, int, tuple | None]]:
+    """``("image", xref, bbox)`` items for ``get_images(full=True)`` entries, one per xref.
+
+    Each image is placed by the bbox of its first drawing (None for an image that is never
+    drawn), read from one image-only TextPage and matched to its xref by pixel size; images
+    are not decoded here. Only xrefs sharing a size on the page fall back to
+    ``get_image_bbox``, which interprets the page and hashes every image once per call.
+    """
+    unique: dict[int, tuple] = {}
+    for item in image_items:
+        unique.setdefault(item[0], item)
+    if not unique:
+        return []
+    by_size: Counter = Counter((item[2], item[3]) for item in unique.values())
+    drawn: dict[tuple[int, int], fitz.Rect] = {}
+    for info in page.get_textpage(flags=fitz.TEXT_PRESERVE_IMAGES).extractIMGINFO():
+        drawn.setdefault((info["width"], info["height"]), fitz.Rect(info["bbox"]))
+
+    items = []
+    for xref, item in unique.items():
+        size = (item[2], item[3])
+        if by_size[size] == 1:
+            bbox = drawn.get(size)
+        else:
+            try:
+                bbox = page.get_image_bbox(item)
+            except (ValueError, RuntimeError):
+                bbox = None
+        if bbox is None or bbox.is_infinite or bbox.is_empty:
+            items.append(("image", xref, None))
+        else:
+            items.append(("image", xref, tuple(bbox)))
+    return items
+
+
+def reading_order(items: list[tuple[str, object, tuple | None]]) -> list[tuple[str, object, tuple | None]]:
+    """Layout items top to bottom, then left to right; items without a bbox go last."""
+    placed = sorted((item for item in items if item[2] is not None), key=lambda item: (item[2][1], item[2][0]))
+    return placed + [item for item in items if item[2] is None]
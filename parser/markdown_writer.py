@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from output_sink import OutputSink
+
+
+class MarkdownWriter:
+    """Writes a document's page sections to one Markdown file, separated by blank lines.
+
+    By default sections are buffered and written on ``close()``. With ``stream=True`` every
+    section is appended to the file as soon as it is added, so memory stays flat however
+    many pages the document has. The file content is the same either way.
+
+    With a ``sink`` the actual writes run on the sink's threads, in order; the file is only
+    complete once the sink has been flushed.
+    """
+
+    def __init__(self, path: Path, stream: bool = False, sink: OutputSink | None = None):
+        self.path = path
+        self.text_chars = 0
+        self.section_count = 0
+        self._parts: list[str] = []
+        self._sink = sink or OutputSink(threads=0)
+        self._file = path.open("w", encoding="utf-8") if stream else None
+
+    def add(self, section: str) -> None:
+        if self.section_count:
+            section = "\n\n" + section
+        self.section_count += 1
+        self.text_chars += len(section)
+        if self._file is not None:
+            self._sink.submit(self._file.write, section, key=self.path)
+        else:
+            self._parts.append(section)
+
+    def close(self) -> int:
+        """Finish the file and return the number of characters written."""
+        if self._file is not None:
+            self._sink.submit(self._file.close, key=self.path)
+            self._file = None
+        else:
+            self._sink.write_text(self.path, "".join(self._parts))
+            self._parts = []
+        return self.text_chars
+
+    def __enter__(self) -> "MarkdownWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and self._file is not None:
+            self._sink.submit(self._file.close, key=self.path)
+            self._file = None
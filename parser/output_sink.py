@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Hashable
+
+
+class OutputSink:
+    """Runs file writes on a small thread pool so the extraction loop does not wait on disk.
+
+    Jobs that share a ``key`` (e.g. appends to one Markdown file) run in submission order;
+    other jobs run concurrently. At most ``max_pending`` jobs are queued or running at once:
+    ``submit`` blocks beyond that, so a slow disk throttles extraction instead of letting
+    page data pile up in memory. ``flush()`` waits for every job and re-raises the first write
+    error, so callers only report success once everything is on disk.
+
+    With ``threads=0`` every job runs inline in the caller, which is the old behaviour.
+    """
+
+    def __init__(self, threads: int = 4, max_pending: int = 64):
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="output-sink") if threads > 0 else None
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._lock = threading.Lock()
+        self._pending: set[Future] = set()
+        self._last_by_key: dict[Hashable, Future] = {}
+        self._error: BaseException | None = None
+
+    def submit(self, fn: Callable, *args, key: Hashable | None = None, **kwargs) -> None:
+        if self._pool is None:
+            fn(*args, **kwargs)
+            return
+
+        self._slots.acquire()
+        with self._lock:
+            previous = self._last_by_key.get(key) if key is not None else None
+            # The pool's queue is FIFO, so ``previous`` is already running or done by the time
+            # this job starts; waiting on it cannot deadlock.
+            future = self._pool.submit(self._run_after, previous, fn, args, kwargs)
+            self._pending.add(future)
+            if key is not None:
+                self._last_by_key[key] = future
+        future.add_done_callback(partial(self._job_done, key))
+
+    def write_bytes(self, path: Path, data: bytes) -> None:
+        self.submit(path.write_bytes, data, key=path)
+
+    def write_text(self, path: Path, text: str) -> None:
+        self.submit(path.write_text, text, encoding="utf-8", key=path)
+
+    def flush(self) -> None:
+        """Wait for all submitted writes and raise the first one that failed."""
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                break
+            for future in pending:
+                future.exception()
+        with self._lock:
+            self._last_by_key.clear()
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+    @staticmethod
+    def _run_after(previous: Future | None, fn: Callable, args: tuple, kwargs: dict) -> None:
+        if previous is not None:
+            previous.exception()
+        fn(*args, **kwargs)
+
+    def _job_done(self, key: Hashable | None, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+            if key is not None and self._last_by_key.get(key) is future:
+                del self._last_by_key[key]
+            if future.exception() is not None and self._error is None:
+                self._error = future.exception()
+        self._slots.release()
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # Already failing: still wait for the writes in flight, but keep the original error
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+
+def page_ranges(page_count: int, shard_pages: int) -> list[tuple[int, int]]:
+    """Split ``range(page_count)`` into consecutive ``(start, stop)`` ranges of ``shard_pages`` pages."""
+    if shard_pages <= 0 or page_count <= shard_pages:
+        return [(0, page_count)]
+    return [(start, min(start + shard_pages, page_count)) for start in range(0, page_count, shard_pages)]
+
+
+def extract_sharded(
+    extract_range: Callable[[Path, int, int], list],
+    pdf_path: Path,
+    page_count: int,
+    shard_pages: int,
+    workers: int,
+) -> Iterator:
+    """Run ``extract_range(pdf_path, start, stop)`` over page shards in worker processes.
+
+    ``extract_range`` must be a module-level function returning one entry per page. The
+    per-page entries are yielded in page order, so callers can render them exactly as they
+    would the output of a single serial ``extract_range(pdf_path, 0, page_count)`` call.
+    Each shard's result is dropped as soon as its pages have been yielded.
+    """
+    ranges = page_ranges(page_count, shard_pages)
+    if len(ranges) == 1 or workers <= 1:
+        for start, stop in ranges:
+            yield from extract_range(pdf_path, start, stop)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(extract_range, pdf_path, start, stop) for start, stop in ranges]
+        for shard_idx, future in enumerate(futures):
+            yield from future.result()
+            futures[shard_idx] = None
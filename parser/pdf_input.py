@@ -0,0 +1,51 @@
+import hashlib
+import io
+from pathlib import Path
+
+
+DEFAULT_MAX_MB = 1024
+_DIGEST_CHUNK = 1024 * 1024
+
+
+class PdfInput:
+    """One PDF as handed to the extraction engines: read from disk once, or opened by path.
+
+    A file up to ``max_bytes`` is read into memory with a single read. Every engine then
+    opens that same buffer: fitz through ``open_fitz()``, and pdfplumber, pdfminer and
+    pypdf through ``stream()``. However many engines look at the file, it is read once.
+
+    A larger file is not held in memory. ``stream()`` then returns its path, which all three
+    engines accept, so each one reads the file itself as before.
+    """
+
+    def __init__(self, pdf_path: Path, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = pdf_path
+        self.data: bytes | None = None
+        if max_bytes > 0 and pdf_path.stat().st_size <= max_bytes:
+            self.data = pdf_path.read_bytes()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+    def stream(self) -> io.BytesIO | str:
+        """A BytesIO view of the PDF, or its path when it is too large to hold in memory."""
+        return io.BytesIO(self.data) if self.data is not None else str(self.path)
+
+    def open_fitz(self):
+        import fitz
+
+        if self.data is not None:
+            return fitz.open(stream=self.data, filetype="pdf")
+        return fitz.open(self.path)
+
+    def digest(self) -> str:
+        """SHA-256 of the file, the same value as ``extraction_cache.file_digest`` of its bytes."""
+        if self.data is not None:
+            return hashlib.sha256(self.data).hexdigest()
+        digest = hashlib.sha256()
+        with self.path.open("rb") as f:
+            for chunk in iter(lambda: f.read(_DIGEST_CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
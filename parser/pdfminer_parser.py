@@ -1,188 +1,195 @@
-import argparse
-import csv
-import logging
-import time
-from pathlib import Path
-
-import fitz
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer
-from pdfminer.pdfpage import PDFPage
-
-
-LOGGER = logging.getLogger("pdfminer-parser")
-
-
-def progress_label(current: int, total: int) -> str:
-    if total <= 0:
-        return "0/0 (0.0%)"
-    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
-
-
-def setup_logging(output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
-    )
-
-
-def write_reports(output_dir: Path, rows: list[dict]) -> None:
-    csv_path = output_dir / "benchmark_results.csv"
-    md_path = output_dir / "benchmark_results.md"
-    fields = [
-        "pdf_file",
-        "library",
-        "page_count",
-        "extract_time_sec",
-        "text_chars",
-        "text_coverage_pct",
-        "text_consensus_pct",
-        "table_count",
-        "table_structure_pct",
-        "image_count",
-        "status",
-        "error_message",
-    ]
-
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    lines = [
-        "# pdfminer.six Benchmark Results",
-        "",
-        "| " + " | ".join(fields[:-1]) + " |",
-        "| " + " | ".join(["---"] * (len(fields) - 1)) + " |",
-    ]
-    for row in rows:
-        values = []
-        for key in fields[:-1]:
-            value = row[key]
-            if isinstance(value, float):
-                values.append(f"{value:.3f}")
-            else:
-                values.append(str(value))
-        lines.append("| " + " | ".join(values) + " |")
-
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-
-
-def run(pdf_files: list[Path], output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    rows: list[dict] = []
-    total_files = len(pdf_files)
-    LOGGER.info("Start pdfminer run: %d files", total_files)
-
-    for idx, pdf_path in enumerate(pdf_files, start=1):
-        LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
-        start = time.perf_counter()
-        try:
-            image_dir = output_dir / f"{pdf_path.stem}_images"
-            image_dir.mkdir(parents=True, exist_ok=True)
-
-            # Extract text per page using pdfminer
-            page_layouts = list(extract_pages(str(pdf_path)))
-            page_count = len(page_layouts)
-
-            # Extract images using fitz (pdfminer has no image API)
-            fitz_doc = fitz.open(pdf_path)
-            page_image_refs: list[list[str]] = [[] for _ in range(page_count)]
-            image_count = 0
-            for page_idx in range(page_count):
-                fitz_page = fitz_doc[page_idx]
-                for image_info in fitz_page.get_images(full=True):
-                    xref = image_info[0]
-                    img_dict = fitz_doc.extract_image(xref)
-                    img_bytes = img_dict.get("image", b"")
-                    ext = img_dict.get("ext", "png")
-                    if not img_bytes:
-                        continue
-                    image_count += 1
-                    img_filename = f"{image_count:03d}.{ext}"
-                    (image_dir / img_filename).write_bytes(img_bytes)
-                    rel = f"{pdf_path.stem}_images/{img_filename}"
-                    page_image_refs[page_idx].append(f"![Image {image_count}]({rel})")
-            fitz_doc.close()
-
-            md_parts: list[str] = []
-            for page_idx, page_layout in enumerate(page_layouts, start=1):
-                page_text = "".join(
-                    el.get_text() for el in page_layout if isinstance(el, LTTextContainer)
-                ).strip()
-                page_lines: list[str] = [f"## Page {page_idx}", ""]
-                if page_text:
-                    page_lines.append(page_text)
-                    page_lines.append("")
-                page_lines.extend(page_image_refs[page_idx - 1])
-                md_parts.append("\n".join(page_lines))
-
-            md_text = "\n\n".join(md_parts)
-            (output_dir / f"{pdf_path.stem}.md").write_text(md_text, encoding="utf-8")
-            elapsed = time.perf_counter() - start
-            LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pdfminer",
-                    "page_count": page_count,
-                    "extract_time_sec": elapsed,
-                    "text_chars": len(md_text),
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": image_count,
-                    "status": "ok",
-                    "error_message": "",
-                }
-            )
-        except Exception as err:
-            LOGGER.exception("Failed on %s", pdf_path.name)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pdfminer",
-                    "page_count": 0,
-                    "extract_time_sec": 0.0,
-                    "text_chars": 0,
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": 0,
-                    "status": "error",
-                    "error_message": str(err)[:500],
-                }
-            )
-
-    write_reports(output_dir, rows)
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="pdfminer PDF to Markdown converter")
-    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
-    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pdfminer")
-    args = parser.parse_args()
-
-    input_path: Path = args.input
-    if input_path.is_file():
-        pdf_files = [input_path]
-    elif input_path.is_dir():
-        pdf_files = sorted(input_path.glob("*.pdf"))
-    else:
-        raise FileNotFoundError(f"Input not found: {input_path}")
-
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found: {input_path}")
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    setup_logging(args.output_dir)
-    run(pdf_files, args.output_dir)
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import logging
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import fitz
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer
+from pdfminer.pdfpage import PDFPage
+
+from doc_session import DocumentSession
+from image_store import ImageStore, PageImageReader
+from markdown_writer import MarkdownWriter
+from output_sink import OutputSink
+from record_writer import RecordWriter, records_path
+import reports
+from run_options import RunOptions, add_run_arguments, options_from_args
+from stage_timing import StageClock, StageTimer, timings_path
+import vector_layout
+
+
+LOGGER = logging.getLogger("pdfminer-parser")
+
+
+def progress_label(current: int, total: int) -> str:
+    if total <= 0:
+        return "0/0 (0.0%)"
+    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def write_reports(output_dir: Path, rows: list[dict]) -> None:
+    reports.write_reports(output_dir, rows, "pdfminer.six")
+
+
+def error_row(pdf_path: Path, err: BaseException) -> dict:
+    return reports.error_row(pdf_path, err, "pdfminer")
+
+
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int = 1,
+    total_files: int = 1,
+    options: RunOptions | None = None,
+    session: DocumentSession | None = None,
+) -> dict:
+    options = options or RunOptions()
+    LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
+    start = time.perf_counter()
+    try:
+        image_dir = output_dir / f"{pdf_path.stem}_images"
+        if options.with_images:
+            image_dir.mkdir(parents=True, exist_ok=True)
+
+        page_count = 0
+
+        with ExitStack() as stack:
+            sink = stack.enter_context(OutputSink(options.writer_threads))
+            timer = stack.enter_context(StageTimer(timings_path(output_dir, pdf_path.stem), pdf_path.name, "pdfminer"))
+            images = ImageStore(image_dir, pdf_path.stem, sink)
+            # Extract images using fitz (pdfminer has no image API), unless the shared session already did
+            with timer.stage("open"):
+                if session:
+                    image_source = session
+                else:
+                    image_source = PageImageReader(stack.enter_context(fitz.open(pdf_path)))
+            md_writer = stack.enter_context(MarkdownWriter(output_dir / f"{pdf_path.stem}.md", options.stream, sink))
+            records = None
+            if options.records:
+                records_file = records_path(output_dir, pdf_path.stem, options.records)
+                records = stack.enter_context(RecordWriter(records_file, pdf_path.stem, "pdfminer", sink))
+
+            # Extract text per page using pdfminer, one page layout at a time; the layout analysis
+            # runs inside the generator, so it is counted in the page's "text" stage. The numpy
+            # grouping takes the pages without layout analysis and groups their characters itself
+            source = session.stream() if session else str(pdf_path)
+            vector = options.char_grouping == "numpy"
+            page_layouts = vector_layout.iter_char_pages(source) if vector else extract_pages(source)
+            clock = StageClock()
+            for page_idx, page_layout in enumerate(page_layouts, start=1):
+                if vector:
+                    page_text = vector_layout.page_text(vector_layout.PageChars.from_ltpage(page_layout)).strip()
+                else:
+                    page_text = "".join(
+                        el.get_text() for el in page_layout if isinstance(el, LTTextContainer)
+                    ).strip()
+                clock.lap("text")
+                if options.with_images:
+                    page_images = image_source.page_images(page_idx - 1, images.links)
+                else:
+                    page_images = []
+                    for xref in image_source.page_image_xrefs(page_idx - 1):
+                        images.count(xref)
+                clock.lap("images")
+                timer.record_page(page_idx, clock.timings)
+
+                with timer.stage("write", page_idx) as event:
+                    image_bytes = images.bytes_written
+                    page_lines: list[str] = [f"## Page {page_idx}", ""]
+                    if page_text:
+                        page_lines.append(page_text)
+                        page_lines.append("")
+                    for xref, ext, img_bytes in page_images:
+                        page_lines.append(images.add(xref, ext, img_bytes))
+                    section = "\n".join(page_lines)
+                    md_writer.add(section)
+                    if records:
+                        records.add_page(
+                            page_idx,
+                            page_text,
+                            page_layout.bbox,
+                            image_files=[images.files[xref] for xref, _, _ in page_images],
+                        )
+                    event.bytes_written = len(section.encode("utf-8")) + images.bytes_written - image_bytes
+                page_count = page_idx
+                clock.take()
+
+            text_chars = md_writer.close()
+            if records:
+                records.close()
+
+            # Extraction time stops here; waiting for the background writes is the "flush" stage
+            elapsed = time.perf_counter() - start
+            with timer.stage("flush"):
+                sink.flush()
+
+        LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
+        return {
+            "pdf_file": pdf_path.name,
+            "library": "pdfminer",
+            "page_count": page_count,
+            "extract_time_sec": elapsed,
+            "text_chars": text_chars,
+            "text_coverage_pct": 0.0,
+            "text_consensus_pct": 0.0,
+            "table_count": 0,
+            "table_structure_pct": 0.0,
+            "image_count": images.total_count,
+            "unique_image_count": images.unique_count,
+            "status": "ok",
+            "error_message": "",
+        }
+    except Exception as err:
+        LOGGER.exception("Failed on %s", pdf_path.name)
+        return error_row(pdf_path, err)
+
+
+def run(pdf_files: list[Path], output_dir: Path, options: RunOptions | None = None) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: list[dict] = []
+    total_files = len(pdf_files)
+    LOGGER.info("Start pdfminer run: %d files", total_files)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        rows.append(process_pdf(pdf_path, output_dir, idx, total_files, options))
+
+    write_reports(output_dir, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pdfminer PDF to Markdown converter")
+    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pdfminer")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    input_path: Path = args.input
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    setup_logging(args.output_dir)
+    run(pdf_files, args.output_dir, options_from_args(args))
+
+
+if __name__ == "__main__":
+    main()
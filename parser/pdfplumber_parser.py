@@ -1,213 +1,327 @@
-import argparse
-import csv
-import logging
-import time
-from pathlib import Path
-
-import fitz
-import pdfplumber
-
-
-LOGGER = logging.getLogger("pdfplumber-parser")
-
-
-def progress_label(current: int, total: int) -> str:
-    if total <= 0:
-        return "0/0 (0.0%)"
-    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
-
-
-def setup_logging(output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
-    )
-
-
-def table_to_markdown(table: list[list[str]]) -> str:
-    if not table:
-        return ""
-    max_cols = max(len(row) for row in table)
-    normalized = []
-    for row in table:
-        padded = row + [""] * (max_cols - len(row))
-        normalized.append([("" if cell is None else str(cell)).replace("\n", " ").strip() for cell in padded])
-    header = normalized[0]
-    lines = [
-        "| " + " | ".join(header) + " |",
-        "| " + " | ".join(["---"] * len(header)) + " |",
-    ]
-    for row in normalized[1:]:
-        lines.append("| " + " | ".join(row) + " |")
-    return "\n".join(lines)
-
-
-def write_reports(output_dir: Path, rows: list[dict]) -> None:
-    csv_path = output_dir / "benchmark_results.csv"
-    md_path = output_dir / "benchmark_results.md"
-    fields = [
-        "pdf_file",
-        "library",
-        "page_count",
-        "extract_time_sec",
-        "text_chars",
-        "text_coverage_pct",
-        "text_consensus_pct",
-        "table_count",
-        "table_structure_pct",
-        "image_count",
-        "status",
-        "error_message",
-    ]
-
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    lines = [
-        "# pdfplumber Benchmark Results",
-        "",
-        "| " + " | ".join(fields[:-1]) + " |",
-        "| " + " | ".join(["---"] * (len(fields) - 1)) + " |",
-    ]
-    for row in rows:
-        values = []
-        for key in fields[:-1]:
-            value = row[key]
-            if isinstance(value, float):
-                values.append(f"{value:.3f}")
-            else:
-                values.append(str(value))
-        lines.append("| " + " | ".join(values) + " |")
-
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-
-
-def run(pdf_files: list[Path], output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    rows: list[dict] = []
-    total_files = len(pdf_files)
-    LOGGER.info("Start pdfplumber run: %d files", total_files)
-
-    for idx, pdf_path in enumerate(pdf_files, start=1):
-        LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
-        start = time.perf_counter()
-        try:
-            image_dir = output_dir / f"{pdf_path.stem}_images"
-            image_dir.mkdir(parents=True, exist_ok=True)
-
-            md_parts: list[str] = []
-            table_count = 0
-            valid_table_count = 0
-            image_count = 0
-
-            fitz_doc = fitz.open(pdf_path)
-
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_idx, page in enumerate(pdf.pages, start=1):
-                    page_text = (page.extract_text() or "").strip()
-                    page_lines: list[str] = [f"## Page {page_idx}", ""]
-                    if page_text:
-                        page_lines.append(page_text)
-                        page_lines.append("")
-
-                    tables = page.extract_tables() or []
-                    for table_idx, table in enumerate(tables, start=1):
-                        table_count += 1
-                        if table and len(table) >= 2 and max((len(r) for r in table if r), default=0) >= 2:
-                            valid_table_count += 1
-                        page_lines.append(table_to_markdown(table))
-                        page_lines.append("")
-
-                    fitz_page = fitz_doc[page_idx - 1]
-                    for image_info in fitz_page.get_images(full=True):
-                        xref = image_info[0]
-                        img_dict = fitz_doc.extract_image(xref)
-                        img_bytes = img_dict.get("image", b"")
-                        ext = img_dict.get("ext", "png")
-                        if not img_bytes:
-                            continue
-                        image_count += 1
-                        img_filename = f"{image_count:03d}.{ext}"
-                        (image_dir / img_filename).write_bytes(img_bytes)
-                        rel = f"{pdf_path.stem}_images/{img_filename}"
-                        page_lines.append(f"![Image {image_count}]({rel})")
-
-                    md_parts.append("\n".join(page_lines))
-
-                page_count = len(pdf.pages)
-
-            fitz_doc.close()
-
-            md_text = "\n\n".join(md_parts)
-            (output_dir / f"{pdf_path.stem}.md").write_text(md_text, encoding="utf-8")
-            structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
-            elapsed = time.perf_counter() - start
-            LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
-
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pdfplumber",
-                    "page_count": page_count,
-                    "extract_time_sec": elapsed,
-                    "text_chars": len(md_text),
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": table_count,
-                    "table_structure_pct": structure_pct,
-                    "image_count": image_count,
-                    "status": "ok",
-                    "error_message": "",
-                }
-            )
-        except Exception as err:
-            LOGGER.exception("Failed on %s", pdf_path.name)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pdfplumber",
-                    "page_count": 0,
-                    "extract_time_sec": 0.0,
-                    "text_chars": 0,
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": 0,
-                    "status": "error",
-                    "error_message": str(err)[:500],
-                }
-            )
-
-    write_reports(output_dir, rows)
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="pdfplumber PDF to Markdown converter")
-    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
-    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pdfplumber")
-    args = parser.parse_args()
-
-    input_path: Path = args.input
-    if input_path.is_file():
-        pdf_files = [input_path]
-    elif input_path.is_dir():
-        pdf_files = sorted(input_path.glob("*.pdf"))
-    else:
-        raise FileNotFoundError(f"Input not found: {input_path}")
-
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found: {input_path}")
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    setup_logging(args.output_dir)
-    run(pdf_files, args.output_dir)
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import logging
+import time
+from contextlib import ExitStack
+from functools import partial
+from pathlib import Path
+from typing import Container, Iterable, Iterator
+
+import fitz
+import pdfplumber
+
+from doc_session import DocumentSession
+from image_store import ImageStore, PageImageReader
+from markdown_writer import MarkdownWriter
+from output_sink import OutputSink
+from page_shards import extract_sharded
+from record_writer import RecordWriter, records_path
+import reports
+from run_options import RunOptions, add_run_arguments, options_from_args
+from stage_timing import StageClock, StageTimer, timings_path
+from table_markdown import is_valid_table, table_to_markdown
+from table_prefilter import table_score
+import vector_layout
+import vector_tables
+
+
+LOGGER = logging.getLogger("pdfplumber-parser")
+
+
+def progress_label(current: int, total: int) -> str:
+    if total <= 0:
+        return "0/0 (0.0%)"
+    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def write_reports(output_dir: Path, rows: list[dict]) -> None:
+    reports.write_reports(output_dir, rows, "pdfplumber")
+
+
+def error_row(pdf_path: Path, err: BaseException) -> dict:
+    return reports.error_row(pdf_path, err, "pdfplumber")
+
+
+def iter_pages(
+    plumber_pages: Iterable,
+    image_source,
+    known_xrefs: Container[int] = (),
+    table_threshold: int = 0,
+    table_audit: bool = False,
+    with_tables: bool = True,
+    with_images: bool = True,
+    vector_grouping: bool = False,
+    vector_finder: bool = False,
+) -> Iterator[dict]:
+    """Yield one entry per page; ``image_source`` is a PageImageReader or DocumentSession.
+
+    With a ``table_threshold``, ``find_tables`` only runs on pages whose ruling-line score
+    (see ``table_prefilter``) reaches it. ``table_audit`` runs it on the skipped pages too,
+    only to count the tables the prefilter cost. Without ``with_tables`` no table work is done
+    at all, and without ``with_images`` images are only listed by xref, not decoded. With
+    ``vector_grouping`` the text is the page's characters grouped by ``vector_layout``, in
+    pdfminer's LAParams order, instead of ``extract_text``; with ``vector_finder`` tables come
+    from ``vector_tables``. Each page's cached layout objects are flushed as soon as its entry
+    is built.
+    """
+    find_tables = vector_tables.find_tables if vector_finder else pdfplumber.page.Page.find_tables
+    for page in plumber_pages:
+        clock = StageClock()
+        if vector_grouping:
+            text = vector_layout.page_text(vector_layout.PageChars.from_plumber(page.chars)).strip()
+        else:
+            text = (page.extract_text() or "").strip()
+        clock.lap("text")
+        tables, found = [], []
+        skip_tables = False
+        missed = 0
+        if with_tables:
+            if table_threshold > 0:
+                skip_tables = table_score(page) < table_threshold
+                clock.lap("table_scan")
+            found = [] if skip_tables else find_tables(page)
+            tables = vector_tables.table_rows(found)
+            clock.lap("tables")
+            if skip_tables and table_audit:
+                missed = len(find_tables(page))
+                clock.lap("table_audit")
+        if with_images:
+            page_images, image_xrefs = image_source.page_images(page.page_number - 1, known_xrefs), []
+        else:
+            page_images, image_xrefs = [], image_source.page_image_xrefs(page.page_number - 1)
+        clock.lap("images")
+        page.close()
+        yield {
+            "text": text,
+            "bbox": page.bbox,
+            "tables": tables,
+            "table_bboxes": [table.bbox for table in found],
+            "tables_skipped": skip_tables,
+            "tables_missed": missed,
+            "images": page_images,
+            "image_xrefs": image_xrefs,
+            "timings": clock.timings,
+        }
+
+
+def extract_page_range(
+    pdf_path: Path,
+    start: int,
+    stop: int,
+    table_threshold: int = 0,
+    table_audit: bool = False,
+    with_tables: bool = True,
+    with_images: bool = True,
+    vector_grouping: bool = False,
+    vector_finder: bool = False,
+) -> list[dict]:
+    """Shard worker: extract pages ``[start, stop)`` with document handles of its own."""
+    with fitz.open(pdf_path) as fitz_doc, pdfplumber.open(pdf_path, pages=list(range(start + 1, stop + 1))) as pdf:
+        return list(
+            iter_pages(
+                pdf.pages,
+                PageImageReader(fitz_doc),
+                (),
+                table_threshold,
+                table_audit,
+                with_tables,
+                with_images,
+                vector_grouping,
+                vector_finder,
+            )
+        )
+
+
+def render_page(page_idx: int, page: dict, images: ImageStore) -> str:
+    page_lines: list[str] = [f"## Page {page_idx}", ""]
+    if page["text"]:
+        page_lines.append(page["text"])
+        page_lines.append("")
+
+    for table in page["tables"]:
+        page_lines.append(table_to_markdown(table))
+        page_lines.append("")
+
+    for xref, ext, img_bytes in page["images"]:
+        page_lines.append(images.add(xref, ext, img_bytes))
+
+    return "\n".join(page_lines)
+
+
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int = 1,
+    total_files: int = 1,
+    options: RunOptions | None = None,
+    session: DocumentSession | None = None,
+) -> dict:
+    options = options or RunOptions()
+    LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
+    start = time.perf_counter()
+    try:
+        image_dir = output_dir / f"{pdf_path.stem}_images"
+        if options.with_images:
+            image_dir.mkdir(parents=True, exist_ok=True)
+
+        table_count = 0
+        valid_table_count = 0
+        skipped_pages = 0
+        missed_tables = 0
+        with ExitStack() as stack:
+            sink = stack.enter_context(OutputSink(options.writer_threads))
+            timer = stack.enter_context(StageTimer(timings_path(output_dir, pdf_path.stem), pdf_path.name, "pdfplumber"))
+            images = ImageStore(image_dir, pdf_path.stem, sink)
+            with timer.stage("open"):
+                if session:
+                    pdf = stack.enter_context(pdfplumber.open(session.stream()))
+                    image_source = session
+                else:
+                    pdf = stack.enter_context(pdfplumber.open(pdf_path))
+                    image_source = PageImageReader(stack.enter_context(fitz.open(pdf_path)))
+            md_writer = stack.enter_context(MarkdownWriter(output_dir / f"{pdf_path.stem}.md", options.stream, sink))
+            records = None
+            if options.records:
+                records_file = records_path(output_dir, pdf_path.stem, options.records)
+                records = stack.enter_context(RecordWriter(records_file, pdf_path.stem, "pdfplumber", sink))
+
+            page_count = len(pdf.pages)
+            if options.shard_pages and page_count > options.shard_pages:
+                extract_range = partial(
+                    extract_page_range,
+                    table_threshold=options.table_threshold,
+                    table_audit=options.table_audit,
+                    with_tables=options.with_tables,
+                    with_images=options.with_images,
+                    vector_grouping=options.char_grouping == "numpy",
+                    vector_finder=options.table_finder == "numpy",
+                )
+                pages = extract_sharded(
+                    extract_range, pdf_path, page_count, options.shard_pages, options.shard_worker_count()
+                )
+            else:
+                pages = iter_pages(
+                    pdf.pages,
+                    image_source,
+                    images.links,
+                    options.table_threshold,
+                    options.table_audit,
+                    options.with_tables,
+                    options.with_images,
+                    options.char_grouping == "numpy",
+                    options.table_finder == "numpy",
+                )
+
+            for page_idx, page in enumerate(pages, start=1):
+                timer.record_page(page_idx, page["timings"])
+                skipped_pages += page["tables_skipped"]
+                missed_tables += page["tables_missed"]
+                for xref in page["image_xrefs"]:
+                    images.count(xref)
+                for table in page["tables"]:
+                    table_count += 1
+                    if is_valid_table(table):
+                        valid_table_count += 1
+                with timer.stage("write", page_idx) as event:
+                    image_bytes = images.bytes_written
+                    section = render_page(page_idx, page, images)
+                    md_writer.add(section)
+                    if records:
+                        records.add_page(
+                            page_idx,
+                            page["text"],
+                            page["bbox"],
+                            page["tables"],
+                            page["table_bboxes"],
+                            [images.files[xref] for xref, _, _ in page["images"]],
+                        )
+                    event.bytes_written = len(section.encode("utf-8")) + images.bytes_written - image_bytes
+
+            text_chars = md_writer.close()
+            if records:
+                records.close()
+
+            # Extraction time stops here; waiting for the background writes is the "flush" stage
+            elapsed = time.perf_counter() - start
+            with timer.stage("flush"):
+                sink.flush()
+
+        structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
+        if options.with_tables and options.table_threshold > 0:
+            LOGGER.info(
+                "Table prefilter %s: skipped %d/%d page(s)%s",
+                pdf_path.name,
+                skipped_pages,
+                page_count,
+                f", {missed_tables} table(s) missed" if options.table_audit else "",
+            )
+        LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
+
+        return {
+            "pdf_file": pdf_path.name,
+            "library": "pdfplumber",
+            "page_count": page_count,
+            "extract_time_sec": elapsed,
+            "text_chars": text_chars,
+            "text_coverage_pct": 0.0,
+            "text_consensus_pct": 0.0,
+            "table_count": table_count,
+            "table_structure_pct": structure_pct,
+            "table_pages_skipped": skipped_pages if options.with_tables else "",
+            "tables_missed": missed_tables if options.with_tables and options.table_audit else "",
+            "image_count": images.total_count,
+            "unique_image_count": images.unique_count,
+            "status": "ok",
+            "error_message": "",
+        }
+    except Exception as err:
+        LOGGER.exception("Failed on %s", pdf_path.name)
+        return error_row(pdf_path, err)
+
+
+def run(pdf_files: list[Path], output_dir: Path, options: RunOptions | None = None) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: list[dict] = []
+    total_files = len(pdf_files)
+    LOGGER.info("Start pdfplumber run: %d files", total_files)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        rows.append(process_pdf(pdf_path, output_dir, idx, total_files, options))
+
+    write_reports(output_dir, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pdfplumber PDF to Markdown converter")
+    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pdfplumber")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    input_path: Path = args.input
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    setup_logging(args.output_dir)
+    run(pdf_files, args.output_dir, options_from_args(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,179 +1,398 @@
-import argparse
-import csv
-import logging
-import time
-from pathlib import Path
-
-import fitz
-
-
-LOGGER = logging.getLogger("pymupdf-parser")
-
-
-def progress_label(current: int, total: int) -> str:
-    if total <= 0:
-        return "0/0 (0.0%)"
-    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
-
-
-def setup_logging(output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
-    )
-
-
-def write_reports(output_dir: Path, rows: list[dict]) -> None:
-    csv_path = output_dir / "benchmark_results.csv"
-    md_path = output_dir / "benchmark_results.md"
-    fields = [
-        "pdf_file",
-        "library",
-        "page_count",
-        "extract_time_sec",
-        "text_chars",
-        "text_coverage_pct",
-        "text_consensus_pct",
-        "table_count",
-        "table_structure_pct",
-        "image_count",
-        "status",
-        "error_message",
-    ]
-
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    lines = [
-        "# PyMuPDF Benchmark Results",
-        "",
-        "| " + " | ".join(fields[:-1]) + " |",
-        "| " + " | ".join(["---"] * (len(fields) - 1)) + " |",
-    ]
-    for row in rows:
-        values = []
-        for key in fields[:-1]:
-            value = row[key]
-            if isinstance(value, float):
-                values.append(f"{value:.3f}")
-            else:
-                values.append(str(value))
-        lines.append("| " + " | ".join(values) + " |")
-
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-
-
-def run(pdf_files: list[Path], output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    rows: list[dict] = []
-    total_files = len(pdf_files)
-    LOGGER.info("Start PyMuPDF run: %d files", total_files)
-
-    for idx, pdf_path in enumerate(pdf_files, start=1):
-        LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
-        start = time.perf_counter()
-        try:
-            doc = fitz.open(pdf_path)
-            image_dir = output_dir / f"{pdf_path.stem}_images"
-            image_dir.mkdir(parents=True, exist_ok=True)
-
-            md_parts: list[str] = []
-            image_count = 0
-
-            for page_idx, page in enumerate(doc, start=1):
-                page_text = (page.get_text("text") or "").strip()
-                page_lines: list[str] = [f"## Page {page_idx}", ""]
-                if page_text:
-                    page_lines.append(page_text)
-                    page_lines.append("")
-
-                for image_info in page.get_images(full=True):
-                    xref = image_info[0]
-                    img_dict = doc.extract_image(xref)
-                    img_bytes = img_dict.get("image", b"")
-                    ext = img_dict.get("ext", "png")
-                    if not img_bytes:
-                        continue
-                    image_count += 1
-                    img_filename = f"{image_count:03d}.{ext}"
-                    (image_dir / img_filename).write_bytes(img_bytes)
-                    rel = f"{pdf_path.stem}_images/{img_filename}"
-                    page_lines.append(f"![Image {image_count}]({rel})")
-
-                md_parts.append("\n".join(page_lines))
-
-            page_count = doc.page_count
-            doc.close()
-
-            md_text = "\n\n".join(md_parts)
-            (output_dir / f"{pdf_path.stem}.md").write_text(md_text, encoding="utf-8")
-            elapsed = time.perf_counter() - start
-            LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
-
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pymupdf",
-                    "page_count": page_count,
-                    "extract_time_sec": elapsed,
-                    "text_chars": len(md_text),
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": image_count,
-                    "status": "ok",
-                    "error_message": "",
-                }
-            )
-        except Exception as err:
-            LOGGER.exception("Failed on %s", pdf_path.name)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pymupdf",
-                    "page_count": 0,
-                    "extract_time_sec": 0.0,
-                    "text_chars": 0,
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": 0,
-                    "status": "error",
-                    "error_message": str(err)[:500],
-                }
-            )
-
-    write_reports(output_dir, rows)
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="PyMuPDF PDF to Markdown converter")
-    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
-    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pymupdf")
-    args = parser.parse_args()
-
-    input_path: Path = args.input
-    if input_path.is_file():
-        pdf_files = [input_path]
-    elif input_path.is_dir():
-        pdf_files = sorted(input_path.glob("*.pdf"))
-    else:
-        raise FileNotFoundError(f"Input not found: {input_path}")
-
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found: {input_path}")
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    setup_logging(args.output_dir)
-    run(pdf_files, args.output_dir)
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import logging
+import time
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from typing import Container, Iterator
+
+import fitz
+
+from doc_session import DocumentSession
+from image_store import ImageStore, PageImageReader
+from layout_markdown import image_layout, reading_order, text_layout
+from markdown_writer import MarkdownWriter
+from output_sink import OutputSink
+from page_shards import extract_sharded
+from record_writer import RecordWriter, records_path
+import reports
+from run_options import RunOptions, add_run_arguments, options_from_args
+from stage_timing import StageClock, StageTimer, timings_path
+from table_markdown import is_valid_table, table_to_markdown
+from table_prefilter import fitz_table_score
+
+
+LOGGER = logging.getLogger("pymupdf-parser")
+
+# page.find_tables() otherwise prints a hint about the pymupdf_layout add-on to stdout on first use
+if hasattr(fitz, "no_recommend_layout"):
+    fitz.no_recommend_layout()
+
+
+def progress_label(current: int, total: int) -> str:
+    if total <= 0:
+        return "0/0 (0.0%)"
+    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def write_reports(output_dir: Path, rows: list[dict]) -> None:
+    reports.write_reports(output_dir, rows, "PyMuPDF")
+
+
+def error_row(pdf_path: Path, err: BaseException) -> dict:
+    return reports.error_row(pdf_path, err, "pymupdf")
+
+
+def iter_pages(
+    doc: fitz.Document,
+    start: int,
+    stop: int,
+    image_source,
+    known_xrefs: Container[int] = (),
+    with_images: bool = True,
+    layout: bool = False,
+    with_tables: bool = False,
+    table_threshold: int = 0,
+    table_audit: bool = False,
+) -> Iterator[dict]:
+    """Yield one entry per page; ``image_source`` is a PageImageReader or DocumentSession.
+
+    Without ``with_images`` a page's images are not decoded; only their xrefs are listed.
+    With ``layout`` the page is read once into a TextPage and the entry carries its
+    structured content (see ``layout_markdown.text_layout``) instead of plain text; with
+    images as well, a second, image-only TextPage places them (``layout_images`` stage).
+    ``with_tables`` runs ``page.find_tables`` on pages whose ruling-line score reaches
+    ``table_threshold``, the same prefilter and audit as the pdfplumber parser.
+    """
+    for page_idx in range(start, stop):
+        clock = StageClock()
+        page = doc[page_idx]
+        text, blocks = "", None
+        if layout:
+            blocks = text_layout(page)
+            clock.lap("layout")
+            if with_images:
+                blocks += image_layout(page, page.get_images(full=True))
+                clock.lap("layout_images")
+            blocks = reading_order(blocks)
+        else:
+            text = (page.get_text("text") or "").strip()
+            clock.lap("text")
+        tables, table_bboxes = [], []
+        skip_tables = False
+        missed = 0
+        if with_tables:
+            if table_threshold > 0:
+                skip_tables = fitz_table_score(page) < table_threshold
+                clock.lap("table_scan")
+            if not skip_tables:
+                found = page.find_tables().tables
+                tables = [table.extract() for table in found]
+                table_bboxes = [tuple(table.bbox) for table in found]
+                clock.lap("tables")
+            elif table_audit:
+                missed = len(page.find_tables().tables)
+                clock.lap("table_audit")
+        if with_images:
+            page_images, image_xrefs = image_source.page_images(page_idx, known_xrefs), []
+        else:
+            page_images, image_xrefs = [], image_source.page_image_xrefs(page_idx)
+        clock.lap("images")
+        yield {
+            "text": text,
+            "layout": blocks,
+            "bbox": tuple(page.rect),
+            "tables": tables,
+            "table_bboxes": table_bboxes,
+            "tables_skipped": skip_tables,
+            "tables_missed": missed,
+            "images": page_images,
+            "image_xrefs": image_xrefs,
+            "timings": clock.timings,
+        }
+
+
+def extract_page_range(
+    pdf_path: Path,
+    start: int,
+    stop: int,
+    with_images: bool = True,
+    layout: bool = False,
+    with_tables: bool = False,
+    table_threshold: int = 0,
+    table_audit: bool = False,
+) -> list[dict]:
+    """Shard worker: extract pages ``[start, stop)`` with a document handle of its own."""
+    with fitz.open(pdf_path) as doc:
+        return list(
+            iter_pages(
+                doc,
+                start,
+                stop,
+                PageImageReader(doc),
+                (),
+                with_images,
+                layout,
+                with_tables,
+                table_threshold,
+                table_audit,
+            )
+        )
+
+
+def render_layout(page_idx: int, page: dict, images: ImageStore) -> str:
+    """Markdown for a ``layout`` entry: its blocks in order, image links where the images sit."""
+    page_images = {xref: (ext, img_bytes) for xref, ext, img_bytes in page["images"]}
+    parts: list[str] = [f"## Page {page_idx}"]
+    for kind, value, _ in page["layout"]:
+        if kind == "text":
+            parts.append(value)
+        elif value in page_images:
+            parts.append(images.add(value, *page_images.pop(value)))
+    for table in page["tables"]:
+        parts.append(table_to_markdown(table))
+    # Images the page lists but never draws have no position; keep them at the end as before
+    for xref, (ext, img_bytes) in page_images.items():
+        parts.append(images.add(xref, ext, img_bytes))
+    return "\n\n".join(parts) + "\n"
+
+
+def render_page(page_idx: int, page: dict, images: ImageStore) -> str:
+    if page.get("layout") is not None:
+        return render_layout(page_idx, page, images)
+    page_lines: list[str] = [f"## Page {page_idx}", ""]
+    if page["text"]:
+        page_lines.append(page["text"])
+        page_lines.append("")
+
+    for table in page["tables"]:
+        page_lines.append(table_to_markdown(table))
+        page_lines.append("")
+
+    for xref, ext, img_bytes in page["images"]:
+        page_lines.append(images.add(xref, ext, img_bytes))
+
+    return "\n".join(page_lines)
+
+
+def record_text(page: dict) -> str:
+    """A page's text for its ``text`` record; a ``layout`` entry's text blocks in order."""
+    if page.get("layout") is not None:
+        return "\n\n".join(value for kind, value, _ in page["layout"] if kind == "text")
+    return page["text"]
+
+
+def record_image_bboxes(page: dict) -> list[tuple | None]:
+    """Bboxes of a page's images, in ``page["images"]`` order; only ``layout`` entries place them."""
+    if page.get("layout") is None:
+        return []
+    placed = {value: bbox for kind, value, bbox in page["layout"] if kind == "image"}
+    return [placed.get(xref) for xref, _, _ in page["images"]]
+
+
+def log_layout_budget(pdf_name: str, layout_ms: list[float], image_ms: list[float], budget_ms: float) -> None:
+    """``layout_ms`` is each page's whole layout time, of which ``image_ms`` went to placing images."""
+    slowest = max(range(len(layout_ms)), key=layout_ms.__getitem__)
+    over = [page_idx for page_idx, ms in enumerate(layout_ms, start=1) if budget_ms > 0 and ms > budget_ms]
+    LOGGER.info(
+        "Layout pass for %s: %.1f ms/page mean (%.1f ms placing images), slowest page %d at %.1f ms",
+        pdf_name,
+        sum(layout_ms) / len(layout_ms),
+        sum(image_ms) / len(image_ms),
+        slowest + 1,
+        layout_ms[slowest],
+    )
+    if over:
+        LOGGER.warning(
+            "Layout pass for %s: %d page(s) over the %g ms budget: %s",
+            pdf_name,
+            len(over),
+            budget_ms,
+            ", ".join(str(page_idx) for page_idx in over),
+        )
+
+
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int = 1,
+    total_files: int = 1,
+    options: RunOptions | None = None,
+    session: DocumentSession | None = None,
+) -> dict:
+    options = options or RunOptions()
+    LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
+    start = time.perf_counter()
+    try:
+        image_dir = output_dir / f"{pdf_path.stem}_images"
+        if options.with_images:
+            image_dir.mkdir(parents=True, exist_ok=True)
+
+        with_tables = options.pymupdf_tables and options.with_tables
+        table_count = 0
+        valid_table_count = 0
+        skipped_pages = 0
+        missed_tables = 0
+        with OutputSink(options.writer_threads) as sink, StageTimer(
+            timings_path(output_dir, pdf_path.stem), pdf_path.name, "pymupdf"
+        ) as timer:
+            images = ImageStore(image_dir, pdf_path.stem, sink)
+            with timer.stage("open"):
+                doc = session.open_fitz() if session else fitz.open(pdf_path)
+            records_file = records_path(output_dir, pdf_path.stem, options.records) if options.records else None
+            with doc, MarkdownWriter(output_dir / f"{pdf_path.stem}.md", options.stream, sink) as md_writer, (
+                RecordWriter(records_file, pdf_path.stem, "pymupdf", sink) if records_file else nullcontext()
+            ) as records:
+                page_count = doc.page_count
+                if options.shard_pages and page_count > options.shard_pages:
+                    pages = extract_sharded(
+                        partial(
+                            extract_page_range,
+                            with_images=options.with_images,
+                            layout=options.layout,
+                            with_tables=with_tables,
+                            table_threshold=options.table_threshold,
+                            table_audit=options.table_audit,
+                        ),
+                        pdf_path,
+                        page_count,
+                        options.shard_pages,
+                        options.shard_worker_count(),
+                    )
+                else:
+                    pages = iter_pages(
+                        doc,
+                        0,
+                        page_count,
+                        session or PageImageReader(doc),
+                        images.links,
+                        options.with_images,
+                        options.layout,
+                        with_tables,
+                        options.table_threshold,
+                        options.table_audit,
+                    )
+
+                layout_times: list[float] = []
+                layout_image_times: list[float] = []
+                for page_idx, page in enumerate(pages, start=1):
+                    timer.record_page(page_idx, page["timings"])
+                    if options.layout:
+                        image_ms = page["timings"].get("layout_images", 0.0) * 1000.0
+                        layout_times.append(page["timings"]["layout"] * 1000.0 + image_ms)
+                        layout_image_times.append(image_ms)
+                    skipped_pages += page["tables_skipped"]
+                    missed_tables += page["tables_missed"]
+                    for table in page["tables"]:
+                        table_count += 1
+                        if is_valid_table(table):
+                            valid_table_count += 1
+                    for xref in page["image_xrefs"]:
+                        images.count(xref)
+                    with timer.stage("write", page_idx) as event:
+                        image_bytes = images.bytes_written
+                        section = render_page(page_idx, page, images)
+                        md_writer.add(section)
+                        if records:
+                            records.add_page(
+                                page_idx,
+                                record_text(page),
+                                page["bbox"],
+                                page["tables"],
+                                page["table_bboxes"],
+                                [images.files[xref] for xref, _, _ in page["images"]],
+                                record_image_bboxes(page),
+                            )
+                        event.bytes_written = len(section.encode("utf-8")) + images.bytes_written - image_bytes
+
+                text_chars = md_writer.close()
+                if records:
+                    records.close()
+
+            # Extraction time stops here; waiting for the background writes is the "flush" stage
+            elapsed = time.perf_counter() - start
+            with timer.stage("flush"):
+                sink.flush()
+
+        structure_pct = (valid_table_count / table_count * 100.0) if table_count else 0.0
+        if with_tables and options.table_threshold > 0:
+            LOGGER.info(
+                "Table prefilter %s: skipped %d/%d page(s)%s",
+                pdf_path.name,
+                skipped_pages,
+                page_count,
+                f", {missed_tables} table(s) missed" if options.table_audit else "",
+            )
+        if layout_times:
+            log_layout_budget(pdf_path.name, layout_times, layout_image_times, options.layout_budget_ms)
+        LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
+
+        return {
+            "pdf_file": pdf_path.name,
+            "library": "pymupdf",
+            "page_count": page_count,
+            "extract_time_sec": elapsed,
+            "text_chars": text_chars,
+            "text_coverage_pct": 0.0,
+            "text_consensus_pct": 0.0,
+            "table_count": table_count,
+            "table_structure_pct": structure_pct,
+            "table_pages_skipped": skipped_pages if with_tables else "",
+            "tables_missed": missed_tables if with_tables and options.table_audit else "",
+            "image_count": images.total_count,
+            "unique_image_count": images.unique_count,
+            "status": "ok",
+            "error_message": "",
+        }
+    except Exception as err:
+        LOGGER.exception("Failed on %s", pdf_path.name)
+        return error_row(pdf_path, err)
+
+
+def run(pdf_files: list[Path], output_dir: Path, options: RunOptions | None = None) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: list[dict] = []
+    total_files = len(pdf_files)
+    LOGGER.info("Start PyMuPDF run: %d files", total_files)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        rows.append(process_pdf(pdf_path, output_dir, idx, total_files, options))
+
+    write_reports(output_dir, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PyMuPDF PDF to Markdown converter")
+    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pymupdf")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    input_path: Path = args.input
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    setup_logging(args.output_dir)
+    run(pdf_files, args.output_dir, options_from_args(args))
+
+
+if __name__ == "__main__":
+    main()
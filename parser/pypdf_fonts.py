@@ -0,0 +1,66 @@
+import pypdf._page as pypdf_page
+
+
+class FontCache:
+    """Per-document cache of pypdf's font decoding, keyed by font object reference.
+
+    ``page.extract_text`` rebuilds every font of a page (encoding, ToUnicode CMap, width
+    table) on each call, although the pages of a document usually share a handful of fonts.
+    While the cache is entered, the first page to use a font object decodes it and later
+    pages reuse the result. pypdf 6 builds a ``Font`` per font dictionary; older releases
+    call ``build_char_map`` per font name, and whichever hook the installed pypdf has is
+    wrapped. Fonts given as direct dictionaries have no reference and are not cached.
+    """
+
+    def __init__(self):
+        self.entries: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self._restore = None
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return (self.hits / lookups * 100.0) if lookups else 0.0
+
+    def _lookup(self, key, build):
+        if key is None:
+            self.misses += 1
+            return build()
+        if key in self.entries:
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        value = self.entries[key] = build()
+        return value
+
+    def __enter__(self) -> "FontCache":
+        if hasattr(pypdf_page, "Font"):
+            original = pypdf_page.Font
+            cache = self
+
+            class CachedFont(original):
+                @classmethod
+                def from_font_resource(cls, pdf_font_dict):
+                    ref = getattr(pdf_font_dict, "indirect_reference", None)
+                    key = (ref.idnum, ref.generation) if ref is not None else None
+                    return cache._lookup(key, lambda: original.from_font_resource(pdf_font_dict))
+
+            pypdf_page.Font = CachedFont
+            self._restore = ("Font", original)
+        else:
+            original = pypdf_page.build_char_map
+
+            def build_char_map(font_name, space_width, obj):
+                ref = obj["/Resources"]["/Font"].raw_get(font_name)
+                key = (ref.idnum, ref.generation, space_width) if hasattr(ref, "idnum") else None
+                return self._lookup(key, lambda: original(font_name, space_width, obj))
+
+            pypdf_page.build_char_map = build_char_map
+            self._restore = ("build_char_map", original)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        name, original = self._restore
+        setattr(pypdf_page, name, original)
+        self._restore = None
@@ -0,0 +1,115 @@
+import re
+from typing import Iterator
+
+# Filters whose encoded stream already is an image file: written byte-for-byte, as fitz does
+PASSTHROUGH_EXTENSIONS = {"/DCTDecode": "jpg", "/JPXDecode": "jp2"}
+# A BI operator token in a content stream; a match inside a string only costs a slower fallback
+_INLINE_IMAGE = re.compile(rb"(?:^|\s)BI\s")
+
+
+def last_filter(xobj) -> str:
+    filters = xobj.get("/Filter")
+    if filters is None:
+        return ""
+    filters = filters.get_object()
+    if isinstance(filters, list):
+        return str(filters[-1]) if filters else ""
+    return str(filters)
+
+
+def iter_image_xobjects(
+    obj, ancestors: tuple[str, ...] = (), visited: set | None = None
+) -> Iterator[tuple[tuple[str, ...], object]]:
+    """Yield ``(path, xobj)`` for every image XObject in a page's resources, forms included.
+
+    ``path`` is the key ``page.images`` uses for the image: its resource name, preceded by the
+    names of the forms it sits in. Resources are read one at a time; nothing is decoded and
+    the content stream is not parsed.
+    """
+    visited = set() if visited is None else visited
+    resources = obj.get("/Resources")
+    resources = resources.get_object() if resources is not None else None
+    if not resources or "/XObject" not in resources:
+        return
+    x_objects = resources["/XObject"].get_object()
+    for name in x_objects:
+        ref = x_objects.raw_get(name)
+        key = getattr(ref, "idnum", None)
+        if key is not None:
+            if key in visited:
+                continue
+            visited.add(key)
+        entry = ref.get_object()
+        if not hasattr(entry, "get_data"):
+            continue
+        subtype = entry.get("/Subtype")
+        if subtype == "/Image":
+            yield (*ancestors, str(name)), entry
+        elif subtype == "/Form":
+            yield from iter_image_xobjects(entry, (*ancestors, str(name)), visited)
+
+
+def has_inline_images(page) -> bool:
+    """Whether the page's content stream may hold inline (BI/ID/EI) images."""
+    contents = page.get_contents()
+    return contents is not None and _INLINE_IMAGE.search(contents.get_data()) is not None
+
+
+def inline_image_names(page) -> list[str]:
+    if not has_inline_images(page):
+        return []
+    return [name for name in page.images.keys() if isinstance(name, str) and name.startswith("~")]
+
+
+def image_bytes(page, path: tuple[str, ...], xobj) -> tuple[str, bytes]:
+    """``(ext, bytes)`` of one image XObject.
+
+    DCT and JPX streams (after any outer filters) are returned as stored. Soft-masked ones,
+    and every other filter, go through pypdf's Pillow decode so transparency and colour
+    conversion are kept.
+    """
+    ext = PASSTHROUGH_EXTENSIONS.get(last_filter(xobj))
+    if ext and "/SMask" not in xobj and "/Mask" not in xobj:
+        return ext, xobj.get_data()
+    image = page.images[path[0] if len(path) == 1 else list(path)]
+    return image_extension(image.name), image.data
+
+
+def image_extension(name: str) -> str:
+    return name.rpartition(".")[2] if "." in name else "png"
+
+
+def page_image_keys(page, page_index: int) -> list:
+    """Keys of a page's images, read without decoding any.
+
+    An XObject image is keyed by its object number, which every page drawing it shares;
+    an inline image gets a key of its own page.
+    """
+    keys: list = [xobj.indirect_reference.idnum for _, xobj in iter_image_xobjects(page)]
+    keys.extend((page_index, name) for name in inline_image_names(page))
+    return keys
+
+
+def page_images(page, page_index: int, seen: dict) -> list[tuple[object, str, bytes]]:
+    """List a page's images as ``(key, ext, bytes)``, like ``image_store.extract_page_images``.
+
+    ``seen`` maps every key met so far in the document to whether it produced bytes; an
+    image shared across pages is only read on its first occurrence and later returned with
+    empty ``ext``/``bytes`` so the caller reuses what it already wrote.
+    """
+    images: list[tuple[object, str, bytes]] = []
+    for path, xobj in iter_image_xobjects(page):
+        key = xobj.indirect_reference.idnum
+        if key in seen:
+            if seen[key]:
+                images.append((key, "", b""))
+            continue
+        ext, data = image_bytes(page, path, xobj)
+        seen[key] = bool(data)
+        if data:
+            images.append((key, ext, data))
+    for name in inline_image_names(page):
+        image = page.images[name]
+        if image.data:
+            images.append(((page_index, name), image_extension(image.name), image.data))
+    return images
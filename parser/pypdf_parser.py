@@ -1,176 +1,210 @@
-import argparse
-import csv
-import logging
-import time
-from pathlib import Path
-
-from pypdf import PdfReader
-
-
-LOGGER = logging.getLogger("pypdf-parser")
-
-
-def progress_label(current: int, total: int) -> str:
-    if total <= 0:
-        return "0/0 (0.0%)"
-    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
-
-
-def setup_logging(output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
-    )
-
-
-def write_reports(output_dir: Path, rows: list[dict]) -> None:
-    csv_path = output_dir / "benchmark_results.csv"
-    md_path = output_dir / "benchmark_results.md"
-    fields = [
-        "pdf_file",
-        "library",
-        "page_count",
-        "extract_time_sec",
-        "text_chars",
-        "text_coverage_pct",
-        "text_consensus_pct",
-        "table_count",
-        "table_structure_pct",
-        "image_count",
-        "status",
-        "error_message",
-    ]
-
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    lines = [
-        "# pypdf Benchmark Results",
-        "",
-        "| " + " | ".join(fields[:-1]) + " |",
-        "| " + " | ".join(["---"] * (len(fields) - 1)) + " |",
-    ]
-    for row in rows:
-        values = []
-        for key in fields[:-1]:
-            value = row[key]
-            if isinstance(value, float):
-                values.append(f"{value:.3f}")
-            else:
-                values.append(str(value))
-        lines.append("| " + " | ".join(values) + " |")
-
-    md_path.write_text("\n".join(lines), encoding="utf-8")
-
-
-def run(pdf_files: list[Path], output_dir: Path) -> None:
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    rows: list[dict] = []
-    total_files = len(pdf_files)
-    LOGGER.info("Start pypdf run: %d files", total_files)
-
-    for idx, pdf_path in enumerate(pdf_files, start=1):
-        LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
-        start = time.perf_counter()
-        try:
-            reader = PdfReader(str(pdf_path))
-            image_dir = output_dir / f"{pdf_path.stem}_images"
-            image_dir.mkdir(parents=True, exist_ok=True)
-
-            md_parts: list[str] = []
-            image_count = 0
-
-            for page_idx, page in enumerate(reader.pages, start=1):
-                page_text = (page.extract_text() or "").strip()
-                page_lines: list[str] = [f"## Page {page_idx}", ""]
-                if page_text:
-                    page_lines.append(page_text)
-                    page_lines.append("")
-
-                page_images = getattr(page, "images", None)
-                if page_images:
-                    for image in page_images:
-                        img_data = getattr(image, "data", b"")
-                        if not img_data:
-                            continue
-                        image_count += 1
-                        img_name = getattr(image, "name", f"img_{image_count}.bin")
-                        ext = Path(img_name).suffix.lstrip(".") or "png"
-                        img_filename = f"{image_count:03d}.{ext}"
-                        (image_dir / img_filename).write_bytes(img_data)
-                        rel = f"{pdf_path.stem}_images/{img_filename}"
-                        page_lines.append(f"![Image {image_count}]({rel})")
-
-                md_parts.append("\n".join(page_lines))
-
-            md_text = "\n\n".join(md_parts)
-            (output_dir / f"{pdf_path.stem}.md").write_text(md_text, encoding="utf-8")
-            elapsed = time.perf_counter() - start
-            LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pypdf",
-                    "page_count": len(reader.pages),
-                    "extract_time_sec": elapsed,
-                    "text_chars": len(md_text),
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": image_count,
-                    "status": "ok",
-                    "error_message": "",
-                }
-            )
-        except Exception as err:
-            LOGGER.exception("Failed on %s", pdf_path.name)
-            rows.append(
-                {
-                    "pdf_file": pdf_path.name,
-                    "library": "pypdf",
-                    "page_count": 0,
-                    "extract_time_sec": 0.0,
-                    "text_chars": 0,
-                    "text_coverage_pct": 0.0,
-                    "text_consensus_pct": 0.0,
-                    "table_count": 0,
-                    "table_structure_pct": 0.0,
-                    "image_count": 0,
-                    "status": "error",
-                    "error_message": str(err)[:500],
-                }
-            )
-
-    write_reports(output_dir, rows)
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="pypdf PDF to Markdown converter")
-    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
-    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pypdf")
-    args = parser.parse_args()
-
-    input_path: Path = args.input
-    if input_path.is_file():
-        pdf_files = [input_path]
-    elif input_path.is_dir():
-        pdf_files = sorted(input_path.glob("*.pdf"))
-    else:
-        raise FileNotFoundError(f"Input not found: {input_path}")
-
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found: {input_path}")
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    setup_logging(args.output_dir)
-    run(pdf_files, args.output_dir)
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import logging
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pypdf
+from pypdf import PdfReader
+
+from image_store import ImageStore
+from markdown_writer import MarkdownWriter
+from output_sink import OutputSink
+from pypdf_fonts import FontCache
+from pypdf_images import page_image_keys, page_images
+from record_writer import RecordWriter, records_path
+import reports
+from run_options import RunOptions, add_run_arguments, options_from_args
+from stage_timing import StageClock, StageTimer, timings_path
+
+if TYPE_CHECKING:
+    from doc_session import DocumentSession
+    from pdf_input import PdfInput
+
+
+LOGGER = logging.getLogger("pypdf-parser")
+_warned_no_release = False
+
+
+def can_release_objects(reader: PdfReader) -> bool:
+    """Whether ``--stream`` can drop the reader's resolved objects after each page.
+
+    ``resolved_objects`` is pypdf's private object cache, so a pypdf release without it only
+    costs the memory saving; that is logged once per process.
+    """
+    global _warned_no_release
+    if hasattr(reader, "resolved_objects"):
+        return True
+    if not _warned_no_release:
+        LOGGER.warning("pypdf %s has no PdfReader.resolved_objects; --stream keeps resolved objects", pypdf.__version__)
+        _warned_no_release = True
+    return False
+
+
+def progress_label(current: int, total: int) -> str:
+    if total <= 0:
+        return "0/0 (0.0%)"
+    return f"{current}/{total} ({(current / total) * 100.0:.1f}%)"
+
+
+def setup_logging(output_dir: Path) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.FileHandler(output_dir / "run.log", encoding="utf-8"), logging.StreamHandler()],
+    )
+
+
+def write_reports(output_dir: Path, rows: list[dict]) -> None:
+    reports.write_reports(output_dir, rows, "pypdf")
+
+
+def error_row(pdf_path: Path, err: BaseException) -> dict:
+    return reports.error_row(pdf_path, err, "pypdf")
+
+
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int = 1,
+    total_files: int = 1,
+    options: RunOptions | None = None,
+    session: "DocumentSession | PdfInput | None" = None,
+) -> dict:
+    options = options or RunOptions()
+    LOGGER.info("Processing %s | %s", progress_label(idx, total_files), pdf_path.name)
+    start = time.perf_counter()
+    try:
+        image_dir = output_dir / f"{pdf_path.stem}_images"
+        if options.with_images:
+            image_dir.mkdir(parents=True, exist_ok=True)
+
+        seen_images: dict = {}
+        records_file = records_path(output_dir, pdf_path.stem, options.records) if options.records else None
+
+        with OutputSink(options.writer_threads) as sink, StageTimer(
+            timings_path(output_dir, pdf_path.stem), pdf_path.name, "pypdf"
+        ) as timer, MarkdownWriter(
+            output_dir / f"{pdf_path.stem}.md", options.stream, sink
+        ) as md_writer, FontCache() as fonts, (
+            RecordWriter(records_file, pdf_path.stem, "pypdf", sink) if records_file else nullcontext()
+        ) as records:
+            images = ImageStore(image_dir, pdf_path.stem, sink)
+            with timer.stage("open"):
+                reader = PdfReader(session.stream() if session else str(pdf_path))
+            release_objects = options.stream and can_release_objects(reader)
+
+            for page_idx, page in enumerate(reader.pages, start=1):
+                clock = StageClock()
+                page_text = (page.extract_text() or "").strip()
+                clock.lap("text")
+                if options.with_images:
+                    page_image_list = page_images(page, page_idx, seen_images)
+                else:
+                    page_image_list = []
+                    for key in page_image_keys(page, page_idx):
+                        images.count(key)
+                clock.lap("images")
+                timer.record_page(page_idx, clock.timings)
+
+                with timer.stage("write", page_idx) as event:
+                    page_lines: list[str] = [f"## Page {page_idx}", ""]
+                    if page_text:
+                        page_lines.append(page_text)
+                        page_lines.append("")
+
+                    image_bytes = images.bytes_written
+                    for key, ext, img_data in page_image_list:
+                        page_lines.append(images.add(key, ext, img_data))
+
+                    section = "\n".join(page_lines)
+                    md_writer.add(section)
+                    if records:
+                        records.add_page(
+                            page_idx,
+                            page_text,
+                            tuple(float(value) for value in page.mediabox),
+                            image_files=[images.files[key] for key, _, _ in page_image_list],
+                        )
+                    event.bytes_written += len(section.encode("utf-8")) + images.bytes_written - image_bytes
+                if release_objects:
+                    # Drop resolved objects (decoded content streams, fonts) kept for the whole document
+                    reader.resolved_objects.clear()
+
+            text_chars = md_writer.close()
+            if records:
+                records.close()
+
+            # Extraction time stops here; waiting for the background writes is the "flush" stage
+            elapsed = time.perf_counter() - start
+            with timer.stage("flush"):
+                sink.flush()
+
+        LOGGER.info(
+            "Font cache for %s: %d hit(s), %d miss(es), %.1f%% hit rate",
+            pdf_path.name,
+            fonts.hits,
+            fonts.misses,
+            fonts.hit_rate,
+        )
+        LOGGER.info("Done %s | %s | %.3fs", progress_label(idx, total_files), pdf_path.name, elapsed)
+        return {
+            "pdf_file": pdf_path.name,
+            "library": "pypdf",
+            "page_count": len(reader.pages),
+            "extract_time_sec": elapsed,
+            "text_chars": text_chars,
+            "text_coverage_pct": 0.0,
+            "text_consensus_pct": 0.0,
+            "table_count": 0,
+            "table_structure_pct": 0.0,
+            "image_count": images.total_count,
+            "unique_image_count": images.unique_count,
+            "status": "ok",
+            "error_message": "",
+        }
+    except Exception as err:
+        LOGGER.exception("Failed on %s", pdf_path.name)
+        return error_row(pdf_path, err)
+
+
+def run(pdf_files: list[Path], output_dir: Path, options: RunOptions | None = None) -> None:
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: list[dict] = []
+    total_files = len(pdf_files)
+    LOGGER.info("Start pypdf run: %d files", total_files)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        rows.append(process_pdf(pdf_path, output_dir, idx, total_files, options))
+
+    write_reports(output_dir, rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="pypdf PDF to Markdown converter")
+    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "pypdf")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    input_path: Path = args.input
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    setup_logging(args.output_dir)
+    run(pdf_files, args.output_dir, options_from_args(args))
+
+
+if __name__ == "__main__":
+    main()
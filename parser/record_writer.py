@@ -0,0 +1,113 @@
+import importlib.util
+import json
+from pathlib import Path
+from typing import Sequence
+
+from output_sink import OutputSink
+from table_markdown import table_to_markdown
+
+
+RECORD_FORMATS = ("jsonl", "parquet")
+RECORD_FIELDS = ("doc_id", "chunk_id", "source_type", "page_number", "content", "bbox", "extraction_lib")
+
+
+def records_path(output_dir: Path, pdf_stem: str, fmt: str) -> Path:
+    return output_dir / f"{pdf_stem}.records.{fmt}"
+
+
+def check_format(fmt: str) -> None:
+    """Raise ValueError for an unknown format, or Parquet without an engine pandas can write it with."""
+    if fmt not in RECORD_FORMATS:
+        raise ValueError(f"Unknown record format: {fmt} (choose from {', '.join(RECORD_FORMATS)})")
+    if fmt == "parquet" and not any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")):
+        raise ValueError("Parquet output needs pyarrow or fastparquet installed for pandas.DataFrame.to_parquet")
+
+
+def _bbox(bbox) -> list[float] | None:
+    # + 0.0 turns a -0.0 from a coordinate just above the page edge into 0.0
+    return [round(float(value), 2) + 0.0 for value in bbox] if bbox is not None else None
+
+
+class RecordWriter:
+    """Writes a document's pages, tables and images as flat records beside its Markdown file.
+
+    Every record has the fields of ``RECORD_FIELDS``, following the multimodal data model of
+    ``vector_pipeline_blueprint.md``: one ``text`` record per page (its text), one ``table``
+    record per table (its Markdown) and one ``image`` record per image occurrence (the path of
+    the image file, relative to the output directory). ``bbox`` is the page box for a page and
+    ``[x0, top, x1, bottom]`` from the page's top-left corner for a table or image, in PDF points
+    rounded to 0.01, or None where the engine gives no position.
+
+    JSONL is appended through the sink page by page, so records land on disk while the
+    document is still being extracted. pandas has no Parquet append, so Parquet records are
+    buffered and the file is written in one go on ``close()``.
+    """
+
+    def __init__(self, path: Path, doc_id: str, library: str, sink: OutputSink | None = None):
+        self.fmt = path.suffix.lstrip(".")
+        check_format(self.fmt)
+        self.path = path
+        self.doc_id = doc_id
+        self.library = library
+        self.record_count = 0
+        self._rows: list[dict] = []
+        self._sink = sink or OutputSink(threads=0)
+        self._file = path.open("w", encoding="utf-8") if self.fmt == "jsonl" else None
+
+    def _record(self, chunk: str, source_type: str, page_number: int, content: str, bbox) -> dict:
+        return {
+            "doc_id": self.doc_id,
+            "chunk_id": f"{self.doc_id}/p{page_number}/{chunk}",
+            "source_type": source_type,
+            "page_number": page_number,
+            "content": content,
+            "bbox": _bbox(bbox),
+            "extraction_lib": self.library,
+        }
+
+    def add_page(
+        self,
+        page_number: int,
+        text: str,
+        bbox=None,
+        tables: Sequence = (),
+        table_bboxes: Sequence = (),
+        image_files: Sequence[str] = (),
+        image_bboxes: Sequence = (),
+    ) -> None:
+        """Add one page's records; ``table_bboxes`` pairs with ``tables`` and ``image_bboxes``
+        with ``image_files`` where the engine has them."""
+        rows = [self._record("text", "text", page_number, text, bbox)]
+        for number, table in enumerate(tables, start=1):
+            table_bbox = table_bboxes[number - 1] if number <= len(table_bboxes) else None
+            rows.append(self._record(f"table{number}", "table", page_number, table_to_markdown(table), table_bbox))
+        for number, image_file in enumerate(image_files, start=1):
+            image_bbox = image_bboxes[number - 1] if number <= len(image_bboxes) else None
+            rows.append(self._record(f"image{number}", "image", page_number, image_file, image_bbox))
+        self.record_count += len(rows)
+        if self._file is not None:
+            lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            self._sink.submit(self._file.write, lines, key=self.path)
+        else:
+            self._rows.extend(rows)
+
+    def close(self) -> int:
+        """Finish the file and return the number of records written."""
+        if self._file is not None:
+            self._sink.submit(self._file.close, key=self.path)
+            self._file = None
+        elif self.fmt == "parquet":
+            import pandas as pd
+
+            frame = pd.DataFrame(self._rows, columns=list(RECORD_FIELDS))
+            self._rows = []
+            self._sink.submit(frame.to_parquet, self.path, index=False, key=self.path)
+        return self.record_count
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and self._file is not None:
+            self._sink.submit(self._file.close, key=self.path)
+            self._file = None
@@ -0,0 +1,160 @@
+import importlib
+import importlib.util
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+
+
+LOGGER = logging.getLogger("parser-registry")
+
+# Seconds spent importing each heavy library and each parser script (on top of its libraries)
+IMPORT_TIMES: dict[str, float] = {}
+
+_LOADED: dict[str, ModuleType] = {}
+
+
+@dataclass(frozen=True)
+class ParserSpec:
+    """What the CLI needs to know about a parser without importing it.
+
+    ``load`` is the lazy factory: the parser script, and with it the heavy extraction
+    libraries listed in ``imports``, is only imported the first time a unit actually runs.
+    Everything else here (reports, error rows, cache keys) works from the spec alone.
+    """
+
+    name: str
+    title: str
+    capabilities: frozenset[str]
+    imports: tuple[str, ...]
+    distributions: tuple[str, ...]
+    shares_session: bool
+
+    @property
+    def script(self) -> str:
+        return f"{self.name}_parser"
+
+    def load(self, parser_dir: Path) -> ModuleType:
+        module = _LOADED.get(self.name)
+        if module is not None:
+            return module
+
+        script = parser_dir / f"{self.script}.py"
+        if not script.exists():
+            raise FileNotFoundError(f"Parser script not found: {script}")
+        if str(parser_dir.resolve()) not in sys.path:
+            sys.path.insert(0, str(parser_dir.resolve()))
+
+        started = time.perf_counter()
+        for library in self.imports:
+            if library not in sys.modules:
+                library_start = time.perf_counter()
+                importlib.import_module(library)
+                IMPORT_TIMES[library] = time.perf_counter() - library_start
+
+        # Register under the script's own name (not e.g. "pymupdf", which is the PyMuPDF package)
+        # so worker processes can unpickle references to module-level shard functions.
+        script_start = time.perf_counter()
+        spec = importlib.util.spec_from_file_location(self.script, script)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[self.script] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[self.script]
+            raise
+        IMPORT_TIMES[self.script] = time.perf_counter() - script_start
+
+        _LOADED[self.name] = module
+        LOGGER.info("Loaded parser %s in %.3fs", self.name, time.perf_counter() - started)
+        return module
+
+
+PARSERS: dict[str, ParserSpec] = {}
+
+
+def register(spec: ParserSpec) -> ParserSpec:
+    PARSERS[spec.name] = spec
+    return spec
+
+
+register(
+    ParserSpec(
+        name="pdfminer",
+        title="pdfminer.six",
+        capabilities=frozenset({"text", "images"}),
+        imports=("fitz", "pdfminer.high_level"),
+        distributions=("pdfminer.six", "pymupdf"),
+        shares_session=True,
+    )
+)
+register(
+    ParserSpec(
+        name="pdfplumber",
+        title="pdfplumber",
+        capabilities=frozenset({"text", "tables", "images"}),
+        imports=("fitz", "pdfplumber"),
+        distributions=("pdfplumber", "pdfminer.six", "pymupdf"),
+        shares_session=True,
+    )
+)
+register(
+    ParserSpec(
+        name="pymupdf",
+        title="PyMuPDF",
+        capabilities=frozenset({"text", "tables", "images"}),
+        imports=("fitz",),
+        distributions=("pymupdf",),
+        shares_session=True,
+    )
+)
+register(
+    ParserSpec(
+        name="pypdf",
+        title="pypdf",
+        capabilities=frozenset({"text", "images"}),
+        imports=("pypdf",),
+        distributions=("pypdf",),
+        shares_session=False,
+    )
+)
+register(
+    ParserSpec(
+        name="hybrid",
+        title="Hybrid (PyMuPDF + pdfplumber)",
+        capabilities=frozenset({"text", "tables", "images"}),
+        imports=("fitz", "pdfplumber"),
+        distributions=("pymupdf", "pdfplumber", "pdfminer.six"),
+        shares_session=True,
+    )
+)
+
+
+def select_parsers(names: list[str] | None = None) -> list[ParserSpec]:
+    """Resolve ``names`` (default: every registered parser) to specs, in registry order."""
+    if not names:
+        return list(PARSERS.values())
+    unknown = [name for name in names if name not in PARSERS]
+    if unknown:
+        raise ValueError(f"Unknown parser(s): {', '.join(unknown)} (available: {', '.join(PARSERS)})")
+    return [spec for name, spec in PARSERS.items() if name in names]
+
+
+def import_report() -> list[str]:
+    """Lines describing where import time went so far, slowest first."""
+    return [f"{name}: {seconds:.3f}s" for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: -item[1])]
+
+
+def take_import_times() -> dict[str, float]:
+    """Import times recorded in this process since the last call, for a pool worker to hand back."""
+    times = dict(IMPORT_TIMES)
+    IMPORT_TIMES.clear()
+    return times
+
+
+def add_import_times(times: dict[str, float]) -> None:
+    """Add import times measured in another process; pool workers' times add up per library."""
+    for name, seconds in times.items():
+        IMPORT_TIMES[name] = IMPORT_TIMES.get(name, 0.0) + seconds
@@ -0,0 +1,71 @@
+import csv
+from pathlib import Path
+
+
+REPORT_FIELDS = [
+    "pdf_file",
+    "library",
+    "page_count",
+    "extract_time_sec",
+    "text_chars",
+    "text_coverage_pct",
+    "text_consensus_pct",
+    "table_count",
+    "table_structure_pct",
+    "table_pages_skipped",
+    "tables_missed",
+    "image_count",
+    "unique_image_count",
+    "status",
+    "error_message",
+]
+
+
+def write_reports(output_dir: Path, rows: list[dict], title: str) -> None:
+    """Write ``benchmark_results.csv/md``; fields a parser does not report are left blank."""
+    csv_path = output_dir / "benchmark_results.csv"
+    md_path = output_dir / "benchmark_results.md"
+    fields = REPORT_FIELDS
+
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    lines = [
+        f"# {title} Benchmark Results",
+        "",
+        "| " + " | ".join(fields[:-1]) + " |",
+        "| " + " | ".join(["---"] * (len(fields) - 1)) + " |",
+    ]
+    for row in rows:
+        values = []
+        for key in fields[:-1]:
+            value = row.get(key, "")
+            if isinstance(value, float):
+                values.append(f"{value:.3f}")
+            else:
+                values.append(str(value))
+        lines.append("| " + " | ".join(values) + " |")
+
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def error_row(pdf_path: Path, err: BaseException | str, library: str, status: str = "error") -> dict:
+    return {
+        "pdf_file": pdf_path.name,
+        "library": library,
+        "page_count": 0,
+        "extract_time_sec": 0.0,
+        "text_chars": 0,
+        "text_coverage_pct": 0.0,
+        "text_consensus_pct": 0.0,
+        "table_count": 0,
+        "table_structure_pct": 0.0,
+        "table_pages_skipped": "",
+        "tables_missed": "",
+        "image_count": 0,
+        "unique_image_count": 0,
+        "status": status,
+        "error_message": str(err)[:500],
+    }
@@ -0,0 +1,168 @@
+import argparse
+import os
+from dataclasses import dataclass
+
+from pdf_input import DEFAULT_MAX_MB
+from record_writer import RECORD_FORMATS, check_format
+
+
+CONTENT_CHOICES = ("text", "text+tables", "all")
+CHAR_GROUPING_CHOICES = ("stock", "numpy")
+TABLE_FINDER_CHOICES = ("pdfplumber", "numpy")
+
+
+@dataclass
+class RunOptions:
+    """Options shared by every parser's run()/process_pdf() and the CLIs that drive them."""
+
+    shard_pages: int = 0
+    shard_workers: int = 0
+    stream: bool = False
+    writer_threads: int = 4
+    table_threshold: int = 3
+    table_audit: bool = False
+    input_max_mb: int = DEFAULT_MAX_MB
+    content: str = "all"
+    layout: bool = False
+    pymupdf_tables: bool = False
+    layout_budget_ms: float = 0.0
+    char_grouping: str = "stock"
+    table_finder: str = "pdfplumber"
+    records: str = ""
+
+    @property
+    def with_tables(self) -> bool:
+        return self.content != "text"
+
+    @property
+    def with_images(self) -> bool:
+        """False in the text-only modes: images are counted from page resources, never decoded or written."""
+        return self.content == "all"
+
+    def output_fields(self) -> dict:
+        """Options that change what a parser writes; part of extraction cache keys.
+
+        Sharding, streaming and writer threads produce byte-identical output, so they are left out.
+        """
+        return {
+            "table_threshold": self.table_threshold,
+            "table_audit": self.table_audit,
+            "content": self.content,
+            "layout": self.layout,
+            "pymupdf_tables": self.pymupdf_tables,
+            "char_grouping": self.char_grouping,
+            "table_finder": self.table_finder,
+            "records": self.records,
+        }
+
+    def input_max_bytes(self) -> int:
+        return self.input_max_mb * 1024 * 1024
+
+    def shard_worker_count(self) -> int:
+        return self.shard_workers if self.shard_workers > 0 else (os.cpu_count() or 1)
+
+
+def record_format(value: str) -> str:
+    """argparse type of ``--records``: every entry point rejects a format it cannot write up front."""
+    if value:
+        try:
+            check_format(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from e
+    return value
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--shard-pages",
+        type=int,
+        default=0,
+        help="Split documents longer than N pages into N-page shards extracted in parallel; pymupdf, pdfplumber and hybrid only (default: 0, off)",
+    )
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=0,
+        help="Worker processes per sharded document (default: CPU count)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each page as soon as it is extracted and release page objects right away (flat memory)",
+    )
+    parser.add_argument(
+        "--writer-threads",
+        type=int,
+        default=4,
+        help="Background threads for image/Markdown file writes; 0 writes inline (default: 4)",
+    )
+    parser.add_argument(
+        "--content",
+        choices=CONTENT_CHOICES,
+        default="all",
+        help="What to extract: text only, text and tables, or everything including images (default: all)",
+    )
+    parser.add_argument(
+        "--table-threshold",
+        type=int,
+        default=3,
+        help="pdfplumber/hybrid/pymupdf tables: extract tables only on pages whose ruling grid scores at least this (the most rulings crossing one same pair of the other direction; a lone rectangle scores 2); 0 checks every page (default: 3)",
+    )
+    parser.add_argument(
+        "--table-audit",
+        action="store_true",
+        help="pdfplumber/hybrid/pymupdf tables: also run table extraction on prefiltered pages and report the tables it would have missed",
+    )
+    parser.add_argument(
+        "--table-finder",
+        choices=TABLE_FINDER_CHOICES,
+        default="pdfplumber",
+        help="pdfplumber/hybrid: find table grids with pdfplumber's TableFinder or the NumPy ruling-line finder over page.edges, which returns the same tables (default: pdfplumber)",
+    )
+    parser.add_argument(
+        "--pymupdf-tables",
+        action="store_true",
+        help="pymupdf: also extract tables with PyMuPDF's own table finder (page.find_tables)",
+    )
+    parser.add_argument(
+        "--layout",
+        action="store_true",
+        help="pymupdf: structured Markdown (headings, paragraphs, lists, images in reading order) from one TextPage pass per page",
+    )
+    parser.add_argument(
+        "--layout-budget-ms",
+        type=float,
+        default=0.0,
+        help="pymupdf --layout: report pages whose layout pass takes longer than this (default: 0, no budget)",
+    )
+    parser.add_argument(
+        "--records",
+        type=record_format,
+        choices=RECORD_FORMATS,
+        default="",
+        help="Also write <stem>.records.jsonl|parquet: one record per page, table and image with doc id, page number, bbox, content and library (default: off)",
+    )
+    parser.add_argument(
+        "--char-grouping",
+        choices=CHAR_GROUPING_CHOICES,
+        default="stock",
+        help="pdfminer/pdfplumber: group characters into lines and text blocks with the library's own text layout (stock) or the NumPy engine that reproduces pdfminer's LAParams analysis on arrays (numpy) (default: stock)",
+    )
+
+
+def options_from_args(args: argparse.Namespace) -> RunOptions:
+    return RunOptions(
+        shard_pages=args.shard_pages,
+        shard_workers=args.shard_workers,
+        stream=args.stream,
+        writer_threads=args.writer_threads,
+        table_threshold=args.table_threshold,
+        table_audit=args.table_audit,
+        content=args.content,
+        layout=args.layout,
+        pymupdf_tables=args.pymupdf_tables,
+        layout_budget_ms=args.layout_budget_ms,
+        char_grouping=args.char_grouping,
+        table_finder=args.table_finder,
+        records=args.records,
+    )
@@ -0,0 +1,85 @@
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+def timings_path(output_dir: Path, pdf_stem: str) -> Path:
+    return output_dir / f"{pdf_stem}.timings.jsonl"
+
+
+class StageClock:
+    """Times back-to-back stages of one page: ``lap(stage)`` closes the stage that just ran.
+
+    The timings are a plain dict so they can travel with a page entry out of a shard worker.
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def take(self) -> dict[str, float]:
+        """Return the timings so far and start over from now."""
+        timings = self.timings
+        self.timings = {}
+        self._last = time.perf_counter()
+        return timings
+
+
+@dataclass
+class StageEvent:
+    bytes_written: int = 0
+
+
+class StageTimer:
+    """Writes one JSONL event per (page, stage) of one PDF.
+
+    Each line has ``pdf``, ``parser``, ``page``, ``stage``, ``duration_sec`` and
+    ``bytes_written``. Document-level stages (opening the document, flushing the Markdown
+    file) use page 0. ``summarize_stage_timings.py`` aggregates the files.
+    """
+
+    def __init__(self, path: Path, pdf_file: str, parser_name: str):
+        self.pdf_file = pdf_file
+        self.parser_name = parser_name
+        self._file = path.open("w", encoding="utf-8")
+
+    def record(self, page: int, stage: str, duration: float, bytes_written: int = 0) -> None:
+        event = {
+            "pdf": self.pdf_file,
+            "parser": self.parser_name,
+            "page": page,
+            "stage": stage,
+            "duration_sec": round(duration, 6),
+            "bytes_written": bytes_written,
+        }
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def record_page(self, page: int, timings: dict[str, float]) -> None:
+        for stage, duration in timings.items():
+            self.record(page, stage, duration)
+
+    @contextmanager
+    def stage(self, stage: str, page: int = 0) -> Iterator[StageEvent]:
+        event = StageEvent()
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            self.record(page, stage, time.perf_counter() - start, event.bytes_written)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "StageTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,20 @@
+def table_to_markdown(table: list[list[str]]) -> str:
+    if not table:
+        return ""
+    max_cols = max(len(row) for row in table)
+    normalized = []
+    for row in table:
+        padded = row + [""] * (max_cols - len(row))
+        normalized.append([("" if cell is None else str(cell)).replace("\n", " ").strip() for cell in padded])
+    header = normalized[0]
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "| " + " | ".join(["---"] * len(header)) + " |",
+    ]
+    for row in normalized[1:]:
+        lines.append("| " + " | ".join(row) + " |")
+    return "\n".join(lines)
+
+
+def is_valid_table(table: list[list[str]]) -> bool:
+    return bool(table) and len(table) >= 2 and max((len(r) for r in table if r), default=0) >= 2
@@ -0,0 +1,172 @@
+import numpy as np
+
+
+# pdfplumber's default "lines" table strategy builds tables only from the edges of line, rect
+# and curve objects. It drops edges shorter than ``edge_min_length_prefilter`` before joining
+# collinear ones, so any shorter segment can never contribute to a table. The tolerances are
+# its default snap, join, edge length and intersection settings.
+MIN_RULING_LENGTH = 1.0
+SNAP_TOLERANCE = 3.0
+JOIN_TOLERANCE = 3.0
+EDGE_MIN_LENGTH = 3.0
+INTERSECTION_TOLERANCE = 3.0
+# A lone rectangle scores 2; the smallest table pdfplumber keeps, two adjacent cells, scores 3
+DEFAULT_THRESHOLD = 3
+# fitz and pdfminer round coordinates differently; treat near-axis-aligned fitz segments as aligned
+AXIS_TOLERANCE = 0.5
+
+# A ruling is ``(pos, start, end)``: ``(top, x0, x1)`` horizontally, ``(x, top, bottom)`` vertically
+Rulings = list[tuple[float, float, float]]
+
+
+def _segment_cummax(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Running maximum of ``values`` that restarts wherever the sorted ``groups`` change."""
+    result = values.copy()
+    shift = 1
+    while shift < len(values):
+        same = groups[shift:] == groups[:-shift]
+        result[shift:] = np.where(same, np.maximum(result[shift:], result[:-shift]), result[shift:])
+        shift *= 2
+    return result
+
+
+def snap(pos: np.ndarray, tolerance: float) -> np.ndarray:
+    """Move positions within ``tolerance`` of their neighbours to the cluster average (``snap_edges``)."""
+    if tolerance <= 0 or len(pos) < 2:
+        return pos
+    values = np.unique(pos)
+    cluster = np.concatenate(([0], np.cumsum(values[1:] > values[:-1] + tolerance)))
+    ids = cluster[np.searchsorted(values, pos)]
+    avg = np.bincount(ids, weights=pos) / np.bincount(ids)
+    return pos + (avg[ids] - pos)
+
+
+def join(
+    pos: np.ndarray, start: np.ndarray, end: np.ndarray, length: np.ndarray, tolerance: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Join collinear segments whose gap is at most ``tolerance`` (``join_edge_group``).
+
+    A segment starts a new line when it begins past the running end of the segments before it
+    on the same position; each line keeps its first segment and extends to the furthest end.
+    """
+    order = np.lexsort((start, pos))
+    pos, start, end, length = pos[order], start[order], end[order], length[order]
+    reach = _segment_cummax(end, pos)
+    first = np.ones(len(pos), dtype=bool)
+    first[1:] = (pos[1:] != pos[:-1]) | (start[1:] > reach[:-1] + tolerance)
+    firsts = np.flatnonzero(first)
+    run_end = np.maximum.reduceat(end, firsts)
+    return pos[firsts], start[firsts], run_end, length[firsts] + (run_end - end[firsts])
+
+
+def joined_rulings(rulings: Rulings) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Snap and join one direction's rulings and drop short lines, as pdfplumber's edges are."""
+    if not rulings:
+        return np.empty(0), np.empty(0), np.empty(0)
+    pos, start, end = np.array(rulings, dtype=float).T
+    pos, start, end, length = join(snap(pos, SNAP_TOLERANCE), start, end, end - start, JOIN_TOLERANCE)
+    keep = length >= EDGE_MIN_LENGTH
+    return pos[keep], start[keep], end[keep]
+
+
+def grid_score(horizontal: Rulings, vertical: Rulings) -> int:
+    """Table likelihood of a page's rulings: the most rulings of one direction that all cross
+    one same pair of rulings of the other direction.
+
+    A lone rectangle (a page frame, a shaded box) scores 2, however many of them a page has,
+    and a grid of n cells in a row or column scores n + 1. pdfplumber drops single-cell tables,
+    so a page needs a score of 3 to yield a ruled table under its default settings.
+    """
+    hy, hx0, hx1 = joined_rulings(horizontal)
+    vx, vtop, vbottom = joined_rulings(vertical)
+    if len(hy) < 2 or len(vx) < 2:
+        return 0
+    crossings = (
+        (vtop[:, None] <= hy[None, :] + INTERSECTION_TOLERANCE)
+        & (vbottom[:, None] >= hy[None, :] - INTERSECTION_TOLERANCE)
+        & (vx[:, None] >= hx0[None, :] - INTERSECTION_TOLERANCE)
+        & (vx[:, None] <= hx1[None, :] + INTERSECTION_TOLERANCE)
+    ).astype(np.float32)
+    # Entry (i, j): how many rulings of the other direction cross both ruling i and ruling j
+    best = 0
+    for shared in (crossings.T @ crossings, crossings @ crossings.T):
+        np.fill_diagonal(shared, 0)
+        best = max(best, int(shared.max()))
+    return best
+
+
+def page_rulings(page) -> tuple[Rulings, Rulings]:
+    """The horizontal and vertical rulings a pdfplumber page's vector objects would yield.
+
+    Classification follows ``pdfplumber.utils.obj_to_edges``. The objects are the ones
+    ``extract_text`` has already parsed and cached on the page, so this costs a pass over
+    the page's drawings and nothing more.
+    """
+    horizontal: Rulings = []
+    vertical: Rulings = []
+    objects = page.objects
+    for line in objects.get("line", ()):
+        if line["top"] == line["bottom"]:
+            horizontal.append((line["top"], line["x0"], line["x1"]))
+        else:
+            vertical.append((line["x0"], line["top"], line["bottom"]))
+    for rect in objects.get("rect", ()):
+        horizontal += [(rect["top"], rect["x0"], rect["x1"]), (rect["bottom"], rect["x0"], rect["x1"])]
+        vertical += [(rect["x0"], rect["top"], rect["bottom"]), (rect["x1"], rect["top"], rect["bottom"])]
+    for curve in objects.get("curve", ()):
+        points = curve["pts"]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if x0 == x1:
+                vertical.append((x0, min(y0, y1), max(y0, y1)))
+            elif y0 == y1:
+                horizontal.append((y0, min(x0, x1), max(x0, x1)))
+    return _long(horizontal), _long(vertical)
+
+
+def _long(rulings: Rulings) -> Rulings:
+    return [ruling for ruling in rulings if ruling[2] - ruling[1] >= MIN_RULING_LENGTH]
+
+
+def table_score(page) -> int:
+    """``grid_score`` of a pdfplumber page; pages below the default threshold of 3 cannot
+    yield a table under pdfplumber's default settings, higher thresholds trade recall for speed."""
+    return grid_score(*page_rulings(page))
+
+
+def fitz_rulings(page) -> tuple[Rulings, Rulings]:
+    """``page_rulings`` for a fitz page, from its vector drawings.
+
+    For routing pages before pdfplumber has parsed them. Segments are classified the way
+    pdfplumber would classify the same paths (a non-horizontal line counts as vertical, and
+    curves are split at every control point), erring on the side of counting a ruling.
+    """
+    horizontal: Rulings = []
+    vertical: Rulings = []
+    for path in page.get_cdrawings():
+        for item in path["items"]:
+            kind = item[0]
+            if kind == "re":
+                x0, y0, x1, y1 = item[1]
+                x0, x1 = min(x0, x1), max(x0, x1)
+                y0, y1 = min(y0, y1), max(y0, y1)
+                horizontal += [(y0, x0, x1), (y1, x0, x1)]
+                vertical += [(x0, y0, y1), (x1, y0, y1)]
+                continue
+            if kind == "qu":
+                ul, ur, ll, lr = item[1]
+                segments = [(ul, ur), (ur, lr), (lr, ll), (ll, ul)]
+            elif kind == "l":
+                segments = [(item[1], item[2])]
+            else:
+                points = item[1:]
+                segments = list(zip(points, points[1:]))
+            for (x0, y0), (x1, y1) in segments:
+                if abs(y1 - y0) <= AXIS_TOLERANCE:
+                    horizontal.append((min(y0, y1), min(x0, x1), max(x0, x1)))
+                elif kind == "l" or abs(x1 - x0) <= AXIS_TOLERANCE:
+                    vertical.append((min(x0, x1), min(y0, y1), max(y0, y1)))
+    return _long(horizontal), _long(vertical)
+
+
+def fitz_table_score(page) -> int:
+    return grid_score(*fitz_rulings(page))
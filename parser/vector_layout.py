@@ -0,0 +1,240 @@
+import heapq
+from itertools import repeat
+from typing import BinaryIO, Iterator, cast
+
+import numpy as np
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTPage
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.utils import open_filename
+
+
+# pdfminer's LAParams defaults, the stock layout analysis this engine reproduces
+LINE_OVERLAP = 0.5
+CHAR_MARGIN = 2.0
+LINE_MARGIN = 0.5
+WORD_MARGIN = 0.1
+BOXES_FLOW = 0.5
+
+
+class PageChars:
+    """A page's characters in content-stream order: their text and an ``(n, 4)`` array of
+    ``(x0, y0, x1, y1)`` boxes in PDF space (y grows upwards)."""
+
+    def __init__(self, texts: list[str], boxes):
+        self.texts = texts
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+
+    @classmethod
+    def from_ltpage(cls, ltpage) -> "PageChars":
+        """The top-level ``LTChar`` objects of a page from ``iter_char_pages``.
+
+        Characters inside figures are left out, as the stock analysis leaves them out
+        without ``all_texts``.
+        """
+        chars = [obj for obj in ltpage if hasattr(obj, "fontname")]
+        return cls([char.get_text() for char in chars], [char.bbox for char in chars])
+
+    @classmethod
+    def from_plumber(cls, chars: list[dict]) -> "PageChars":
+        return cls([char["text"] for char in chars], [(c["x0"], c["y0"], c["x1"], c["y1"]) for c in chars])
+
+
+def iter_char_pages(pdf_file) -> Iterator[LTPage]:
+    """``extract_pages`` without layout analysis: each page holds its raw ``LTChar`` objects.
+
+    ``extract_pages(laparams=None)`` falls back to the default LAParams, so the aggregator is
+    driven directly here.
+    """
+    with open_filename(pdf_file, "rb") as fp:
+        resource_manager = PDFResourceManager(caching=True)
+        device = PDFPageAggregator(resource_manager, laparams=None)
+        interpreter = PDFPageInterpreter(resource_manager, device)
+        for page in PDFPage.get_pages(cast(BinaryIO, fp), caching=True):
+            interpreter.process_page(page)
+            yield device.get_result()
+
+
+def group_lines(boxes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """``(starts, spaces)``: the index of each line's first character, and whether each
+    character follows a word gap in its line.
+
+    Consecutive characters share a line when they overlap vertically by more than
+    ``LINE_OVERLAP`` of the lower one and are closer than ``CHAR_MARGIN`` of the wider one,
+    pdfminer's horizontal ``group_objects`` test evaluated for every pair at once.
+    """
+    x0, y0, x1, y1 = boxes.T
+    width, height = x1 - x0, y1 - y0
+    prev, cur = slice(None, -1), slice(1, None)
+    voverlaps = (y0[cur] <= y1[prev]) & (y0[prev] <= y1[cur])
+    voverlap = np.where(voverlaps, np.minimum(np.abs(y0[prev] - y1[cur]), np.abs(y1[prev] - y0[cur])), 0.0)
+    hoverlaps = (x0[cur] <= x1[prev]) & (x0[prev] <= x1[cur])
+    hdistance = np.where(hoverlaps, 0.0, np.minimum(np.abs(x0[prev] - x1[cur]), np.abs(x1[prev] - x0[cur])))
+    halign = (
+        voverlaps
+        & (np.minimum(height[prev], height[cur]) * LINE_OVERLAP < voverlap)
+        & (hdistance < np.maximum(width[prev], width[cur]) * CHAR_MARGIN)
+    )
+    starts = np.flatnonzero(np.concatenate(([True], ~halign)))
+    gaps = x1[prev] < x0[cur] - WORD_MARGIN * np.maximum(width[cur], height[cur])
+    spaces = np.concatenate(([False], gaps & halign))
+    return starts, spaces
+
+
+def line_boxes(boxes: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    return np.column_stack(
+        (
+            np.minimum.reduceat(boxes[:, 0], starts),
+            np.minimum.reduceat(boxes[:, 1], starts),
+            np.maximum.reduceat(boxes[:, 2], starts),
+            np.maximum.reduceat(boxes[:, 3], starts),
+        )
+    )
+
+
+def group_textlines(lines: np.ndarray) -> np.ndarray:
+    """Text box label of every line, numbered in order of each box's first line.
+
+    A line's neighbours are the lines within ``LINE_MARGIN`` of its height above or below
+    it that have about the same height and share its left edge, right edge or centre; boxes
+    are the connected components of that relation, as in pdfminer's ``group_textlines``.
+    """
+    x0, y0, x1, y1 = (column[:, None] for column in lines.T)
+    height = y1 - y0
+    margin = LINE_MARGIN * height
+    near = ~((x1.T <= x0) | (x1 <= x0.T) | (y1.T <= y0 - margin) | (y1 + margin <= y0.T))
+    aligned = (
+        (np.abs(x0.T - x0) <= margin)
+        | (np.abs(x1.T - x1) <= margin)
+        | (np.abs((x0.T + x1.T) - (x0 + x1)) / 2 <= margin)
+    )
+    adjacent = near & (np.abs(height.T - height) <= margin) & aligned
+    adjacent |= adjacent.T
+
+    count = len(lines)
+    labels = np.arange(count)
+    while True:
+        merged = np.where(adjacent, labels[None, :], count).min(axis=1)
+        merged = np.minimum(merged, labels)
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def order_boxes(boxes: np.ndarray) -> list[int]:
+    """Reading order of text boxes, by pdfminer's hierarchical grouping with ``BOXES_FLOW``.
+
+    The two closest elements (by the area of their joint bounding box left uncovered) merge
+    into a group first; a pair with another element between them is deferred until no
+    undeferred pair is left. The groups form a tree whose children are read top-left to
+    bottom-right, and its leaves are the order. Pairs wait in a heap as in pdfminer, but as
+    ``(deferred, distance, first, second)`` with node indices, so equal distances go to the
+    pair with the lower indices where pdfminer compares object ids (which vary from run to
+    run); distances and the between test run on arrays.
+    """
+    count = len(boxes)
+    if count < 2:
+        return list(range(count))
+    size = 2 * count - 1
+    bbox = np.zeros((size, 4))
+    bbox[:count] = boxes
+    area = np.zeros(size)
+    area[:count] = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    def distances(node, others: np.ndarray) -> np.ndarray:
+        joint = (np.maximum(bbox[others, 2], bbox[node, 2]) - np.minimum(bbox[others, 0], bbox[node, 0])) * (
+            np.maximum(bbox[others, 3], bbox[node, 3]) - np.minimum(bbox[others, 1], bbox[node, 1])
+        )
+        return joint - area[node] - area[others]
+
+    first, second = np.triu_indices(count, 1)
+    heap = list(zip(repeat(False), distances(first, second).tolist(), first.tolist(), second.tolist()))
+    heapq.heapify(heap)
+    active = np.zeros(size, dtype=bool)
+    active[:count] = True
+    children: dict[int, tuple[int, int]] = {}
+
+    rects = [tuple(rect) for rect in boxes.tolist()]
+    left, bottom, right, top = bbox.T
+    node = count
+    while node < size:
+        deferred, pair_dist, first, second = heapq.heappop(heap)
+        if not (active[first] and active[second]):
+            continue
+        (ax0, ay0, ax1, ay1), (bx0, by0, bx1, by1) = rects[first], rects[second]
+        rect = (min(ax0, bx0), min(ay0, by0), max(ax1, bx1), max(ay1, by1))
+        if not deferred:
+            inside = active & (right > rect[0]) & (left < rect[2]) & (top > rect[1]) & (bottom < rect[3])
+            if np.count_nonzero(inside) - inside[first] - inside[second]:
+                heapq.heappush(heap, (True, pair_dist, first, second))
+                continue
+        rects.append(rect)
+        bbox[node] = rect
+        area[node] = (rect[2] - rect[0]) * (rect[3] - rect[1])
+        children[node] = (first, second)
+        active[[first, second]] = False
+        others = np.flatnonzero(active)
+        for other, other_dist in zip(others.tolist(), distances(node, others).tolist()):
+            heapq.heappush(heap, (False, other_dist, node, other))
+        active[node] = True
+        node += 1
+
+    flow_key = (1 - BOXES_FLOW) * bbox[:, 0] - (1 + BOXES_FLOW) * (bbox[:, 1] + bbox[:, 3])
+    order: list[int] = []
+    stack = [size - 1]
+    while stack:
+        node = stack.pop()
+        if node < count:
+            order.append(node)
+        else:
+            stack.extend(reversed(sorted(children[node], key=lambda child: flow_key[child])))
+    return order
+
+
+def page_text(chars: PageChars) -> str:
+    """The text pdfminer's stock layout analysis gives a page, computed on arrays.
+
+    Characters are grouped into lines, with a space at each word gap, then lines into text
+    boxes, and the boxes are put in reading order; every line ends in a newline. Whitespace-only
+    lines are dropped, as pdfminer moves them after all boxes.
+    """
+    if not chars.texts:
+        return ""
+    starts, spaces = group_lines(chars.boxes)
+    pieces = [" " + text if space else text for text, space in zip(chars.texts, spaces.tolist())]
+    ends = [*starts[1:].tolist(), len(pieces)]
+    texts = ["".join(pieces[start:end]) for start, end in zip(starts.tolist(), ends)]
+    boxes = line_boxes(chars.boxes, starts)
+    keep = [
+        idx
+        for idx, text in enumerate(texts)
+        if not (boxes[idx, 2] <= boxes[idx, 0] or boxes[idx, 3] <= boxes[idx, 1] or text.isspace())
+    ]
+    if not keep:
+        return ""
+    texts = [texts[idx] for idx in keep]
+    boxes = boxes[keep]
+
+    labels = group_textlines(boxes)
+    box_count = int(labels.max()) + 1
+    box_bboxes = np.column_stack(
+        (
+            np.full(box_count, np.inf),
+            np.full(box_count, np.inf),
+            np.full(box_count, -np.inf),
+            np.full(box_count, -np.inf),
+        )
+    )
+    np.minimum.at(box_bboxes[:, 0], labels, boxes[:, 0])
+    np.minimum.at(box_bboxes[:, 1], labels, boxes[:, 1])
+    np.maximum.at(box_bboxes[:, 2], labels, boxes[:, 2])
+    np.maximum.at(box_bboxes[:, 3], labels, boxes[:, 3])
+    # Lines of a box read top to bottom; ties keep stream order
+    line_order = np.lexsort((np.arange(len(texts)), -boxes[:, 3], labels))
+    box_lines: list[list[str]] = [[] for _ in range(box_count)]
+    for idx in line_order.tolist():
+        box_lines[labels[idx]].append(texts[idx] + "\n")
+    return "".join("".join(box_lines[box]) for box in order_boxes(box_bboxes))
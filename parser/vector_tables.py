@@ -0,0 +1,141 @@
+import numpy as np
+from pdfplumber.table import Table, TableSettings
+
+from table_prefilter import join, snap
+
+
+def ruling_lines(edges: list[dict], settings: TableSettings) -> tuple[np.ndarray, ...]:
+    """Snapped, joined and length-filtered ``(x, top, bottom)`` vertical and ``(top, x0, x1)``
+    horizontal lines of a page's edges, as pdfplumber's "lines" strategy builds them."""
+    lines = []
+    for orientation, pos_key, start_key, end_key, length_key, snap_tol, join_tol in (
+        ("v", "x0", "top", "bottom", "height", settings.snap_x_tolerance, settings.join_y_tolerance),
+        ("h", "top", "x0", "x1", "width", settings.snap_y_tolerance, settings.join_x_tolerance),
+    ):
+        rows = [
+            (edge[pos_key], edge[start_key], edge[end_key], edge[length_key])
+            for edge in edges
+            if edge["orientation"] == orientation and edge[length_key] >= settings.edge_min_length_prefilter
+        ]
+        if not rows:
+            lines.extend(np.empty(0) for _ in range(3))
+            continue
+        pos, start, end, length = np.array(rows, dtype=float).T
+        pos, start, end, length = join(snap(pos, snap_tol), start, end, length, join_tol)
+        keep = length >= settings.edge_min_length
+        lines.extend((pos[keep], start[keep], end[keep]))
+    return tuple(lines)
+
+
+def _next_index(present: np.ndarray, axis: int) -> np.ndarray:
+    """For every grid point, the index of the next present point along ``axis`` (or -1)."""
+    size = present.shape[axis]
+    idx = np.where(present, np.arange(size).reshape((-1, 1) if axis == 0 else (1, -1)), size)
+    following = np.flip(np.minimum.accumulate(np.flip(idx, axis), axis=axis), axis)
+    nxt = np.full(present.shape, size)
+    if axis == 0:
+        nxt[:-1] = following[1:]
+    else:
+        nxt[:, :-1] = following[:, 1:]
+    return np.where(nxt < size, nxt, -1)
+
+
+def find_cells(lines: tuple[np.ndarray, ...], x_tolerance: float, y_tolerance: float) -> list[tuple]:
+    """Cells ``(x0, top, x1, bottom)`` spanned by the lines' intersections.
+
+    Intersections sit on a grid of the distinct x and y positions. Two points on one line are
+    connected when a single ruling line covers both, which for joined lines reduces to
+    comparing the far one with the furthest end of the lines through the near one. A point's
+    cell is then the first connected point below and right whose opposite corner exists and
+    connects back, as in ``intersections_to_cells``; the nearest pair is checked for every
+    point at once, and only points where it fails search their connected neighbours.
+    """
+    vx, vtop, vbottom, hy, hx0, hx1 = lines
+    hits = (
+        (vtop[:, None] <= hy[None, :] + y_tolerance)
+        & (vbottom[:, None] >= hy[None, :] - y_tolerance)
+        & (vx[:, None] >= hx0[None, :] - x_tolerance)
+        & (vx[:, None] <= hx1[None, :] + x_tolerance)
+    )
+    v_idx, h_idx = np.nonzero(hits)
+    if not len(v_idx):
+        return []
+    xs, xi = np.unique(vx[v_idx], return_inverse=True)
+    ys, yj = np.unique(hy[h_idx], return_inverse=True)
+    present = np.zeros((len(xs), len(ys)), dtype=bool)
+    present[xi, yj] = True
+    # Furthest bottom of the vertical lines, and right end of the horizontal lines, through each point
+    bottom = np.full(present.shape, -np.inf)
+    np.maximum.at(bottom, (xi, yj), vbottom[v_idx])
+    right = np.full(present.shape, -np.inf)
+    np.maximum.at(right, (xi, yj), hx1[h_idx])
+
+    below = _next_index(present, 1)
+    beside = _next_index(present, 0)
+    cells: list[tuple] = []
+    for i, j in zip(*np.nonzero(present & (below >= 0) & (beside >= 0))):
+        k, l = below[i, j], beside[i, j]
+        if ys[k] - y_tolerance > bottom[i, j] or xs[l] > right[i, j] + x_tolerance:
+            continue
+        if present[l, k] and ys[k] - y_tolerance <= bottom[l, j] and xs[l] <= right[i, k] + x_tolerance:
+            cells.append((float(xs[i]), float(ys[j]), float(xs[l]), float(ys[k])))
+            continue
+        ks = np.flatnonzero(present[i, j + 1 :] & (ys[j + 1 :] - y_tolerance <= bottom[i, j])) + j + 1
+        ls = np.flatnonzero(present[i + 1 :, j] & (xs[i + 1 :] <= right[i, j] + x_tolerance)) + i + 1
+        closes = (
+            present[np.ix_(ls, ks)]
+            & (ys[ks][None, :] - y_tolerance <= bottom[ls, j][:, None])
+            & (xs[ls][:, None] <= right[i, ks][None, :] + x_tolerance)
+        )
+        columns = np.flatnonzero(closes.any(axis=0))
+        if len(columns):
+            k = ks[columns[0]]
+            l = ls[np.argmax(closes[:, columns[0]])]
+            cells.append((float(xs[i]), float(ys[j]), float(xs[l]), float(ys[k])))
+    return cells
+
+
+def group_cells(cells: list[tuple]) -> list[list[tuple]]:
+    """Cells grouped into tables by shared corners, top-left first; lone cells are dropped."""
+    if not cells:
+        return []
+    corners = np.array(
+        [((x0, top), (x0, bottom), (x1, top), (x1, bottom)) for x0, top, x1, bottom in cells]
+    ).reshape(-1, 2)
+    corner_ids = np.unique(corners, axis=0, return_inverse=True)[1].reshape(len(cells), 4)
+    labels = np.arange(len(cells))
+    while True:
+        corner_labels = np.full(corner_ids.max() + 1, len(cells))
+        np.minimum.at(corner_labels, corner_ids, labels[:, None])
+        merged = corner_labels[corner_ids].min(axis=1)
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+    tables: dict[int, list[tuple]] = {}
+    for label, cell in zip(labels.tolist(), cells):
+        tables.setdefault(label, []).append(cell)
+    grouped = sorted(tables.values(), key=lambda table: min((cell[1], cell[0]) for cell in table))
+    return [table for table in grouped if len(table) > 1]
+
+
+def find_tables(page) -> list[Table]:
+    """``page.find_tables()`` with pdfplumber's default settings, on NumPy arrays.
+
+    Ruling lines come from ``page.edges`` as pdfplumber's "lines" strategy reads them, and the
+    tables returned are pdfplumber ``Table`` objects, so ``extract()`` behaves as before.
+    """
+    settings = TableSettings.resolve(None)
+    lines = ruling_lines(page.edges, settings)
+    cells = find_cells(lines, settings.intersection_x_tolerance, settings.intersection_y_tolerance)
+    return [Table(page, table_cells) for table_cells in group_cells(cells)]
+
+
+def table_rows(tables: list[Table]) -> list[list[list[str | None]]]:
+    """Cell text of pdfplumber tables, extracted with the settings ``page.extract_tables()`` uses."""
+    settings = TableSettings.resolve(None)
+    return [table.extract(**(settings.text_settings or {})) for table in tables]
+
+
+def extract_tables(page) -> list[list[list[str | None]]]:
+    """``page.extract_tables()`` through ``find_tables``."""
+    return table_rows(find_tables(page))
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("run-manifest")
+
+MANIFEST_NAME = "run_manifest.jsonl"
+MANIFEST_VERSION = 1
+
+
+def pdf_stamp(pdf_path: Path) -> dict:
+    stat = pdf_path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class RunManifest:
+    """Append-only record of finished (parser, pdf) units, one JSON line per unit.
+
+    The first line is a header with the output-relevant options; every later line holds a
+    parser name, the PDF file name, its size/mtime and the unit's benchmark row. Lines are
+    flushed and fsynced as units finish, so after a crash or preemption ``--resume`` can skip
+    everything already on disk and rebuild the reports from the recorded rows. A torn last
+    line (the process died mid-write) is ignored, and a unit whose PDF changed since it was
+    recorded runs again.
+    """
+
+    def __init__(self, output_root: Path, options: dict, resume: bool = False):
+        self.path = output_root / MANIFEST_NAME
+        self.options = options
+        self.completed: dict[tuple[str, str], dict] = {}
+        self._torn = False
+        if resume and self.path.exists() and self.path.stat().st_size > 0:
+            self._load()
+            mode = "a"
+        else:
+            if resume:
+                LOGGER.info("No run manifest at %s; starting a fresh run", self.path)
+            mode = "w"
+        output_root.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open(mode, encoding="utf-8")
+        if mode == "a" and self._torn:
+            # End the torn line so the next record starts on its own line
+            self._file.write("\n")
+        if mode == "w":
+            self._write({"manifest_version": MANIFEST_VERSION, "options": options})
+
+    def _load(self) -> None:
+        with self.path.open("r", encoding="utf-8") as f:
+            content = f.read()
+        lines = content.splitlines()
+        header = json.loads(lines[0])
+        if header.get("manifest_version") != MANIFEST_VERSION or header.get("options") != self.options:
+            raise ValueError(
+                f"{self.path} was written with different options ({header.get('options')}); "
+                "rerun with the same options or without --resume"
+            )
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+                self.completed[(record["parser"], record["pdf"])] = record
+            except (ValueError, KeyError):
+                LOGGER.warning("Skipping unreadable manifest line: %.80s", line)
+        self._torn = not content.endswith("\n")
+        LOGGER.info("Resuming from %s: %d unit(s) already completed", self.path, len(self.completed))
+
+    def row(self, parser_name: str, pdf_path: Path) -> dict | None:
+        """The recorded row for a unit, or None if it has not completed (or its PDF changed)."""
+        record = self.completed.get((parser_name, pdf_path.name))
+        if record is None or record.get("stamp") != pdf_stamp(pdf_path):
+            return None
+        return record["row"]
+
+    def record(self, parser_name: str, pdf_path: Path, row: dict) -> None:
+        record = {"parser": parser_name, "pdf": pdf_path.name, "stamp": pdf_stamp(pdf_path), "row": row}
+        self.completed[(parser_name, pdf_path.name)] = record
+        self._write(record)
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
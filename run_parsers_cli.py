@@ -1,78 +1,510 @@
-import argparse
-import importlib.util
-import logging
-import sys
-from pathlib import Path
-
-
-LOGGER = logging.getLogger("run-parsers-cli")
-
-PARSERS = ["pdfminer", "pdfplumber", "pymupdf", "pypdf"]
-
-
-def setup_logging() -> None:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.StreamHandler()],
-    )
-
-
-def load_parser(parser_dir: Path, name: str):
-    script = parser_dir / f"{name}_parser.py"
-    if not script.exists():
-        raise FileNotFoundError(f"Parser script not found: {script}")
-    spec = importlib.util.spec_from_file_location(name, script)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
-
-
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Run all PDF parsers and save Markdown output to ./res/")
-    parser.add_argument("input", type=Path, help="PDF file or directory of PDFs")
-    parser.add_argument("--parsers-dir", type=Path, default=Path("parser"), help="Directory containing parser scripts")
-    parser.add_argument("--output-root", type=Path, default=Path("res"), help="Root output directory (default: ./res)")
-    args = parser.parse_args()
-
-    setup_logging()
-
-    input_path: Path = args.input.resolve()
-    if input_path.is_file():
-        pdf_files = [input_path]
-    elif input_path.is_dir():
-        pdf_files = sorted(input_path.glob("*.pdf"))
-    else:
-        raise FileNotFoundError(f"Input not found: {input_path}")
-
-    if not pdf_files:
-        raise FileNotFoundError(f"No PDF files found: {input_path}")
-
-    LOGGER.info("Found %d PDF file(s): %s", len(pdf_files), [p.name for p in pdf_files])
-
-    failed = []
-    for name in PARSERS:
-        output_dir = args.output_root / name
-        output_dir.mkdir(parents=True, exist_ok=True)
-        LOGGER.info("=" * 60)
-        LOGGER.info("Running parser: %s  →  %s", name, output_dir)
-        try:
-            module = load_parser(args.parsers_dir, name)
-            module.run(pdf_files, output_dir)
-            LOGGER.info("Parser finished: %s", name)
-        except Exception as e:
-            LOGGER.error("Parser failed: %s — %s", name, e)
-            failed.append(name)
-
-    LOGGER.info("=" * 60)
-    if failed:
-        LOGGER.error("Failed parsers: %s", ", ".join(failed))
-        sys.exit(1)
-    else:
-        LOGGER.info("All parsers completed successfully.")
-        LOGGER.info("Output saved to: %s", args.output_root.resolve())
-
-
-if __name__ == "__main__":
-    main()
-
+import argparse
+import dataclasses
+import hashlib
+import logging
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from extraction_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, ExtractionCache, library_versions
+from run_manifest import RunManifest
+from unit_supervisor import UnitLimits, UnitOutcome, run_supervised
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "parser"))
+
+import reports  # noqa: E402
+from pdf_input import PdfInput  # noqa: E402
+from registry import (  # noqa: E402
+    PARSERS,
+    ParserSpec,
+    add_import_times,
+    import_report,
+    select_parsers,
+    take_import_times,
+)
+from run_options import RunOptions, add_run_arguments, options_from_args  # noqa: E402
+
+if TYPE_CHECKING:
+    from doc_session import DocumentSession
+
+
+LOGGER = logging.getLogger("run-parsers-cli")
+
+
+def setup_logging() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+
+
+def parser_code_digest(parser_dir: Path) -> str:
+    digest = hashlib.sha256()
+    for script in sorted(parser_dir.glob("*.py")):
+        digest.update(script.name.encode("utf-8"))
+        digest.update(script.read_bytes())
+    return digest.hexdigest()
+
+
+def unit_outputs(pdf_path: Path) -> list[str]:
+    """Files a parser writes for one PDF, relative to its output directory."""
+    return [
+        f"{pdf_path.stem}.md",
+        f"{pdf_path.stem}_images",
+        f"{pdf_path.stem}.timings.jsonl",
+        f"{pdf_path.stem}.engines.jsonl",
+        f"{pdf_path.stem}.records.jsonl",
+        f"{pdf_path.stem}.records.parquet",
+    ]
+
+
+def unit_cache_key(name: str, pdf_digest: str, code_digest: str, options: RunOptions) -> str:
+    versions = library_versions(list(PARSERS[name].distributions))
+    return ExtractionCache.make_key(pdf_digest, name, versions, code_digest, options.output_fields())
+
+
+def process_cached(
+    module,
+    name: str,
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int,
+    total_files: int,
+    options: RunOptions,
+    session: "DocumentSession | PdfInput | None",
+    cache: ExtractionCache | None,
+    cache_key: str | None,
+) -> dict:
+    row = module.process_pdf(pdf_path, output_dir, idx, total_files, options, session)
+    if cache is not None and row["status"] == "ok":
+        cache.store(cache_key, output_dir, unit_outputs(pdf_path), row)
+    return row
+
+
+def outcome_row(name: str, pdf_path: Path, outcome: UnitOutcome) -> dict:
+    """Benchmark row for a supervised unit; killed units become "timeout"/"oom" rows."""
+    if outcome.status == "ok":
+        return outcome.result
+    LOGGER.error("Unit %s: %s | %s — %s", outcome.status, name, pdf_path.name, outcome.message)
+    row = reports.error_row(pdf_path, outcome.message, name, status=outcome.status)
+    row["extract_time_sec"] = outcome.elapsed
+    return row
+
+
+def run_serial(
+    parser_dir: Path,
+    output_root: Path,
+    specs: list[ParserSpec],
+    pdf_files: list[Path],
+    options: RunOptions,
+    cache: ExtractionCache | None,
+    limits: UnitLimits | None = None,
+    manifest: RunManifest | None = None,
+) -> list[str]:
+    """Run every parser on one PDF at a time, sharing a single DocumentSession between them.
+
+    A parser is only imported the first time one of its units misses the cache. With
+    ``limits``, each unit runs in a forked child that still sees the shared session. Units
+    already in ``manifest`` are skipped; every other unit is recorded there as it finishes.
+    """
+    limits = limits or UnitLimits()
+    code_digest = parser_code_digest(parser_dir)
+
+    total_files = len(pdf_files)
+    active = list(specs)
+    failed: list[str] = []
+    rows: dict[str, list[dict]] = {spec.name: [] for spec in specs}
+
+    def finish(name: str, pdf_path: Path, row: dict) -> None:
+        rows[name].append(row)
+        if manifest is not None:
+            manifest.record(name, pdf_path, row)
+
+    for idx, pdf_path in enumerate(pdf_files, start=1):
+        resumed = {}
+        if manifest is not None:
+            resumed = {spec.name: manifest.row(spec.name, pdf_path) for spec in active}
+            if all(row is not None for row in resumed.values()):
+                for name, row in resumed.items():
+                    rows[name].append(row)
+                continue
+
+        LOGGER.info("=" * 60)
+        LOGGER.info("Document %d/%d: %s", idx, total_files, pdf_path.name)
+        source = PdfInput(pdf_path, options.input_max_bytes())
+        if not source.in_memory:
+            LOGGER.info("Opening %s by path: larger than --input-max-mb %d", pdf_path.name, options.input_max_mb)
+        pdf_digest = source.digest() if cache is not None else ""
+        cache_keys: dict[str, str] = {}
+        todo: list[ParserSpec] = []
+        for spec in active:
+            output_dir = output_root / spec.name
+            output_dir.mkdir(parents=True, exist_ok=True)
+            if resumed.get(spec.name) is not None:
+                LOGGER.info("Already completed: %s | %s", spec.name, pdf_path.name)
+                rows[spec.name].append(resumed[spec.name])
+                continue
+            if cache is not None:
+                cache_keys[spec.name] = unit_cache_key(spec.name, pdf_digest, code_digest, options)
+                row = cache.restore(cache_keys[spec.name], output_dir)
+                if row is not None:
+                    LOGGER.info("Cache hit: %s | %s", spec.name, pdf_path.name)
+                    finish(spec.name, pdf_path, row)
+                    continue
+            todo.append(spec)
+
+        modules = {}
+        for spec in todo:
+            try:
+                modules[spec.name] = spec.load(parser_dir)
+            except Exception as e:
+                LOGGER.error("Parser failed: %s — %s", spec.name, e)
+                failed.append(spec.name)
+                active.remove(spec)
+        todo = [spec for spec in todo if spec.name in modules]
+
+        # Parsers that share the fitz inventory get the session; the others just the bytes
+        session = None
+        if any(spec.shares_session for spec in todo):
+            try:
+                from doc_session import DocumentSession
+
+                session = DocumentSession(source, preload_images=options.with_images and not options.stream)
+            except Exception as e:
+                LOGGER.warning("Shared session unavailable for %s — %s", pdf_path.name, e)
+
+        units = [
+            (
+                spec.name,
+                process_cached,
+                (
+                    modules[spec.name],
+                    spec.name,
+                    pdf_path,
+                    output_root / spec.name,
+                    idx,
+                    total_files,
+                    options,
+                    session if spec.shares_session else source,
+                    cache,
+                    cache_keys.get(spec.name),
+                ),
+            )
+            for spec in todo
+        ]
+        if limits.enabled:
+            for name, outcome in run_supervised(units, limits):
+                finish(name, pdf_path, outcome_row(name, pdf_path, outcome))
+        else:
+            for name, target, args in units:
+                finish(name, pdf_path, target(*args))
+        if session is not None:
+            session.close()
+        session = source = None  # release the document bytes and images before reading the next PDF
+
+    for spec in active:
+        reports.write_reports(output_root / spec.name, rows[spec.name], spec.title)
+        LOGGER.info("Parser finished: %s", spec.name)
+
+    return failed
+
+
+def resumed_rows(
+    specs: list[ParserSpec], pdf_files: list[Path], manifest: RunManifest | None
+) -> dict[tuple[str, int], dict]:
+    """Rows of units the manifest already has, keyed like the parallel runners' results."""
+    rows: dict[tuple[str, int], dict] = {}
+    if manifest is None:
+        return rows
+    for spec in specs:
+        for idx, pdf_path in enumerate(pdf_files, start=1):
+            row = manifest.row(spec.name, pdf_path)
+            if row is not None:
+                rows[(spec.name, idx)] = row
+    if rows:
+        LOGGER.info("Skipping %d already completed unit(s)", len(rows))
+    return rows
+
+
+def run_unit(
+    parser_dir: Path,
+    name: str,
+    pdf_path: Path,
+    output_dir: Path,
+    idx: int,
+    total_files: int,
+    options: RunOptions,
+    cache: ExtractionCache | None = None,
+    code_digest: str = "",
+) -> dict:
+    """Worker entry point: process one (parser, pdf) unit and return its benchmark row.
+
+    The PDF is read once here, for both the cache key and the parser; a parser that shares
+    sessions gets one built on the same bytes instead of reopening the file.
+    """
+    source = PdfInput(pdf_path, options.input_max_bytes())
+    cache_key = None
+    if cache is not None:
+        cache_key = unit_cache_key(name, source.digest(), code_digest, options)
+        row = cache.restore(cache_key, output_dir)
+        if row is not None:
+            LOGGER.info("Cache hit: %s | %s", name, pdf_path.name)
+            return row
+    spec = PARSERS[name]
+    module = spec.load(parser_dir)
+    session = source
+    if spec.shares_session:
+        from doc_session import DocumentSession
+
+        session = DocumentSession(source, preload_images=options.with_images and not options.stream)
+    try:
+        return process_cached(module, name, pdf_path, output_dir, idx, total_files, options, session, cache, cache_key)
+    finally:
+        if session is not source:
+            session.close()
+
+
+def run_pool_unit(*args) -> tuple[dict, dict[str, float]]:
+    """``run_unit`` in a pool worker: its row, and the import times the worker spent on it."""
+    row = run_unit(*args)
+    return row, take_import_times()
+
+
+def run_parallel(
+    parser_dir: Path,
+    output_root: Path,
+    specs: list[ParserSpec],
+    pdf_files: list[Path],
+    jobs: int,
+    options: RunOptions,
+    cache: ExtractionCache | None,
+    limits: UnitLimits | None = None,
+    manifest: RunManifest | None = None,
+) -> list[str]:
+    """Spread (parser, pdf) units over a process pool and write per-parser reports in input order.
+
+    Units run in separate processes, so no DocumentSession is shared between parsers: each
+    unit reads the PDF once for itself (see ``run_unit``). Parsers are imported in the
+    workers only; this process neither imports parsers nor reads PDFs, and adds up the
+    workers' import times for the import report.
+
+    At most ``2 * jobs`` units are in flight at once, so the submission queue stays bounded
+    however large the corpus is.
+
+    With ``limits``, the pool is replaced by up to ``jobs`` supervised children, one per unit,
+    so a stuck or runaway unit can be killed without losing the others. The parsers are then
+    loaded here first, so every forked child starts with its imports already done.
+
+    Units already in ``manifest`` are not resubmitted; the rest are recorded as they finish.
+    """
+    limits = limits or UnitLimits()
+    if limits.enabled:
+        return run_parallel_supervised(
+            parser_dir, output_root, specs, pdf_files, jobs, options, cache, limits, manifest
+        )
+
+    failed: list[str] = []
+    code_digest = parser_code_digest(parser_dir) if cache is not None else ""
+
+    total_files = len(pdf_files)
+    rows = resumed_rows(specs, pdf_files, manifest)
+    units = [
+        (spec.name, idx, pdf_path)
+        for spec in specs
+        for idx, pdf_path in enumerate(pdf_files, start=1)
+        if (spec.name, idx) not in rows
+    ]
+    max_pending = jobs * 2
+
+    LOGGER.info("Running %d unit(s) on %d worker process(es)", len(units), jobs)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=setup_logging) as pool:
+        pending = {}
+        unit_iter = iter(units)
+        while True:
+            for name, idx, pdf_path in unit_iter:
+                output_dir = output_root / name
+                output_dir.mkdir(parents=True, exist_ok=True)
+                future = pool.submit(
+                    run_pool_unit, parser_dir, name, pdf_path, output_dir, idx, total_files, options, cache, code_digest
+                )
+                pending[future] = (name, idx, pdf_path)
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, idx, pdf_path = pending.pop(future)
+                try:
+                    rows[(name, idx)], import_times = future.result()
+                    add_import_times(import_times)
+                except Exception as err:
+                    LOGGER.error("Unit failed: %s | %s — %s", name, pdf_path.name, err)
+                    rows[(name, idx)] = reports.error_row(pdf_path, err, name)
+                    if name not in failed:
+                        failed.append(name)
+                if manifest is not None:
+                    manifest.record(name, pdf_path, rows[(name, idx)])
+
+    for spec in specs:
+        parser_rows = [rows[(spec.name, idx)] for idx in range(1, total_files + 1)]
+        reports.write_reports(output_root / spec.name, parser_rows, spec.title)
+        LOGGER.info("Parser finished: %s", spec.name)
+
+    return failed
+
+
+def run_parallel_supervised(
+    parser_dir: Path,
+    output_root: Path,
+    specs: list[ParserSpec],
+    pdf_files: list[Path],
+    jobs: int,
+    options: RunOptions,
+    cache: ExtractionCache | None,
+    limits: UnitLimits,
+    manifest: RunManifest | None = None,
+) -> list[str]:
+    failed: list[str] = []
+    total_files = len(pdf_files)
+    rows = resumed_rows(specs, pdf_files, manifest)
+    active = []
+    for spec in specs:
+        if all((spec.name, idx) in rows for idx in range(1, total_files + 1)):
+            active.append(spec)
+            continue
+        try:
+            spec.load(parser_dir)
+            active.append(spec)
+        except Exception as e:
+            LOGGER.error("Parser failed: %s — %s", spec.name, e)
+            failed.append(spec.name)
+    code_digest = parser_code_digest(parser_dir) if cache is not None else ""
+
+    def units():
+        for spec in active:
+            for idx, pdf_path in enumerate(pdf_files, start=1):
+                if (spec.name, idx) in rows:
+                    continue
+                output_dir = output_root / spec.name
+                output_dir.mkdir(parents=True, exist_ok=True)
+                args = (parser_dir, spec.name, pdf_path, output_dir, idx, total_files, options, cache, code_digest)
+                yield (spec.name, idx), run_unit, args
+
+    LOGGER.info("Running up to %d supervised process(es)", jobs)
+    for (name, idx), outcome in run_supervised(units(), limits, max_running=jobs):
+        rows[(name, idx)] = outcome_row(name, pdf_files[idx - 1], outcome)
+        if manifest is not None:
+            manifest.record(name, pdf_files[idx - 1], rows[(name, idx)])
+
+    for spec in active:
+        parser_rows = [rows[(spec.name, idx)] for idx in range(1, total_files + 1)]
+        reports.write_reports(output_root / spec.name, parser_rows, spec.title)
+        LOGGER.info("Parser finished: %s", spec.name)
+
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run all PDF parsers and save Markdown output to ./res/")
+    parser.add_argument("input", type=Path, nargs="?", help="PDF file or directory of PDFs")
+    parser.add_argument(
+        "--parsers",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        default=None,
+        help=f"Comma-separated subset of parsers to run (default: all of {','.join(PARSERS)})",
+    )
+    parser.add_argument("--list-parsers", action="store_true", help="List registered parsers and their capabilities, then exit")
+    parser.add_argument("--parsers-dir", type=Path, default=Path("parser"), help="Directory containing parser scripts")
+    parser.add_argument("--output-root", type=Path, default=Path("res"), help="Root output directory (default: ./res)")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for (parser, pdf) units (default: 1, serial)")
+    parser.add_argument(
+        "--unit-timeout",
+        type=float,
+        default=0,
+        help="Kill a (parser, pdf) unit after this many seconds and record status=timeout (default: 0, no limit)",
+    )
+    parser.add_argument(
+        "--unit-memory-mb",
+        type=int,
+        default=0,
+        help="Kill a (parser, pdf) unit whose resident memory exceeds this and record status=oom (default: 0, no limit)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip (parser, pdf) units recorded in <output-root>/run_manifest.jsonl by an earlier, interrupted run",
+    )
+    parser.add_argument(
+        "--input-max-mb",
+        type=int,
+        default=RunOptions.input_max_mb,
+        help="Read PDFs up to this size into memory once and share the buffer between engines; "
+        "larger ones are opened by path (default: %(default)s)",
+    )
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Extraction cache directory")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_MB, help="Evict least-recently-used cache entries above this size")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-extract; do not read or write the extraction cache")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    if args.list_parsers:
+        for spec in PARSERS.values():
+            print(f"{spec.name}: {', '.join(sorted(spec.capabilities))}")
+        return
+    if args.input is None:
+        parser.error("the following arguments are required: input")
+    try:
+        specs = select_parsers(args.parsers)
+    except ValueError as e:
+        parser.error(str(e))
+
+    setup_logging()
+
+    input_path: Path = args.input.resolve()
+    if input_path.is_file():
+        pdf_files = [input_path]
+    elif input_path.is_dir():
+        pdf_files = sorted(input_path.glob("*.pdf"))
+    else:
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    if not pdf_files:
+        raise FileNotFoundError(f"No PDF files found: {input_path}")
+
+    LOGGER.info("Found %d PDF file(s): %s", len(pdf_files), [p.name for p in pdf_files])
+
+    options = dataclasses.replace(options_from_args(args), input_max_mb=args.input_max_mb)
+    limits = UnitLimits(timeout_sec=args.unit_timeout, memory_mb=args.unit_memory_mb)
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    try:
+        manifest = RunManifest(args.output_root, options.output_fields(), resume=args.resume)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        if args.jobs > 1:
+            failed = run_parallel(
+                args.parsers_dir.resolve(), args.output_root, specs, pdf_files, args.jobs, options, cache, limits, manifest
+            )
+        else:
+            failed = run_serial(args.parsers_dir, args.output_root, specs, pdf_files, options, cache, limits, manifest)
+        LOGGER.info("Import times: %s", ", ".join(import_report()) or "no parser loaded")
+    finally:
+        manifest.close()
+    if cache is not None:
+        cache.evict()
+
+    LOGGER.info("=" * 60)
+    if failed:
+        LOGGER.error("Failed parsers: %s", ", ".join(failed))
+        sys.exit(1)
+    else:
+        LOGGER.info("All parsers completed successfully.")
+        LOGGER.info("Output saved to: %s", args.output_root.resolve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import csv
+import json
+import logging
+from pathlib import Path
+
+
+LOGGER = logging.getLogger("summarize-stage-timings")
+
+
+def setup_logging() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+        handlers=[logging.StreamHandler()],
+    )
+
+
+def iter_events(input_dir: Path):
+    for path in sorted(input_dir.rglob("*.timings.jsonl")):
+        with path.open("r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    LOGGER.warning("Skipping malformed event: %s:%d", path, line_no)
+
+
+def aggregate(input_dir: Path) -> tuple[list[dict], list[dict]]:
+    """Return per-(parser, stage) totals and per-(parser, pdf, page) totals."""
+    stages: dict[tuple[str, str], dict] = {}
+    pages: dict[tuple[str, str, int], dict] = {}
+    for event in iter_events(input_dir):
+        parser_name = event.get("parser", "")
+        stage = event.get("stage", "")
+        duration = float(event.get("duration_sec", 0.0))
+        bytes_written = int(event.get("bytes_written", 0))
+
+        stage_row = stages.setdefault(
+            (parser_name, stage),
+            {"parser": parser_name, "stage": stage, "events": 0, "total_sec": 0.0, "max_sec": 0.0, "bytes_written": 0},
+        )
+        stage_row["events"] += 1
+        stage_row["total_sec"] += duration
+        stage_row["max_sec"] = max(stage_row["max_sec"], duration)
+        stage_row["bytes_written"] += bytes_written
+
+        page = int(event.get("page", 0))
+        if page <= 0:
+            continue
+        page_row = pages.setdefault(
+            (parser_name, event.get("pdf", ""), page),
+            {"parser": parser_name, "pdf": event.get("pdf", ""), "page": page, "total_sec": 0.0, "stages": {}},
+        )
+        page_row["total_sec"] += duration
+        page_row["stages"][stage] = page_row["stages"].get(stage, 0.0) + duration
+
+    parser_totals: dict[str, float] = {}
+    for row in stages.values():
+        parser_totals[row["parser"]] = parser_totals.get(row["parser"], 0.0) + row["total_sec"]
+    stage_rows = sorted(stages.values(), key=lambda r: (r["parser"], -r["total_sec"]))
+    for row in stage_rows:
+        total = parser_totals.get(row["parser"], 0.0)
+        row["mean_sec"] = row["total_sec"] / row["events"] if row["events"] else 0.0
+        row["share_pct"] = row["total_sec"] / total * 100.0 if total > 0 else 0.0
+
+    page_rows = sorted(pages.values(), key=lambda r: r["total_sec"], reverse=True)
+    return stage_rows, page_rows
+
+
+def write_reports(stage_rows: list[dict], page_rows: list[dict], output_dir: Path, top: int) -> tuple[Path, Path]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = output_dir / "stage_timings.csv"
+    md_path = output_dir / "stage_timings.md"
+
+    fields = ["parser", "stage", "events", "total_sec", "mean_sec", "max_sec", "share_pct", "bytes_written"]
+    with csv_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for row in stage_rows:
+            writer.writerow({key: row[key] for key in fields})
+
+    lines = [
+        "# Stage Timings",
+        "",
+        "| " + " | ".join(fields) + " |",
+        "| " + " | ".join(["---"] * len(fields)) + " |",
+    ]
+    for row in stage_rows:
+        vals = [f"{row[key]:.3f}" if isinstance(row[key], float) else str(row[key]) for key in fields]
+        lines.append("| " + " | ".join(vals) + " |")
+
+    lines.extend(
+        [
+            "",
+            f"## Slowest Pages (top {top})",
+            "",
+            "| parser | pdf | page | total_sec | stages |",
+            "| --- | --- | --- | --- | --- |",
+        ]
+    )
+    for row in page_rows[:top]:
+        breakdown = ", ".join(
+            f"{stage} {sec:.3f}" for stage, sec in sorted(row["stages"].items(), key=lambda item: -item[1])
+        )
+        lines.append(f"| {row['parser']} | {row['pdf']} | {row['page']} | {row['total_sec']:.3f} | {breakdown} |")
+
+    md_path.write_text("\n".join(lines), encoding="utf-8")
+    return csv_path, md_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aggregate per-page stage timings (*.timings.jsonl) written by the parsers")
+    parser.add_argument("--input-dir", type=Path, default=Path("res"), help="Root directory to search for *.timings.jsonl")
+    parser.add_argument("--output-dir", type=Path, default=Path("res") / "summary", help="Directory to write the reports")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest pages to list")
+    args = parser.parse_args()
+
+    setup_logging()
+    if not args.input_dir.exists():
+        raise FileNotFoundError(f"Input directory not found: {args.input_dir}")
+
+    stage_rows, page_rows = aggregate(args.input_dir)
+    if not stage_rows:
+        raise FileNotFoundError(f"No *.timings.jsonl files found under: {args.input_dir}")
+
+    csv_path, md_path = write_reports(stage_rows, page_rows, args.output_dir, args.top)
+    LOGGER.info("Stage CSV: %s", csv_path)
+    LOGGER.info("Stage MD: %s", md_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Callable, Hashable, Iterable, Iterator
+
+
+LOGGER = logging.getLogger("unit-supervisor")
+
+POLL_INTERVAL_SEC = 0.1
+
+
+@dataclass
+class UnitLimits:
+    """Per-unit limits; 0 means unlimited."""
+
+    timeout_sec: float = 0.0
+    memory_mb: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout_sec > 0 or self.memory_mb > 0
+
+
+@dataclass
+class UnitOutcome:
+    status: str  # "ok", "error", "timeout" or "oom"
+    result: Any = None
+    message: str = ""
+    elapsed: float = 0.0
+
+
+@dataclass
+class _Running:
+    key: Hashable
+    process: Any
+    conn: Any
+    started: float
+
+
+def fork_context():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise RuntimeError("Unit limits need the 'fork' start method, which this platform does not provide")
+    return multiprocessing.get_context("fork")
+
+
+def resident_mb(pid: int) -> float:
+    """Resident set size of ``pid`` in MB, read from /proc (0.0 where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/statm", "r", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def group_resident_mb(pid: int) -> float:
+    """Resident set size in MB of ``pid`` and every process in its process group.
+
+    A unit leads its own group (see ``_child_main``), so this includes the shard workers it
+    starts. The group is found by scanning ``/proc/*/stat``; processes that exit meanwhile
+    count as 0.
+    """
+    total = resident_mb(pid)
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit() or int(entry.name) == pid:
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", "r", encoding="ascii", errors="replace") as f:
+                # The command name may contain spaces; the fields after it start with state, ppid, pgrp
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if len(fields) > 2 and fields[2] == str(pid):
+            total += resident_mb(int(entry.name))
+    return total
+
+
+def _child_main(conn, target: Callable, args: tuple) -> None:
+    # Own process group, so a kill also takes down any shard workers the unit started
+    os.setsid()
+    try:
+        outcome = UnitOutcome("ok", target(*args))
+    except MemoryError as err:
+        outcome = UnitOutcome("oom", message=f"MemoryError: {err}")
+    except BaseException as err:
+        outcome = UnitOutcome("error", message=f"{type(err).__name__}: {err}")
+    try:
+        conn.send(outcome)
+    finally:
+        conn.close()
+
+
+def _kill(process) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+    process.join()
+
+
+def run_supervised(
+    units: Iterable[tuple[Hashable, Callable, tuple]],
+    limits: UnitLimits,
+    max_running: int = 1,
+) -> Iterator[tuple[Hashable, UnitOutcome]]:
+    """Run each ``(key, target, args)`` unit in its own forked child and yield outcomes as they finish.
+
+    Children are forked, so ``target`` and ``args`` need not be picklable and inherit whatever
+    the parent already has in memory; only the return value travels back. A child still
+    running after ``limits.timeout_sec`` is killed with status ``"timeout"``; one whose
+    resident memory, with that of the shard workers in its process group (sampled every
+    ``POLL_INTERVAL_SEC``), exceeds ``limits.memory_mb`` is
+    killed with status ``"oom"``. Other units keep running either way.
+    """
+    ctx = fork_context()
+    unit_iter = iter(units)
+    running: list[_Running] = []
+    exhausted = False
+    try:
+        while running or not exhausted:
+            while not exhausted and len(running) < max_running:
+                try:
+                    key, target, args = next(unit_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                parent_conn, child_conn = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=_child_main, args=(child_conn, target, args), daemon=False)
+                process.start()
+                child_conn.close()
+                running.append(_Running(key, process, parent_conn, time.perf_counter()))
+            if not running:
+                break
+
+            ready = wait([unit.conn for unit in running], timeout=POLL_INTERVAL_SEC)
+            now = time.perf_counter()
+            still_running: list[_Running] = []
+            for unit in running:
+                elapsed = now - unit.started
+                if unit.conn in ready:
+                    try:
+                        outcome = unit.conn.recv()
+                    except EOFError:
+                        unit.process.join()
+                        code = unit.process.exitcode
+                        if code == -signal.SIGKILL and limits.memory_mb > 0:
+                            outcome = UnitOutcome("oom", message=f"killed by SIGKILL (likely out of memory, limit {limits.memory_mb} MB)")
+                        else:
+                            outcome = UnitOutcome("error", message=f"unit process exited with code {code}")
+                    else:
+                        unit.process.join()
+                    unit.conn.close()
+                    outcome.elapsed = elapsed
+                    yield unit.key, outcome
+                    continue
+
+                if limits.timeout_sec > 0 and elapsed > limits.timeout_sec:
+                    _kill(unit.process)
+                    unit.conn.close()
+                    LOGGER.warning("Unit timed out after %.1fs: %s", elapsed, unit.key)
+                    yield unit.key, UnitOutcome("timeout", message=f"exceeded {limits.timeout_sec:g}s wall-clock limit", elapsed=elapsed)
+                    continue
+
+                if limits.memory_mb > 0:
+                    rss = group_resident_mb(unit.process.pid)
+                    if rss > limits.memory_mb:
+                        _kill(unit.process)
+                        unit.conn.close()
+                        LOGGER.warning("Unit exceeded memory limit (%.1f MB): %s", rss, unit.key)
+                        yield unit.key, UnitOutcome("oom", message=f"resident memory {rss:.1f} MB exceeded {limits.memory_mb} MB limit", elapsed=elapsed)
+                        continue
+
+                still_running.append(unit)
+            running = still_running
+    finally:
+        # Consumer stopped early (or failed): do not leave children behind
+        for unit in running:
+            if unit.process.is_alive():
+                _kill(unit.process)
+            unit.conn.close()